@@ -1,12 +1,65 @@
 # region imports
 from test_analytics_setup import setup_analytics_data, freeze_time
+import heapq
+from bisect import bisect_right
+from itertools import accumulate
 from datetime import datetime, timedelta, date
 
+from metrics import track_analytics
+from periodicity import get_rule, week_of, report_periodicities
+from storage import HABIT_NOT_FOUND
+
 # endregion
 
 # region streaks
 
 # region longest streak
+def count_longest_streak(sorted_dates, periodicity):
+    """
+    Count the longest streak in chronologically sorted completion dates.
+
+    Numeric core of longest_streak(), shared with leaderboard queries.
+    For "N times per week" the streak is a number of consecutive ISO weeks
+    with at least N completions.
+
+    Args:
+        sorted_dates (list): Completion dates (datetime.date), oldest first
+        periodicity (str): Periodicity string, see periodicity.get_rule()
+
+    Returns:
+        int: Length of the longest streak, 0 if there are no dates
+    """
+    if not sorted_dates:
+        return 0
+    rule = get_rule(periodicity)
+    if rule.is_weekly_quota:
+        # Counted in ISO weeks that meet the quota, see StreakRunIndex
+        return StreakRunIndex(sorted_dates, periodicity).longest_streak(sorted_dates[-1])
+    # Resolve gap rules once, the loop only compares integers
+    # - Daily: exactly 1 day gap = consecutive
+    # - Weekly: 7-13 day gap = consecutive
+    # - Monthly: 28-31 day gap = consecutive
+    # Streak breaks when gaps exceed allowed range, shorter gaps are ignored
+    min_gap, max_gap = rule.min_gap, rule.max_gap
+    dates_count = 1
+    longest_streak = 0
+    for i in range(1, len(sorted_dates)):
+        
+        # Calculate days between consecutive completions
+        gap = (sorted_dates[i] - sorted_dates[i-1]).days
+
+        if min_gap <= gap <= max_gap:
+            dates_count += 1
+        elif gap > max_gap:
+            # Gap too large - streak broken, save current streak
+            longest_streak = max(longest_streak, dates_count)
+            dates_count = 1 # Reset counter
+    # Final comparison needed - handles case where data ends with active streak
+    if dates_count > longest_streak:
+        longest_streak = max(longest_streak, dates_count)
+    return longest_streak
+
+@track_analytics("longest_streak")
 def longest_streak(storage, habit):
     """
     Calculates the longest streak for a given habit.
@@ -20,7 +73,7 @@ def longest_streak(storage, habit):
     daily (1 day), weekly (7-13 days), monthly (28-31 days).
 
     Args:
-        storage (SQLiteStorage): Database storage object for accessing habit and tracking data
+        storage (HabitStorage): Database storage object for accessing habit and tracking data
         habit (str): Name of the habit for analytics
 
     Returns:
@@ -30,10 +83,8 @@ def longest_streak(storage, habit):
                 - "Habit {habit} was not found" if habit doesn't exist in database
 
     """
-    dates_count = 1
-    longest_streak = 0
     result = storage.load_tracking_data(habit)
-    if result == "Habit name was not found":
+    if result == HABIT_NOT_FOUND:
         return f"Habit {habit} was not found"
     habit_data = storage.load_habit(habit)
     periodicity = habit_data["habit_periodicity"]
@@ -44,40 +95,7 @@ def longest_streak(storage, habit):
         return f"No tracking data found for Habit {habit}"
     
     # Sort chronologically (oldest to newest)
-    sorted_dates = sorted(dates)
-    for i in range(1, len(sorted_dates)):
-        
-        # Calculate days between consecutive completions
-        gap = (sorted_dates[i] - sorted_dates[i-1]).days
-
-        # Apply periodicity-specific gap rules to detect consecutive patterns
-        # - Daily: exactly 1 day gap = consecutive
-        # - Weekly: 7-13 day gap = consecutive  
-        # - Monthly: 28-31 day gap = consecutive
-        # Streak breaks when gaps exceed allowed range
-
-        if periodicity == "daily":
-            if gap == 1:
-                dates_count += 1
-            elif gap > 1:
-                # Gap too large - streak broken, save current streak
-                longest_streak = max(longest_streak, dates_count)
-                dates_count = 1 # Reset counter
-        elif periodicity == "weekly":
-            if gap > 13:
-                longest_streak = max(longest_streak, dates_count)
-                dates_count = 1
-            elif 13 >= gap >= 7:
-                dates_count += 1
-        elif periodicity == "monthly":
-            if 31 >= gap >= 28:
-                dates_count +=1
-            elif gap > 31:
-                longest_streak = max(longest_streak, dates_count)
-                dates_count = 1
-    # Final comparison needed - handles case where data ends with active streak
-    if dates_count > longest_streak:
-        longest_streak = max(longest_streak, dates_count)
+    longest_streak = count_longest_streak(sorted(dates), periodicity)
     return f"The longest streak for Habit {habit} is {longest_streak} day{"s" if longest_streak != 1 else "" }"
 
 # endregion longest streak
@@ -92,30 +110,16 @@ def check_gap(gap_value, periodicity, is_gap_to_today=False):
     
     Args:
         gap_value (int): Number of days between dates
-        periodicity (str): "daily", "weekly", or "monthly"
+        periodicity (str): Periodicity string, see periodicity.get_rule()
         is_gap_to_today (bool): Whether gap is from today or between completions
         
     Returns:
         bool: True if gap is valid for streak continuation, False otherwise
     """
-    if periodicity == "daily":
-        if is_gap_to_today:
-            return gap_value <= 1
-        else:
-            gap_rules = (1, 1)
-    elif periodicity == "weekly":
-        if is_gap_to_today:
-            return 6 >= gap_value
-        else:
-            gap_rules = (7, 13)
-    elif periodicity == "monthly":
-        if is_gap_to_today:
-            return 28 >= gap_value
-        else:
-            gap_rules = (28, 31)
-
-    min_gap, max_gap = gap_rules
-    return min_gap <= gap_value <= max_gap
+    rule = get_rule(periodicity)
+    if is_gap_to_today:
+        return rule.is_valid_gap_to_today(gap_value)
+    return rule.is_valid_gap(gap_value)
 
 def create_return(habit, current_streak, is_success=True):
     """
@@ -136,7 +140,42 @@ def create_return(habit, current_streak, is_success=True):
     else:
         return f"Error! The current streak for Habit {habit} is {current_streak} day{"s" if current_streak != 1 else "" }"
 
-def current_streak(storage, habit):
+def count_current_streak(sorted_dates, periodicity, today):
+    """
+    Count the current streak in chronologically sorted completion dates.
+
+    Numeric core of current_streak(), shared with leaderboard queries.
+    Walks backwards from the most recent completion while gaps are valid;
+    "N times per week" counts ISO weeks instead, see StreakRunIndex.
+
+    Args:
+        sorted_dates (list): Completion dates (datetime.date), oldest first
+        periodicity (str): Periodicity string, see periodicity.get_rule()
+        today (date): Reference date for the gap to the latest completion
+
+    Returns:
+        int: Length of the current streak, 0 if streak is broken or there are no dates
+    """
+    if not sorted_dates:
+        return 0
+    rule = get_rule(periodicity)
+    if rule.is_weekly_quota:
+        return StreakRunIndex(sorted_dates, periodicity).current_streak(today)
+    min_gap, max_gap = rule.min_gap, rule.max_gap
+    # Calculate gap between today and the latest completion date
+    gap_to_today = (today - sorted_dates[-1]).days
+    if not rule.is_valid_gap_to_today(gap_to_today):
+        return 0
+    current_streak = 1
+    for i in range(len(sorted_dates)-1, 0, -1):
+        gap = (sorted_dates[i] - sorted_dates[i - 1]).days
+        if not min_gap <= gap <= max_gap:
+            break
+        current_streak += 1
+    return current_streak
+
+@track_analytics("current_streak")
+def current_streak(storage, habit, as_of=None):
     """
     Calculates the current streak for a given habit.
 
@@ -149,8 +188,10 @@ def current_streak(storage, habit):
     daily (1 day), weekly (7-13 days), monthly (28-31 days).
 
     Args:
-        storage (SQLiteStorage): Database storage object for accessing habit and tracking data
+        storage (HabitStorage): Database storage object for accessing habit and tracking data
         habit (str): Name of the habit for analytics
+        as_of (date, optional): Evaluate the streak as it was on this date instead of today.
+            Completions after this date are ignored.
 
     Returns:
             str:
@@ -161,9 +202,8 @@ def current_streak(storage, habit):
                 - "Habit {habit} was not found" if habit doesn't exist in database
 
     """
-    current_streak = 0
     result = storage.load_tracking_data(habit)
-    if result == "Habit name was not found":
+    if result == HABIT_NOT_FOUND:
         return f"Habit {habit} was not found"
     periodicity = storage.load_habit(habit)
     periodicity = periodicity["habit_periodicity"]
@@ -171,27 +211,32 @@ def current_streak(storage, habit):
     dates = list(map(lambda row: datetime.strptime(row[0], "%Y-%m-%d").date(), result))
     if not dates:
         return f"No tracking data found for Habit {habit}"
-    sorted_dates = sorted(dates)
-    # Calculate gap between today and the latest completion date
-    gap_to_today = (datetime.now().date() - sorted_dates[len(sorted_dates) - 1]).days
-    if not check_gap(gap_to_today, periodicity, is_gap_to_today=True):
-        return create_return(habit, current_streak, is_success=False)
-    else:
-        current_streak += 1
-    if len(sorted_dates) > 1:
-        for i in range(len(sorted_dates)-1, 0, -1):
-            gap = (sorted_dates[i] - sorted_dates[i - 1]).days
-            if check_gap(gap, periodicity):
-                current_streak += 1
-            else:
-                return create_return(habit, current_streak)
-    else:
-        return create_return(habit, current_streak)
+    index = StreakRunIndex(sorted(dates), periodicity)
+    current_streak = index.current_streak(as_of or datetime.now().date())
+    return create_return(habit, current_streak, is_success=current_streak > 0)
 
 # endregion current streak
 
 # region completion rate
 
+def needs_archive(storage, habit, since):
+    """
+    Check whether archived completions can fall on or after a given date.
+
+    Uses the archive summary so window-based analytics skip decoding
+    the archived history when it ends before the window starts.
+
+    Args:
+        storage (HabitStorage): Database storage object
+        habit (str): Name of the habit
+        since (date): First day the caller needs
+
+    Returns:
+        bool: True if the archive has to be read
+    """
+    summary = storage.load_archive_summary(habit)
+    return summary is not None and summary["last_day"] >= since
+
 def get_completion(periodicity):
     """
     Calculate expected number of completions in 30-day window for given periodicity.
@@ -200,20 +245,16 @@ def get_completion(periodicity):
         periodicity (str): Periodicity for a habit
     
     Returns:
-        int: Expected number of completions in 30 days
+        float: Expected number of completions in 30 days
         - 30 for daily habits
         - 4 for weekly habits  
         - 1 for monthly habits
+        - 30 / N for every N days, 4 * N for N times per week
     """
-    days = 30
-    if periodicity == "daily":
-        return days / 1
-    elif periodicity == "weekly":
-        return days // 7
-    elif periodicity == "monthly":
-        return days / 30
+    return get_rule(periodicity).per_30_days
 
-def completion_rate(storage, habit):
+@track_analytics("completion_rate")
+def completion_rate(storage, habit, as_of=None):
     """
     Calculate completion rate for a given habit.
 
@@ -228,31 +269,419 @@ def completion_rate(storage, habit):
     daily (30 completions), weekly (4 completions), monthly (1 completion).
 
     Args:
-        storage (SQLiteStorage): Database storage object for accessing habit and tracking data
+        storage (HabitStorage): Database storage object for accessing habit and tracking data
         habit (str): Name of the habit for analytics
+        as_of (date, optional): End the 30-day window on this date instead of today
 
     Returns:
             str:
                 - 'Completion rate for the Habit {habit} is {completion_rate:.3g}%' (success)
                 - "Habit {habit} was not found" if habit doesn't exist in database.
     """
-    completion_rate = 0
-    today = datetime.now()
-    time_span_dt = today - timedelta(days=30)
-    time_span = time_span_dt.date()
-    result = storage.load_tracking_data(habit)
-    if result == "Habit name was not found":
+    as_of = as_of or datetime.now().date()
+    result = storage.load_tracking_data(habit, include_archive=needs_archive(storage, habit, as_of - timedelta(days=30)))
+    if result == HABIT_NOT_FOUND:
         return f"Habit {habit} was not found"
     periodicity = storage.load_habit(habit)
     periodicity = periodicity["habit_periodicity"]
-    expected_completions = get_completion(periodicity)
     dates = list(map(lambda row: datetime.strptime(row[0], "%Y-%m-%d").date(), result))
-    time_span_result = list(filter(lambda x: time_span <= x <= today.date(), dates))
-    completion_rate = (len(time_span_result) * 100) / expected_completions
+    index = StreakRunIndex(sorted(dates), periodicity)
+    completion_rate = index.completion_rate(as_of)
     return f'Completion rate for the Habit {habit} is {completion_rate:.3g}%'
 
 # endregion completion rate
 
+# region multi-window completion rates
+
+DEFAULT_WINDOWS = (7, 30, 90, 365)
+
+def expected_completions(periodicity, start, end):
+    """
+    Calendar-exact number of expected completions between two dates.
+
+    Unlike get_completion(), which approximates a 30-day window, this uses
+    the real window length: daily habits expect one completion per day,
+    weekly habits one per 7 days and monthly habits one per calendar month,
+    pro rata by the actual length of each month touched by the window.
+
+    Args:
+        periodicity (str): Periodicity string, see periodicity.get_rule()
+        start (date): First day of the window
+        end (date): Last day of the window (inclusive)
+
+    Returns:
+        float: Expected number of completions
+    """
+    return get_rule(periodicity).expected(start, end)
+
+def validate_windows(windows):
+    """
+    Validate window lengths.
+
+    Returns:
+        tuple: Window lengths in days
+
+    Raises:
+        ValueError: If there are no windows or a window is not a positive integer
+    """
+    windows = tuple(windows)
+    if not windows or any(not isinstance(window, int) or window < 1 for window in windows):
+        raise ValueError("Windows must be positive integers")
+    return windows
+
+def compute_window_rates(dates, periodicity, windows, as_of):
+    """
+    Completion rates for several windows ending on the same day.
+
+    Builds one prefix-sum array of completions per day ordinal over the
+    largest window, so every window is answered with one subtraction.
+
+    Args:
+        dates (iterable): Completion dates (datetime.date), any order
+        periodicity (str): Periodicity string, see periodicity.get_rule()
+        windows (iterable): Window lengths in days
+        as_of (date): Last day of every window
+
+    Returns:
+        dict: {window_days: completion_rate_percent}
+
+    Raises:
+        ValueError: If a window is not a positive integer
+    """
+    windows = validate_windows(windows)
+    span = max(windows)
+    base = as_of.toordinal() - span + 1
+
+    counts = [0] * span
+    for single_date in dates:
+        offset = single_date.toordinal() - base
+        if 0 <= offset < span:
+            counts[offset] += 1
+    prefix = [0] + list(accumulate(counts))
+
+    rule = get_rule(periodicity)
+    rates = {}
+    for window in windows:
+        completions = prefix[span] - prefix[span - window]
+        expected = rule.expected(as_of - timedelta(days=window - 1), as_of)
+        rates[window] = (completions * 100) / expected
+    return rates
+
+@track_analytics("completion_rates")
+def completion_rates(storage, habit, windows=DEFAULT_WINDOWS, as_of=None):
+    """
+    Calculate completion rates of one habit for many windows at once.
+
+    Loads and parses the habit's completions once for all windows.
+    A window of N days covers as_of and the N-1 days before it.
+
+    Args:
+        storage (HabitStorage): Database storage object for accessing habit and tracking data
+        habit (str): Name of the habit for analytics
+        windows (iterable): Window lengths in days, default 7/30/90/365
+        as_of (date, optional): Last day of every window, default today
+
+    Returns:
+        dict or str:
+            - {window_days: completion_rate_percent} (success)
+            - "Habit {habit} was not found" if habit doesn't exist in database
+    """
+    as_of = as_of or datetime.now().date()
+    windows = validate_windows(windows)
+    since = as_of - timedelta(days=max(windows) - 1)
+    result = storage.load_tracking_data(habit, include_archive=needs_archive(storage, habit, since))
+    if result == HABIT_NOT_FOUND:
+        return f"Habit {habit} was not found"
+    periodicity = storage.load_habit(habit)["habit_periodicity"]
+    dates = map(lambda row: datetime.strptime(row[0], "%Y-%m-%d").date(), result)
+    return compute_window_rates(dates, periodicity, windows, as_of)
+
+@track_analytics("completion_rate_report")
+def completion_rate_report(storage, windows=DEFAULT_WINDOWS, as_of=None, periodicity=None):
+    """
+    Calculate multi-window completion rates for all habits in one pass.
+
+    Streams the tracking table once via storage.iter_tracking_data().
+    Habits without tracking data are not included.
+
+    Args:
+        storage (HabitStorage): Database storage object for accessing habit and tracking data
+        windows (iterable): Window lengths in days, default 7/30/90/365
+        as_of (date, optional): Last day of every window, default today
+        periodicity (str, optional): Restrict to habits with this periodicity
+
+    Returns:
+        dict: {habit_name: {window_days: completion_rate_percent}}
+    """
+    as_of = as_of or datetime.now().date()
+    report = {}
+    for habit, habit_periodicity, values in storage.iter_tracking_data(periodicity):
+        dates = map(lambda value: datetime.strptime(value, "%Y-%m-%d").date(), values)
+        report[habit] = compute_window_rates(dates, habit_periodicity, windows, as_of)
+    return report
+
+# endregion multi-window completion rates
+
+# region as-of analytics
+
+class StreakRunIndex:
+
+    """
+    Sorted index of streak runs for point-in-time analytics of one habit.
+
+    Built once from a habit's sorted completion dates in O(n). Afterwards
+    streak and completion rate as of any date are answered by binary search
+    in O(log n), so a trend chart over every day of a year needs one scan
+    instead of one per day.
+
+    "N times per week" habits are indexed by ISO week instead: a streak is
+    the number of consecutive weeks with at least N completions. The week
+    of the reference date counts once it meets the quota; until then the
+    streak is still alive if the week before met it.
+
+    Attributes:
+        periodicity (str): Periodicity string
+        rule (PeriodicityRule): Gap rules resolved from periodicity
+        ordinals (list): Sorted completion dates as day ordinals
+        run_starts (list): Positions in ordinals where a current-streak run starts
+        longest_upto (list): Longest streak among ordinals[0..i] for each position i
+        weeks (list): Weekly quota only, sorted numbers of weeks that meet the quota
+        week_runs (list): Weekly quota only, streak in weeks ending with weeks[i]
+        longest_weeks (list): Weekly quota only, longest streak among weeks[0..i]
+    """
+
+    def __init__(self, sorted_dates, periodicity):
+        """
+        Build index from sorted completion dates.
+
+        Args:
+            sorted_dates (list): Completion dates (datetime.date), oldest first
+            periodicity (str): Periodicity string, see periodicity.get_rule()
+        """
+        self.periodicity = periodicity
+        self.rule = get_rule(periodicity)
+        self.ordinals = [single_date.toordinal() for single_date in sorted_dates]
+        self.run_starts = []
+        self.longest_upto = []
+        if self.rule.is_weekly_quota:
+            self._index_weeks()
+            return
+
+        min_gap, max_gap = self.rule.min_gap, self.rule.max_gap
+        dates_count = 1
+        longest_streak = 0
+        for i, ordinal in enumerate(self.ordinals):
+            if i == 0:
+                self.run_starts.append(i)
+            else:
+                gap = ordinal - self.ordinals[i - 1]
+                # Runs for current streak: any gap outside the rules starts a new run
+                if not min_gap <= gap <= max_gap:
+                    self.run_starts.append(i)
+                # Longest streak: same rules as count_longest_streak()
+                if min_gap <= gap <= max_gap:
+                    dates_count += 1
+                elif gap > max_gap:
+                    longest_streak = max(longest_streak, dates_count)
+                    dates_count = 1
+            self.longest_upto.append(max(longest_streak, dates_count))
+
+    def _index_weeks(self):
+        """Index the weeks that meet the quota of a "N times per week" habit."""
+        self.weeks = []
+        self.week_runs = []
+        self.longest_weeks = []
+        counts = {}
+        for ordinal in self.ordinals:
+            week = week_of(ordinal)
+            counts[week] = counts.get(week, 0) + 1
+        for week, count in counts.items():
+            if count < self.rule.n:
+                continue
+            run = self.week_runs[-1] + 1 if self.weeks and self.weeks[-1] == week - 1 else 1
+            self.weeks.append(week)
+            self.week_runs.append(run)
+            self.longest_weeks.append(max(run, self.longest_weeks[-1] if self.longest_weeks else 0))
+
+    def _week_streaks(self, as_of):
+        """
+        Return (current, longest) streak in weeks of a weekly quota habit as of a date.
+
+        Weeks before the week of as_of are complete; that week only counts
+        the completions up to as_of.
+        """
+        week = week_of(as_of.toordinal())
+        position = bisect_right(self.weeks, week - 1) - 1
+        previous = self.week_runs[position] if position >= 0 and self.weeks[position] == week - 1 else 0
+        longest = self.longest_weeks[position] if position >= 0 else 0
+        if self.count_between(date.fromordinal(7 * week + 1), as_of) >= self.rule.n:
+            return (previous + 1, max(longest, previous + 1))
+        return (previous, longest)
+
+    def _last_position(self, as_of):
+        """Return position of the latest completion on or before as_of, -1 if none."""
+        return bisect_right(self.ordinals, as_of.toordinal()) - 1
+
+    def current_streak(self, as_of):
+        """
+        Current streak as it was on a given date.
+
+        Args:
+            as_of (date): Reference date
+
+        Returns:
+            int: Length of the streak, 0 if broken or no completions yet
+        """
+        if self.rule.is_weekly_quota:
+            return self._week_streaks(as_of)[0]
+        position = self._last_position(as_of)
+        if position < 0:
+            return 0
+        if not self.rule.is_valid_gap_to_today(as_of.toordinal() - self.ordinals[position]):
+            return 0
+        run_start = self.run_starts[bisect_right(self.run_starts, position) - 1]
+        return position - run_start + 1
+
+    def longest_streak(self, as_of):
+        """
+        Longest streak among completions on or before a given date.
+
+        Args:
+            as_of (date): Reference date
+
+        Returns:
+            int: Length of the longest streak, 0 if no completions yet
+        """
+        if self.rule.is_weekly_quota:
+            return self._week_streaks(as_of)[1]
+        position = self._last_position(as_of)
+        return self.longest_upto[position] if position >= 0 else 0
+
+    def breaks_on(self, as_of):
+        """
+        First day the current streak is broken if no completion follows as_of.
+
+        Args:
+            as_of (date): Reference date
+
+        Returns:
+            int or None: Day ordinal, None if there is no current streak
+        """
+        if self.current_streak(as_of) == 0:
+            return None
+        if self.rule.is_weekly_quota:
+            # A week that met the quota keeps the streak alive through the following week
+            week = week_of(as_of.toordinal())
+            met = self.count_between(date.fromordinal(7 * week + 1), as_of) >= self.rule.n
+            return 7 * (week + (2 if met else 1)) + 1
+        return self.ordinals[self._last_position(as_of)] + self.rule.max_gap_to_today + 1
+
+    def count_between(self, start, end):
+        """Return number of completions with start <= date <= end."""
+        return (bisect_right(self.ordinals, end.toordinal())
+                - bisect_right(self.ordinals, start.toordinal() - 1))
+
+    def completion_rate(self, as_of):
+        """
+        Completion rate in the 30-day window ending on a given date.
+
+        Args:
+            as_of (date): Last day of the window
+
+        Returns:
+            float: Completion rate in percent
+        """
+        completions = self.count_between(as_of - timedelta(days=30), as_of)
+        return (completions * 100) / self.rule.per_30_days
+
+def build_streak_index(storage, habit):
+    """
+    Build a StreakRunIndex for a given habit.
+
+    Args:
+        storage (HabitStorage): Database storage object for accessing habit and tracking data
+        habit (str): Name of the habit for analytics
+
+    Returns:
+        StreakRunIndex or str:
+            - StreakRunIndex (success)
+            - "Habit {habit} was not found" if habit doesn't exist in database
+    """
+    result = storage.load_tracking_data(habit)
+    if result == HABIT_NOT_FOUND:
+        return f"Habit {habit} was not found"
+    periodicity = storage.load_habit(habit)["habit_periodicity"]
+    dates = list(map(lambda row: datetime.strptime(row[0], "%Y-%m-%d").date(), result))
+    return StreakRunIndex(sorted(dates), periodicity)
+
+@track_analytics("streak_history")
+def streak_history(storage, habit, start, end):
+    """
+    Daily streak values of a habit for a historical date range.
+
+    Loads the habit's completions once and answers each day by binary
+    search, for backfilling trend charts.
+
+    Args:
+        storage (HabitStorage): Database storage object for accessing habit and tracking data
+        habit (str): Name of the habit for analytics
+        start (date): First day of the range
+        end (date): Last day of the range (inclusive)
+
+    Returns:
+        list or str:
+            - [(date, current_streak, longest_streak), ...] for every day in range (success)
+            - "Habit {habit} was not found" if habit doesn't exist in database
+    """
+    index = build_streak_index(storage, habit)
+    if isinstance(index, str):
+        return index
+    days = map(lambda offset: start + timedelta(days=offset), range((end - start).days + 1))
+    return list(map(lambda day: (day, index.current_streak(day), index.longest_streak(day)), days))
+
+# endregion as-of analytics
+
+# region streak leaderboard
+
+@track_analytics("streak_leaderboard")
+def streak_leaderboard(storage, k=10, metric="longest", periodicity=None):
+    """
+    Return the top k habits by longest or current streak.
+
+    Streams completion dates habit by habit from storage and keeps only
+    the best k streaks in a bounded heap (heapq.nlargest), so the full
+    habit population is never sorted or held in memory.
+
+    Args:
+        storage (HabitStorage): Database storage object for accessing habit and tracking data
+        k (int): Number of habits to return
+        metric (str): "longest" or "current"
+        periodicity (str, optional): Restrict to habits with this periodicity
+
+    Returns:
+        list: [(habit_name, streak_count), ...] sorted by streak, best first.
+        Ties keep storage order. Habits without tracking data are skipped.
+
+    Raises:
+        ValueError: If metric is not "longest" or "current"
+    """
+    if metric == "longest":
+        count = lambda dates, habit_periodicity: count_longest_streak(dates, habit_periodicity)
+    elif metric == "current":
+        today = datetime.now().date()
+        count = lambda dates, habit_periodicity: count_current_streak(dates, habit_periodicity, today)
+    else:
+        raise ValueError("Invalid metric")
+
+    def streaks():
+        for habit, habit_periodicity, values in storage.iter_tracking_data(periodicity):
+            dates = sorted(map(lambda value: datetime.strptime(value, "%Y-%m-%d").date(), values))
+            yield (habit, count(dates, habit_periodicity))
+
+    return heapq.nlargest(k, streaks(), key=lambda item: item[1])
+
+# endregion streak leaderboard
+
 # region longest streak by periodicity
 
 def extract_streak_number(result):
@@ -263,12 +692,15 @@ def extract_streak_number(result):
         if word == "is":
             return int(words[i+1])
 
+@track_analytics("longest_streak_by_periodicity")
 def longest_streak_by_periodicity(storage):
     """
     Find longest streaks grouped by periodicity.
     
     Returns longest streak for each periodicity type separately,
-    allowing meaningful comparisons within same frequency.
+    allowing meaningful comparisons within same frequency. Covers daily,
+    weekly and monthly plus every other periodicity habits use, such as
+    "every 3 days" or "3 times per week".
     
     Returns:
         dict: {
@@ -279,7 +711,7 @@ def longest_streak_by_periodicity(storage):
     """
     results = []
     
-    for periodicity in ["daily", "weekly", "monthly"]:
+    for periodicity in report_periodicities(storage.load_periodicities()):
         habits = storage.load_all_habits_by_periodicity(periodicity)
         
         if not habits:
@@ -287,17 +719,11 @@ def longest_streak_by_periodicity(storage):
         else: 
             best_habit = None
             best_streak = 0
-            
-            for habit in habits:
-                streak_result = longest_streak(storage, habit)
-                # Extract streak number from "The longest streak for Habit X is Y days"
-                streak_count = extract_streak_number(streak_result)
-                if not streak_count:
-                    break
-                
-                if streak_count > best_streak:
-                    best_streak = streak_count
-                    best_habit = habit
+
+            # Single-entry leaderboard instead of formatting and parsing every habit's streak
+            leaderboard = streak_leaderboard(storage, k=1, periodicity=periodicity)
+            if leaderboard:
+                best_habit, best_streak = leaderboard[0]
             
             results.append(f'Best {periodicity.capitalize()} Habit: {best_habit} with {best_streak} streak')
     
@@ -0,0 +1,99 @@
+"""
+Memoization layer for analytics results.
+
+Caches results of analytics functions per habit with LRU eviction. Entries
+are keyed on the storage change marker and the current date, so they are
+invalidated exactly when the habit's data changes or the day rolls over.
+"""
+
+# region imports
+from collections import OrderedDict
+from datetime import datetime
+
+from metrics import REGISTRY
+
+# endregion imports
+
+CACHE_REQUESTS = REGISTRY.counter(
+    "habit_tracker_analytics_cache_requests_total", "Analytics cache lookups", ("result",))
+
+
+class AnalyticsCache:
+
+    """
+    LRU cache of analytics results bound to one storage object.
+
+    Attributes:
+        storage (HabitStorage): Storage whose data the cached results are based on
+        maxsize (int): Maximum number of cached results
+        hits (int): Number of lookups answered from the cache
+        misses (int): Number of lookups that had to compute the result
+    """
+
+    def __init__(self, storage, maxsize=256):
+        """
+        Initialize an empty cache.
+
+        Args:
+            storage (HabitStorage): Storage passed to the analytics functions
+            maxsize (int): Maximum number of cached results, must be positive
+
+        Raises:
+            ValueError: If maxsize is smaller than 1
+        """
+        if maxsize < 1:
+            raise ValueError("Cache size must be positive")
+        self.storage = storage
+        self.maxsize = maxsize
+        self.hits = 0
+        self.misses = 0
+        self._entries = OrderedDict()
+
+    def get(self, func, habit=None, **kwargs):
+        """
+        Return analytics result from cache or compute and store it.
+
+        Args:
+            func (callable): Analytics function taking (storage, habit, **kwargs),
+                or (storage, **kwargs) if habit is None
+            habit (str, optional): Habit name, None for functions over all habits
+            **kwargs: Additional hashable keyword arguments for func
+
+        Returns:
+            Result of func for current data and date.
+
+        Example:
+            cache = AnalyticsCache(storage)
+            message = cache.get(longest_streak, "running")
+        """
+        key = (
+            func.__module__,
+            func.__qualname__,
+            habit,
+            tuple(sorted(kwargs.items())),
+            self.storage.change_marker(habit),
+            datetime.now().date()
+        )
+        if key in self._entries:
+            self._entries.move_to_end(key)
+            self.hits += 1
+            CACHE_REQUESTS.inc(result="hit")
+            return self._entries[key]
+
+        self.misses += 1
+        CACHE_REQUESTS.inc(result="miss")
+        if habit is None:
+            result = func(self.storage, **kwargs)
+        else:
+            result = func(self.storage, habit, **kwargs)
+        self._entries[key] = result
+        if len(self._entries) > self.maxsize:
+            self._entries.popitem(last=False)
+        return result
+
+    def clear(self):
+        """Remove all cached results."""
+        self._entries.clear()
+
+    def __len__(self):
+        return len(self._entries)
@@ -0,0 +1,457 @@
+"""
+Local HTTP/JSON API server for habits and completions.
+
+Exposes habit CRUD, completion tracking and analytics on top of
+SQLiteStorage and analytics.py using asyncio streams, with HTTP/1.1
+keep-alive, a batch endpoint and cached analytics responses.
+
+Usage:
+    python api_server.py --db habits.db --port 8080
+"""
+
+# region imports
+import sys
+import json
+import asyncio
+import argparse
+from http import HTTPStatus
+from datetime import date, datetime
+from urllib.parse import urlsplit, parse_qs, unquote
+
+from habits import Habit
+from storage import SQLiteStorage, RetryPolicy, INVALID_HABIT_NAME, HABIT_NOT_FOUND, NO_DATA_FOUND
+from analytics import longest_streak, current_streak, completion_rate, streak_leaderboard
+from analytics_cache import AnalyticsCache
+from main import setup_database
+from replica import ReplicaRefresher, ReplicaStorage
+from scheduler import due_habits, at_risk_habits
+from tags import tag_statistics
+from maintenance import MaintenanceScheduler
+
+# endregion imports
+
+MAX_HEADER_BYTES = 64 * 1024
+MAX_BODY_BYTES = 1024 * 1024
+MAX_BATCH_REQUESTS = 100
+MAX_CHANGES_PER_PAGE = 1000
+MAX_REMINDERS = 100
+IDLE_TIMEOUT = 15.0
+
+STORAGE_ERRORS = {
+    INVALID_HABIT_NAME: HTTPStatus.BAD_REQUEST,
+    HABIT_NOT_FOUND: HTTPStatus.NOT_FOUND
+}
+
+
+def habit_analytics(storage, habit):
+    """
+    Collect all analytics messages for a habit in one payload.
+
+    Args:
+        storage (HabitStorage): Database storage object
+        habit (str): Name of the habit for analytics
+
+    Returns:
+        dict: Longest streak, current streak and completion rate messages
+    """
+    return {
+        "habit": habit,
+        "longest_streak": longest_streak(storage, habit),
+        "current_streak": current_streak(storage, habit),
+        "completion_rate": completion_rate(storage, habit)
+    }
+
+
+def string_field(body, field, required=True):
+    """
+    Return a string field of a JSON object body.
+
+    Args:
+        body (dict): Decoded JSON object
+        field (str): Field name
+        required (bool): Whether a missing or null field is an error
+
+    Returns:
+        str or None: Field value, None if optional and missing
+
+    Raises:
+        ValueError: If the field is missing or not a string
+    """
+    value = body.get(field)
+    if value is None and not required:
+        return None
+    if not isinstance(value, str):
+        raise ValueError(f"Field {field} must be a string")
+    return value
+
+
+# region HabitAPI class
+class HabitAPI:
+
+    """
+    Request router translating JSON API calls into storage and analytics calls.
+
+    Independent of the network layer, so it can be used and tested without
+    sockets. Storage calls are synchronous: SQLite is local and the
+    statements are short, so they run directly on the event loop thread.
+
+    Attributes:
+        storage (HabitStorage): Database storage object
+        report_storage (HabitStorage): Storage analytics are read from, a read
+            replica or storage itself
+        cache (AnalyticsCache): Cache for analytics responses
+    """
+
+    def __init__(self, storage, cache=None, report_storage=None):
+        self.storage = storage
+        self.report_storage = report_storage or storage
+        self.cache = cache or AnalyticsCache(self.report_storage)
+
+    def handle(self, method, target, body=None):
+        """
+        Handle a single API request.
+
+        Args:
+            method (str): HTTP method
+            target (str): Request target, path with optional query string
+            body (object, optional): Decoded JSON body
+
+        Returns:
+            tuple: (status: int, payload: dict or list)
+        """
+        url = urlsplit(target)
+        parts = [unquote(part) for part in url.path.split("/") if part]
+        query = {key: values[-1] for key, values in parse_qs(url.query).items()}
+
+        try:
+            if parts == ["habits"]:
+                if method == "GET":
+                    return self.list_habits(query)
+                if method == "POST":
+                    return self.create_habit(body)
+            elif len(parts) == 2 and parts[0] == "habits":
+                if method == "GET":
+                    return self.get_habit(parts[1])
+                if method == "DELETE":
+                    return self.delete_habit(parts[1])
+            elif len(parts) == 3 and parts[0] == "habits" and parts[2] == "completions":
+                if method == "GET":
+                    return self.list_completions(parts[1])
+                if method == "POST":
+                    return self.create_completion(parts[1], body)
+            elif len(parts) == 4 and parts[0] == "habits" and parts[2] == "completions":
+                if method == "DELETE":
+                    return self.delete_completion(parts[1], parts[3])
+            elif len(parts) == 3 and parts[0] == "habits" and parts[2] == "analytics":
+                if method == "GET":
+                    return (HTTPStatus.OK, self.cache.get(habit_analytics, parts[1]))
+            elif parts == ["leaderboard"]:
+                if method == "GET":
+                    return self.leaderboard(query)
+            elif parts == ["changes"]:
+                if method == "GET":
+                    return self.list_changes(query)
+            elif parts == ["reminders"]:
+                if method == "GET":
+                    return self.reminders(query)
+            elif parts == ["tags"]:
+                if method == "GET":
+                    return self.tag_statistics(query)
+            elif parts == ["batch"]:
+                if method == "POST":
+                    return self.batch(body)
+            else:
+                return (HTTPStatus.NOT_FOUND, {"error": "Not found"})
+            return (HTTPStatus.METHOD_NOT_ALLOWED, {"error": "Method not allowed"})
+        except ValueError as e:
+            return (HTTPStatus.BAD_REQUEST, {"error": str(e)})
+
+    # region Endpoints
+    def list_habits(self, query):
+        periodicity = query.get("periodicity")
+        if periodicity:
+            habits = self.storage.load_all_habits_by_periodicity(periodicity)
+        else:
+            habits = self.storage.load_all_habits()
+        return (HTTPStatus.OK, {"habits": habits})
+
+    def create_habit(self, body):
+        if not isinstance(body, dict):
+            raise ValueError("Expected JSON object")
+        habit = Habit(string_field(body, "name"), string_field(body, "periodicity"),
+                      string_field(body, "description", required=False))
+        if not self.storage.save_habit(habit):
+            return (HTTPStatus.CONFLICT, {"error": "Habit already exists"})
+        return (HTTPStatus.CREATED, {"habit": habit.name})
+
+    def get_habit(self, name):
+        row = self.storage.load_habit(name)
+        if row is None:
+            return (HTTPStatus.NOT_FOUND, {"error": HABIT_NOT_FOUND})
+        return (HTTPStatus.OK, {
+            "habit": row["habit_name"],
+            "periodicity": row["habit_periodicity"],
+            "description": row["habit_description"]
+        })
+
+    def delete_habit(self, name):
+        success, message = self.storage.delete_habit_chunked(name)
+        return (HTTPStatus.OK if success else HTTPStatus.NOT_FOUND, {"message": message})
+
+    def list_completions(self, name):
+        result = self.storage.load_tracking_data(name)
+        if isinstance(result, str):
+            return (STORAGE_ERRORS[result], {"error": result})
+        return (HTTPStatus.OK, {"habit": name, "completions": sorted(row[0] for row in result)})
+
+    def create_completion(self, name, body):
+        completion_date = datetime.now().date()
+        if isinstance(body, dict) and body.get("date"):
+            completion_date = date.fromisoformat(string_field(body, "date"))
+        success, message = self.storage.save_tracking_data((name, completion_date))
+        if not success:
+            return (STORAGE_ERRORS[message], {"error": message})
+        return (HTTPStatus.CREATED, {"message": message, "date": str(completion_date)})
+
+    def delete_completion(self, name, completion_date):
+        message = self.storage.delete_tracking_data((name, date.fromisoformat(completion_date)))
+        if message in STORAGE_ERRORS:
+            return (STORAGE_ERRORS[message], {"error": message})
+        if message == NO_DATA_FOUND:
+            return (HTTPStatus.NOT_FOUND, {"error": message})
+        return (HTTPStatus.OK, {"message": message})
+
+    def leaderboard(self, query):
+        k = int(query.get("k", 10))
+        result = self.cache.get(
+            streak_leaderboard, k=k, metric=query.get("metric", "longest"), periodicity=query.get("periodicity"))
+        return (HTTPStatus.OK, {"leaderboard": [{"habit": habit, "streak": streak} for habit, streak in result]})
+
+    def list_changes(self, query):
+        """
+        Page through the change log.
+
+        Query: since (last processed sequence number), limit (page size).
+        Clients pass the returned last_seq as since of the next request.
+        """
+        since = int(query.get("since", 0))
+        limit = min(int(query.get("limit", MAX_CHANGES_PER_PAGE)), MAX_CHANGES_PER_PAGE)
+        if limit < 1:
+            raise ValueError("Limit must be positive")
+        changes = []
+        for seq, operation, habit, completion_date in self.storage.changes_since(since, batch_size=limit):
+            changes.append({"seq": seq, "operation": operation, "habit": habit, "date": completion_date})
+            if len(changes) == limit:
+                break
+        return (HTTPStatus.OK, {"changes": changes, "last_seq": changes[-1]["seq"] if changes else since})
+
+    def reminders(self, query):
+        """
+        List due habits and habits whose streak is at risk.
+
+        Query: date (reference date, default today), within_days (look-ahead
+        for at-risk streaks, default 0), limit (maximum habits per list).
+        """
+        today = date.fromisoformat(query["date"]) if query.get("date") else None
+        within_days = int(query.get("within_days", 0))
+        limit = min(int(query.get("limit", MAX_REMINDERS)), MAX_REMINDERS)
+        if limit < 1:
+            raise ValueError("Limit must be positive")
+        return (HTTPStatus.OK, {
+            "due": [{"habit": habit, "due_on": str(due_on) if due_on else None}
+                    for habit, due_on in due_habits(self.storage, today, limit)],
+            "at_risk": [{"habit": habit, "last_day": str(last_day), "last_completion": str(last_completion)}
+                        for habit, last_day, last_completion in at_risk_habits(self.storage, today, within_days, limit)]
+        })
+
+    def tag_statistics(self, query):
+        """
+        Report statistics per tag.
+
+        Query: tags (comma-separated tag names, default all), date (reference date, default today).
+        """
+        tags = [tag for tag in query["tags"].split(",") if tag.strip()] if query.get("tags") else None
+        as_of = date.fromisoformat(query["date"]) if query.get("date") else None
+        return (HTTPStatus.OK, {"tags": tag_statistics(self.report_storage, tags, as_of)})
+
+    def batch(self, body):
+        """
+        Run several requests in one round trip.
+
+        Body: {"requests": [{"method": "GET", "path": "/habits", "body": {...}}, ...]}
+        Nested batches are not allowed.
+        """
+        if not isinstance(body, dict) or not isinstance(body.get("requests"), list):
+            raise ValueError("Expected {\"requests\": [...]}")
+        if len(body["requests"]) > MAX_BATCH_REQUESTS:
+            raise ValueError(f"At most {MAX_BATCH_REQUESTS} requests per batch")
+        responses = []
+        for request in body["requests"]:
+            if not isinstance(request, dict):
+                raise ValueError("Expected JSON object per request")
+            method = str(request.get("method", "GET")).upper()
+            path = str(request.get("path", ""))
+            if urlsplit(path).path.strip("/") == "batch":
+                status, payload = (HTTPStatus.BAD_REQUEST, {"error": "Nested batch requests are not allowed"})
+            else:
+                status, payload = self.handle(method, path, request.get("body"))
+            responses.append({"status": int(status), "body": payload})
+        return (HTTPStatus.OK, {"responses": responses})
+    # endregion Endpoints
+# endregion HabitAPI class
+
+
+# region HTTP layer
+async def read_request(reader):
+    """
+    Read one HTTP/1.1 request from a stream.
+
+    Returns:
+        tuple or None: (method, target, headers, body_bytes), None on clean EOF
+
+    Raises:
+        ValueError: If the request is malformed or too large
+    """
+    try:
+        head = await reader.readuntil(b"\r\n\r\n")
+    except asyncio.IncompleteReadError as e:
+        if not e.partial:
+            return None
+        raise ValueError("Incomplete request")
+    except asyncio.LimitOverrunError:
+        raise ValueError("Request header too large")
+
+    lines = head.decode("latin-1").split("\r\n")
+    try:
+        method, target, version = lines[0].split(" ")
+    except ValueError:
+        raise ValueError("Malformed request line")
+    headers = {}
+    for line in lines[1:]:
+        if line:
+            name, _, value = line.partition(":")
+            headers[name.strip().lower()] = value.strip()
+
+    length = int(headers.get("content-length", 0) or 0)
+    if length > MAX_BODY_BYTES:
+        raise ValueError("Request body too large")
+    body = await reader.readexactly(length) if length else b""
+    headers[":version"] = version
+    return (method.upper(), target, headers, body)
+
+
+def render_response(status, payload, keep_alive):
+    """Serialize status and JSON payload as an HTTP/1.1 response."""
+    body = json.dumps(payload).encode("utf-8")
+    status = HTTPStatus(status)
+    head = (
+        f"HTTP/1.1 {status.value} {status.phrase}\r\n"
+        "Content-Type: application/json\r\n"
+        f"Content-Length: {len(body)}\r\n"
+        f"Connection: {'keep-alive' if keep_alive else 'close'}\r\n"
+        "\r\n"
+    )
+    return head.encode("latin-1") + body
+
+
+async def handle_connection(api, reader, writer):
+    """Serve requests on one connection until client closes or idles out."""
+    try:
+        while True:
+            try:
+                request = await asyncio.wait_for(read_request(reader), IDLE_TIMEOUT)
+            except (asyncio.TimeoutError, ConnectionError):
+                break
+            except ValueError as e:
+                writer.write(render_response(HTTPStatus.BAD_REQUEST, {"error": str(e)}, False))
+                await writer.drain()
+                break
+            if request is None:
+                break
+
+            method, target, headers, raw_body = request
+            keep_alive = headers.get("connection", "").lower() != "close" and headers[":version"] == "HTTP/1.1"
+            try:
+                body = json.loads(raw_body) if raw_body else None
+            except json.JSONDecodeError:
+                status, payload = (HTTPStatus.BAD_REQUEST, {"error": "Invalid JSON body"})
+            else:
+                try:
+                    status, payload = api.handle(method, target, body)
+                except Exception as e:
+                    # Answer instead of dropping the connection, e.g. on sqlite3 errors
+                    print(f"{method} {target} failed: {e!r}", file=sys.stderr)
+                    status, payload = (HTTPStatus.INTERNAL_SERVER_ERROR, {"error": "Internal server error"})
+
+            writer.write(render_response(status, payload, keep_alive))
+            await writer.drain()
+            if not keep_alive:
+                break
+    finally:
+        writer.close()
+
+
+async def start_server(api, host="127.0.0.1", port=8080):
+    """
+    Start the API server.
+
+    Args:
+        api (HabitAPI): Request router
+        host (str): Address to bind to, loopback by default
+        port (int): TCP port, 0 picks a free port
+
+    Returns:
+        asyncio.Server: Running server
+    """
+    return await asyncio.start_server(
+        lambda reader, writer: handle_connection(api, reader, writer),
+        host, port, limit=MAX_HEADER_BYTES)
+# endregion HTTP layer
+
+
+def main(argv=None):
+    """Run the API server until interrupted."""
+    parser = argparse.ArgumentParser(description="Habit tracker HTTP/JSON API")
+    parser.add_argument("--db", default="habits.db", help="SQLite database file")
+    parser.add_argument("--host", default="127.0.0.1", help="Address to bind to")
+    parser.add_argument("--port", type=int, default=8080, help="TCP port")
+    parser.add_argument("--replica", default=None, help="Serve analytics from this read replica file")
+    parser.add_argument("--replica-interval", type=float, default=60.0, help="Seconds between replica refreshes")
+    parser.add_argument("--maintenance-interval", type=float, default=None,
+                        help="Run database maintenance every INTERVAL seconds")
+    args = parser.parse_args(argv)
+
+    conn = setup_database(args.db)
+    refresher = None
+    report_storage = None
+    if args.replica:
+        refresher = ReplicaRefresher(args.db, args.replica, args.replica_interval)
+        refresher.start()
+        report_storage = ReplicaStorage(args.replica)
+    api = HabitAPI(SQLiteStorage(conn, retry_policy=RetryPolicy()), report_storage=report_storage)
+    maintenance = None
+    if args.maintenance_interval:
+        maintenance = MaintenanceScheduler(args.db, args.maintenance_interval)
+        maintenance.start()
+
+    async def run():
+        server = await start_server(api, args.host, args.port)
+        print(f"Serving habit API on http://{args.host}:{args.port}", file=sys.stderr)
+        async with server:
+            await server.serve_forever()
+
+    try:
+        asyncio.run(run())
+    except KeyboardInterrupt:
+        pass
+    finally:
+        if refresher is not None:
+            refresher.close()
+            report_storage.close()
+        if maintenance is not None:
+            maintenance.close()
+        conn.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,197 @@
+"""
+Cold archive tier for old completions.
+
+Compacts completions older than a cutoff into one row per habit in the
+tracking_archive table: day ordinals are delta-encoded as varints and
+zlib-compressed into a blob, next to a small summary (count, first and
+last day). SQLiteStorage reads archived completions transparently.
+"""
+
+# region imports
+import zlib
+import sqlite3
+import argparse
+from datetime import date, datetime, timedelta
+
+# endregion imports
+
+DEFAULT_ARCHIVE_AGE_DAYS = 3 * 365
+
+
+# region Codec
+def encode_days(ordinals):
+    """
+    Encode sorted day ordinals as zlib-compressed varint deltas.
+
+    The first value is stored as is, every following value as the
+    difference to its predecessor (0 for duplicate completions).
+
+    Args:
+        ordinals (list): Day ordinals (date.toordinal()), ascending
+
+    Returns:
+        bytes: Compressed blob
+    """
+    buffer = bytearray()
+    previous = 0
+    for ordinal in ordinals:
+        value = ordinal - previous
+        if value < 0:
+            raise ValueError("Ordinals must be sorted")
+        previous = ordinal
+        while value >= 0x80:
+            buffer.append((value & 0x7F) | 0x80)
+            value >>= 7
+        buffer.append(value)
+    return zlib.compress(bytes(buffer), 9)
+
+
+def decode_days(blob):
+    """
+    Decode a blob created by encode_days().
+
+    Args:
+        blob (bytes): Compressed blob
+
+    Returns:
+        list: Day ordinals, ascending
+    """
+    data = zlib.decompress(blob)
+    ordinals = []
+    previous = 0
+    value = 0
+    shift = 0
+    for byte in data:
+        value |= (byte & 0x7F) << shift
+        if byte & 0x80:
+            shift += 7
+            continue
+        previous += value
+        ordinals.append(previous)
+        value = 0
+        shift = 0
+    return ordinals
+# endregion Codec
+
+
+# region Schema
+def ensure_archive_schema(connection):
+    """
+    Create the tracking_archive table if it doesn't exist.
+
+    Args:
+        connection (sqlite3.Connection): Database connection
+    """
+    connection.execute("""
+        CREATE TABLE IF NOT EXISTS tracking_archive(
+            habit_id INTEGER PRIMARY KEY,
+            completion_count INTEGER NOT NULL,
+            first_day INTEGER NOT NULL,
+            last_day INTEGER NOT NULL,
+            day_blob BLOB NOT NULL,
+
+            FOREIGN KEY (habit_id) REFERENCES habits(habit_id) ON DELETE CASCADE)
+    """)
+    connection.commit()
+
+
+def database_size(connection):
+    """Return database file size in bytes from page_count * page_size."""
+    page_count = connection.execute("PRAGMA page_count").fetchone()[0]
+    page_size = connection.execute("PRAGMA page_size").fetchone()[0]
+    return page_count * page_size
+# endregion Schema
+
+
+# region Archiving
+def archive_completions(storage, older_than_days=DEFAULT_ARCHIVE_AGE_DAYS, today=None, vacuum=False):
+    """
+    Move completions older than a cutoff from tracking into the archive.
+
+    Each habit is compacted in its own transaction. Completions already
+    archived for a habit are merged with the newly archived ones.
+
+    Args:
+        storage (SQLiteStorage): Database storage object
+        older_than_days (int): Archive completions older than this many days
+        today (date, optional): Reference date, default today
+        vacuum (bool): Run VACUUM afterwards to give freed pages back to the file system
+
+    Returns:
+        dict: {"habits": int, "rows_archived": int, "bytes_before": int, "bytes_after": int}
+    """
+    connection = storage.connection
+    ensure_archive_schema(connection)
+    cutoff = ((today or datetime.now().date()) - timedelta(days=older_than_days)).toordinal()
+    bytes_before = database_size(connection)
+
+    habit_ids = [row[0] for row in connection.execute("SELECT DISTINCT habit_id FROM tracking")]
+    habits = 0
+    rows_archived = 0
+    for habit_id in habit_ids:
+        rows = connection.execute(
+            "SELECT completion_date FROM tracking WHERE habit_id = ?", (habit_id,)).fetchall()
+        old = []
+        for (completion_date,) in rows:
+            ordinal = datetime.strptime(completion_date, "%Y-%m-%d").date().toordinal()
+            if ordinal < cutoff:
+                old.append((completion_date, ordinal))
+        if not old:
+            continue
+
+        existing = connection.execute(
+            "SELECT day_blob FROM tracking_archive WHERE habit_id = ?", (habit_id,)).fetchone()
+        ordinals = decode_days(existing[0]) if existing else []
+        ordinals = sorted(ordinals + [ordinal for _, ordinal in old])
+        try:
+            connection.execute("""
+                INSERT OR REPLACE INTO tracking_archive
+                (habit_id, completion_count, first_day, last_day, day_blob)
+                VALUES (?, ?, ?, ?, ?)
+                """, (habit_id, len(ordinals), ordinals[0], ordinals[-1], encode_days(ordinals)))
+            # By key instead of tracking_id, which the clustered layout doesn't have
+            connection.executemany(
+                "DELETE FROM tracking WHERE habit_id = ? AND completion_date = ?",
+                [(habit_id, completion_date) for completion_date in {completion_date for completion_date, _ in old}])
+            connection.commit()
+        except Exception as e:
+            connection.rollback()
+            raise e
+        habits += 1
+        rows_archived += len(old)
+
+    if vacuum:
+        connection.execute("VACUUM")
+    return {
+        "habits": habits,
+        "rows_archived": rows_archived,
+        "bytes_before": bytes_before,
+        "bytes_after": database_size(connection)
+    }
+# endregion Archiving
+
+
+def main(argv=None):
+    """Archive old completions of a database file from the command line."""
+    # Imported here because storage.py imports this module for decoding
+    from storage import SQLiteStorage
+
+    parser = argparse.ArgumentParser(description="Compact old completions into the archive tier")
+    parser.add_argument("--db", default="habits.db", help="SQLite database file")
+    parser.add_argument("--older-than-days", type=int, default=DEFAULT_ARCHIVE_AGE_DAYS)
+    parser.add_argument("--vacuum", action="store_true", help="Shrink the file afterwards")
+    args = parser.parse_args(argv)
+
+    conn = sqlite3.connect(args.db)
+    conn.execute("PRAGMA foreign_keys = ON")
+    try:
+        report = archive_completions(SQLiteStorage(conn), args.older_than_days, vacuum=args.vacuum)
+    finally:
+        conn.close()
+    print(f'Archived {report["rows_archived"]} completions of {report["habits"]} habits, '
+          f'{report["bytes_before"]} -> {report["bytes_after"]} bytes')
+    return 0
+
+
+if __name__ == "__main__":
+    main()
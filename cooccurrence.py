@@ -0,0 +1,244 @@
+"""
+Cross-habit co-occurrence analytics.
+
+Finds habits that tend to be completed on the same days. Completions are
+laid out as a habits x days boolean matrix; pairwise co-completion counts
+are the matrix product M @ M.T, from which Jaccard similarity and the phi
+correlation coefficient follow without per-pair Python loops.
+
+The product is computed in tiles of BLOCK_ROWS x BLOCK_ROWS habits, only
+the two blocks of a tile are unpacked, and every tile is merged into the
+best k pairs right away. Besides the packed matrix (habits x days / 8
+bytes), memory is O(BLOCK_ROWS * (BLOCK_ROWS + days) + k), independent
+of the number of habits and pairs.
+"""
+
+# region imports
+import math
+from datetime import date, datetime, timedelta
+
+import numpy as np
+
+from metrics import track_analytics
+
+# endregion imports
+
+DEFAULT_WINDOW_DAYS = 365
+# Habits per side of a tile, bounds the unpacked blocks, their product and its scores
+BLOCK_ROWS = 1024
+METRICS = ("count", "jaccard", "phi")
+
+
+# region Matrix
+def build_matrix(storage, start=None, end=None, periodicity=None):
+    """
+    Build the habits x days completion matrix for a date window.
+
+    Streams tracking data once via storage.iter_tracking_data(). Habits
+    without completions in the window are left out.
+
+    Args:
+        storage (HabitStorage): Database storage object
+        start (date, optional): First day, default DEFAULT_WINDOW_DAYS before end
+        end (date, optional): Last day (inclusive), default today
+        periodicity (str, optional): Restrict to habits of one periodicity
+
+    Returns:
+        tuple: (habits: list of str, days: int, rows) where rows is a packed
+        numpy uint8 array (habits x ceil(days / 8))
+    """
+    end = end or datetime.now().date()
+    start = start or end - timedelta(days=DEFAULT_WINDOW_DAYS - 1)
+    if start > end:
+        raise ValueError("Start must not be after end")
+    base, days = start.toordinal(), (end - start).days + 1
+
+    habits = []
+    rows = []
+    for habit, _, values in storage.iter_tracking_data(periodicity):
+        bits = 0
+        for value in values:
+            offset = date.fromisoformat(value).toordinal() - base
+            if 0 <= offset < days:
+                bits |= 1 << offset
+        if bits:
+            habits.append(habit)
+            rows.append(bits)
+
+    # Little-endian int bytes match packbits(bitorder="little") bit positions
+    width = (days + 7) // 8
+    packed = np.frombuffer(b"".join(bits.to_bytes(width, "little") for bits in rows), dtype=np.uint8)
+    return (habits, days, packed.reshape(len(habits), width))
+
+
+def unpack_block(rows, first, days):
+    """Unpack the BLOCK_ROWS habits from first on to a float32 0/1 matrix."""
+    return np.unpackbits(rows[first:first + BLOCK_ROWS], axis=1, count=days, bitorder="little").astype(np.float32)
+
+
+def pair_count_blocks(rows, days):
+    """
+    Count co-completion days of habit pairs, one tile of the upper triangle at a time.
+
+    Args:
+        rows (numpy.ndarray): Packed matrix rows as returned by build_matrix()
+        days (int): Number of days in the window
+
+    Yields:
+        tuple: (first, second, counts) where counts is a numpy int64 array of
+        shape (block habits, block habits); counts[i, j] are the days habits
+        first + i and second + j were both completed, for every second >= first
+    """
+    for first in range(0, len(rows), BLOCK_ROWS):
+        left = unpack_block(rows, first, days)
+        for second in range(first, len(rows), BLOCK_ROWS):
+            right = left if second == first else unpack_block(rows, second, days)
+            # float32 products are exact for counts below 2**24 days
+            yield (first, second, np.rint(left @ right.T).astype(np.int64))
+
+
+def pair_scores(both, count_a, count_b, days, metric):
+    """
+    Vectorized pair_metric() for arrays of pairs.
+
+    Returns:
+        numpy.ndarray: float64 scores, 0.0 where the metric is undefined
+    """
+    both, count_a, count_b = (values.astype(np.float64) for values in (both, count_a, count_b))
+    with np.errstate(divide="ignore", invalid="ignore"):
+        if metric == "count":
+            scores = both
+        elif metric == "jaccard":
+            scores = both / (count_a + count_b - both)
+        else:
+            scores = (days * both - count_a * count_b) / np.sqrt(
+                count_a * (days - count_a) * count_b * (days - count_b))
+    return np.where(np.isfinite(scores), scores, 0.0)
+
+
+def best_pairs(first, second, scores, k, size):
+    """
+    Keep the k best pairs, ordered by score and then by position in the matrix.
+
+    Args:
+        first (numpy.ndarray): Row of each pair
+        second (numpy.ndarray): Column of each pair
+        scores (numpy.ndarray): Score of each pair
+        k (int): Number of pairs to keep
+        size (int): Number of habits, orders ties row-major like the upper triangle
+
+    Returns:
+        numpy.ndarray: Indices of the kept pairs, best first
+    """
+    candidates = np.arange(len(scores))
+    if k < len(scores):
+        # All ties of the k-th score stay candidates, the position decides between them
+        threshold = -np.partition(-scores, k - 1)[k - 1]
+        candidates = np.flatnonzero(scores >= threshold)
+    positions = first[candidates].astype(np.int64) * size + second[candidates]
+    return candidates[np.lexsort((positions, -scores[candidates]))][:k]
+
+
+def pair_metric(both, count_a, count_b, days, metric):
+    """
+    Score one pair from its counts.
+
+    Args:
+        both (int): Days both habits were completed
+        count_a (int): Days habit a was completed
+        count_b (int): Days habit b was completed
+        days (int): Days in the window
+        metric (str): "count", "jaccard" or "phi"
+
+    Returns:
+        float: Score, 0.0 where the metric is undefined
+    """
+    if metric == "count":
+        return float(both)
+    if metric == "jaccard":
+        union = count_a + count_b - both
+        return both / union if union else 0.0
+    denominator = count_a * (days - count_a) * count_b * (days - count_b)
+    return (days * both - count_a * count_b) / math.sqrt(denominator) if denominator else 0.0
+# endregion Matrix
+
+
+# region Analytics
+@track_analytics("top_cooccurrences")
+def top_cooccurrences(storage, k=10, metric="phi", start=None, end=None, periodicity=None, min_days=1):
+    """
+    Find the habit pairs most often completed on the same days.
+
+    Args:
+        storage (HabitStorage): Database storage object
+        k (int): Number of pairs to return
+        metric (str): Ranking: "count" (shared days), "jaccard" (shared / either)
+            or "phi" (correlation of the two daily completion series)
+        start (date, optional): First day, default DEFAULT_WINDOW_DAYS before end
+        end (date, optional): Last day (inclusive), default today
+        periodicity (str, optional): Restrict to habits of one periodicity
+        min_days (int): Ignore pairs sharing fewer days
+
+    Returns:
+        list: [(habit_a, habit_b, shared_days, score)], best first
+
+    Raises:
+        ValueError: If metric is unknown or k is not positive
+    """
+    if metric not in METRICS:
+        raise ValueError(f"Metric must be one of {', '.join(METRICS)}")
+    if k < 1:
+        raise ValueError("k must be positive")
+    habits, days, rows = build_matrix(storage, start, end, periodicity)
+    if len(habits) < 2:
+        return []
+    size = len(habits)
+    totals = np.bitwise_count(rows).sum(axis=1, dtype=np.int64)
+
+    # Merge every tile into the k best pairs so far, only these candidates are kept
+    best = [np.empty(0, dtype=np.int64)] * 3 + [np.empty(0)]
+    for first, second, counts in pair_count_blocks(rows, days):
+        mask = ((second + np.arange(counts.shape[1]))[None, :] > (first + np.arange(len(counts)))[:, None]) \
+            & (counts >= min_days)
+        row, column = np.nonzero(mask)
+        both = counts[row, column]
+        row, column = row + first, column + second
+        scores = pair_scores(both, totals[row], totals[column], days, metric)
+        row, column, both, scores = (np.concatenate(parts) for parts in zip(best, (row, column, both, scores)))
+        top = best_pairs(row, column, scores, k, size)
+        best = [row[top], column[top], both[top], scores[top]]
+
+    row, column, both, scores = best
+    return [(habits[row[i]], habits[column[i]], int(both[i]), float(scores[i])) for i in range(len(scores))]
+
+
+@track_analytics("cooccurrence")
+def cooccurrence(storage, habit_a, habit_b, start=None, end=None):
+    """
+    Compare the daily completions of two habits.
+
+    Args:
+        storage (HabitStorage): Database storage object
+        habit_a (str): Name of the first habit
+        habit_b (str): Name of the second habit
+        start (date, optional): First day, default DEFAULT_WINDOW_DAYS before end
+        end (date, optional): Last day (inclusive), default today
+
+    Returns:
+        str: Shared completion days and phi correlation of the two habits
+    """
+    for habit in (habit_a, habit_b):
+        if storage.load_habit(habit) is None:
+            return f"Habit {habit} was not found"
+    end = end or datetime.now().date()
+    start = start or end - timedelta(days=DEFAULT_WINDOW_DAYS - 1)
+    days = (end - start).days + 1
+
+    completed = []
+    for habit in (habit_a, habit_b):
+        dates = map(lambda row: datetime.strptime(row[0], "%Y-%m-%d").date(), storage.load_tracking_data(habit))
+        completed.append(set(filter(lambda single_date: start <= single_date <= end, dates)))
+    both = len(completed[0] & completed[1])
+    phi = pair_metric(both, len(completed[0]), len(completed[1]), days, "phi")
+    return f"Habits {habit_a} and {habit_b} were completed together on {both} day{"s" if both != 1 else ""} (correlation {phi:.2f})"
+# endregion Analytics
@@ -1,3 +1,6 @@
+from periodicity import normalize_periodicity
+
+
 class Habit:
 
     """
@@ -6,7 +9,8 @@ class Habit:
     A Habit consists of a name, periodicity (how often should it be done) and short user description (Optional).
     Attributes:
         name (str): Name of the habit
-        periodicity (str): How often should habit be repeated. Must be "daily", "weekly" or "monthly"
+        periodicity (str): How often should habit be repeated: "daily", "weekly", "monthly",
+            "every N days" or "N times per week"
         description (str): short description of the habit
 
     """
@@ -20,7 +24,8 @@ class Habit:
         
         Args:
             - name (str): Name of a new habit (non-empty, not just whitespace)
-            - periodicity (str): periodicity of new habit - "daily", "weekly" or "monthly"
+            - periodicity (str): periodicity of new habit - "daily", "weekly", "monthly",
+              "every N days" or "N times per week"
             - description (str, optional): Optional description of the habit
 
         Raises:
@@ -36,10 +41,8 @@ class Habit:
     
     @periodicity.setter
     def periodicity(self, periodicity):
-        """Set periodicity with validation."""
-        if periodicity not in ["daily", "weekly", "monthly"]:
-            raise ValueError ("Invalid periodicity")
-        self._periodicity = periodicity
+        """Set periodicity with validation, stored in canonical spelling."""
+        self._periodicity = normalize_periodicity(periodicity)
 
     @property
     def name(self):
@@ -0,0 +1,365 @@
+"""
+Clustered storage layout for the tracking table.
+
+The default tracking table has a surrogate tracking_id rowid plus an index
+on habit_id. Completions are stored in insertion order, so one habit's
+history is spread over nearly every page of the table, and every lookup
+goes through the index and then back to the table.
+
+The clustered layout is a WITHOUT ROWID table with the primary key
+(habit_id, completion_date). The B-tree is ordered by that key, so all
+completions of a habit sit next to each other on a few leaf pages, and no
+separate index or rowid is stored. The key holds one completion per
+habit and day.
+
+Usage:
+    python layout.py convert --db habits.db
+    python layout.py convert --db habits.db --page-size 8192
+    python layout.py benchmark --habits 200 --days 730
+"""
+
+# region imports
+import os
+import time
+import random
+import sqlite3
+import argparse
+import tempfile
+from datetime import date, timedelta
+
+from archive import database_size
+
+# endregion imports
+
+CLUSTERED = "clustered"
+ROWID = "rowid"
+DEFAULT_CHUNK_SIZE = 10000
+PAGE_SIZES = (512, 1024, 2048, 4096, 8192, 16384, 32768, 65536)
+
+CLUSTERED_TRACKING = """
+    CREATE TABLE IF NOT EXISTS {name}(
+        habit_id INTEGER NOT NULL,
+        completion_date DATE NOT NULL,
+
+        PRIMARY KEY (habit_id, completion_date),
+        FOREIGN KEY (habit_id) REFERENCES habits(habit_id) ON DELETE CASCADE) WITHOUT ROWID
+"""
+
+# Keep the new table in sync while the old one is copied
+SYNC_TRIGGERS = (
+    """
+    CREATE TRIGGER IF NOT EXISTS tracking_sync_insert AFTER INSERT ON tracking
+    BEGIN
+        INSERT OR IGNORE INTO tracking_clustered (habit_id, completion_date)
+        VALUES (new.habit_id, new.completion_date);
+    END
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS tracking_sync_delete AFTER DELETE ON tracking
+    WHEN NOT EXISTS (SELECT 1 FROM tracking
+                     WHERE habit_id = old.habit_id AND completion_date = old.completion_date)
+    BEGIN
+        DELETE FROM tracking_clustered
+        WHERE habit_id = old.habit_id AND completion_date = old.completion_date;
+    END
+    """
+)
+
+
+# region Schema
+def tracking_layout(connection):
+    """
+    Return the layout of the tracking table.
+
+    Args:
+        connection (sqlite3.Connection): Database connection
+
+    Returns:
+        str or None: CLUSTERED, ROWID, or None if there is no tracking table
+    """
+    row = connection.execute("SELECT sql FROM sqlite_master WHERE type = 'table' AND name = 'tracking'").fetchone()
+    if row is None:
+        return None
+    return CLUSTERED if "WITHOUT ROWID" in row[0].upper() else ROWID
+
+
+def create_clustered_tracking(connection, name="tracking"):
+    """Create a clustered tracking table with the given name if it doesn't exist."""
+    connection.execute(CLUSTERED_TRACKING.format(name=name))
+
+
+def set_page_size(connection, page_size):
+    """
+    Change the page size of a database.
+
+    A new, empty database takes the page size directly. An existing one is
+    rebuilt with VACUUM, which needs exclusive access and free disk space
+    for a full copy. WAL databases are switched to rollback journal mode for
+    the rebuild and back to WAL afterwards.
+
+    Args:
+        connection (sqlite3.Connection): Database connection, no open transaction
+        page_size (int): Power of two between 512 and 65536
+
+    Returns:
+        int: Page size in effect afterwards
+
+    Raises:
+        ValueError: If page_size is not supported
+    """
+    if page_size not in PAGE_SIZES:
+        raise ValueError(f"Page size must be one of {', '.join(map(str, PAGE_SIZES))}")
+    if connection.execute("PRAGMA page_size").fetchone()[0] == page_size:
+        return page_size
+    journal_mode = connection.execute("PRAGMA journal_mode").fetchone()[0]
+    if journal_mode == "wal":
+        connection.execute("PRAGMA journal_mode = DELETE")
+    connection.execute(f"PRAGMA page_size = {page_size}")
+    connection.execute("VACUUM")
+    if journal_mode == "wal":
+        connection.execute("PRAGMA journal_mode = WAL")
+    return connection.execute("PRAGMA page_size").fetchone()[0]
+# endregion Schema
+
+
+# region Conversion
+def convert_to_clustered(connection, page_size=None, chunk_size=DEFAULT_CHUNK_SIZE, progress=None):
+    """
+    Convert a rowid tracking table into the clustered layout while the app keeps running.
+
+    Steps, each a short transaction so other writers only wait for one step:
+    1. Create tracking_clustered and triggers that mirror inserts and
+       deletes on tracking into it.
+    2. Copy tracking in chunks of chunk_size rows, ordered by tracking_id.
+       Rows written during the copy reach the new table via the triggers.
+    3. Drop the triggers and the old table and rename tracking_clustered.
+
+    Duplicate completions of a habit on the same day are merged. An
+    interrupted conversion can be run again and continues with the copy.
+    Changing the page size is done last and is not online, see set_page_size().
+
+    Args:
+        connection (sqlite3.Connection): Database connection, no open transaction
+        page_size (int, optional): New page size, rebuilds the database with VACUUM
+        chunk_size (int): Rows copied per transaction
+        progress (callable, optional): Called as progress(copied, total) after each chunk
+
+    Returns:
+        dict: {"rows_before": int, "rows_after": int, "bytes_before": int, "bytes_after": int}
+
+    Raises:
+        ValueError: If there is no tracking table or chunk_size is not positive
+    """
+    if chunk_size < 1:
+        raise ValueError("Invalid chunk size")
+    layout = tracking_layout(connection)
+    if layout is None:
+        raise ValueError("Database has no tracking table")
+    bytes_before = database_size(connection)
+    rows_before = connection.execute("SELECT COUNT(*) FROM tracking").fetchone()[0]
+
+    if layout == ROWID:
+        create_clustered_tracking(connection, "tracking_clustered")
+        for trigger in SYNC_TRIGGERS:
+            connection.execute(trigger)
+        connection.commit()
+
+        copied, last_id = 0, 0
+        while True:
+            try:
+                row = connection.execute("""
+                    SELECT MAX(tracking_id), COUNT(*) FROM (
+                        SELECT tracking_id FROM tracking WHERE tracking_id > ? ORDER BY tracking_id LIMIT ?)
+                    """, (last_id, chunk_size)).fetchone()
+                if not row[1]:
+                    break
+                # OR IGNORE also skips rows with a NULL habit or date
+                connection.execute("""
+                    INSERT OR IGNORE INTO tracking_clustered (habit_id, completion_date)
+                    SELECT habit_id, completion_date FROM tracking WHERE tracking_id > ? AND tracking_id <= ?
+                    """, (last_id, row[0]))
+                connection.commit()
+            except Exception as e:
+                connection.rollback()
+                raise e
+            copied, last_id = copied + row[1], row[0]
+            if progress:
+                progress(copied, rows_before)
+
+        try:
+            connection.execute("BEGIN IMMEDIATE")
+            connection.execute("DROP TRIGGER tracking_sync_insert")
+            connection.execute("DROP TRIGGER tracking_sync_delete")
+            # Other triggers on tracking, e.g. the scheduler's, are dropped with the table
+            triggers = [row[0] for row in connection.execute(
+                "SELECT sql FROM sqlite_master WHERE type = 'trigger' AND tbl_name = 'tracking'")]
+            connection.execute("DROP TABLE tracking")
+            connection.execute("ALTER TABLE tracking_clustered RENAME TO tracking")
+            for trigger in triggers:
+                connection.execute(trigger)
+            connection.commit()
+        except Exception as e:
+            connection.rollback()
+            raise e
+
+    if page_size is not None:
+        set_page_size(connection, page_size)
+    return {
+        "rows_before": rows_before,
+        "rows_after": connection.execute("SELECT COUNT(*) FROM tracking").fetchone()[0],
+        "bytes_before": bytes_before,
+        "bytes_after": database_size(connection)
+    }
+# endregion Conversion
+
+
+# region Benchmark
+def _bytes_read():
+    """Return bytes read by this process so far from /proc/self/io, None where unavailable."""
+    try:
+        with open("/proc/self/io") as io:
+            for line in io:
+                if line.startswith("rchar:"):
+                    return int(line.split()[1])
+    except OSError:
+        return None
+    return None
+
+
+def table_pages(connection, names):
+    """Return the number of pages used by the given tables and indexes, None without the dbstat table."""
+    placeholders = ", ".join("?" * len(names))
+    try:
+        return connection.execute(
+            f"SELECT COUNT(*) FROM dbstat WHERE name IN ({placeholders})", tuple(names)).fetchone()[0]
+    except sqlite3.OperationalError:
+        return None
+
+
+def measure_reads(path, habit_ids):
+    """
+    Read the completions of each habit through a fresh connection.
+
+    A fresh connection starts with an empty page cache and memory mapping
+    is off, so bytes read by the process equal the pages SQLite fetched.
+
+    Args:
+        path (str): Database file
+        habit_ids (list): Habits to read
+
+    Returns:
+        dict: {"seconds": float, "bytes": float or None}, averages per habit
+    """
+    seconds, read = 0.0, 0
+    for habit_id in habit_ids:
+        connection = sqlite3.connect(path)
+        connection.execute("PRAGMA mmap_size = 0")
+        try:
+            before, start = _bytes_read(), time.perf_counter()
+            connection.execute(
+                "SELECT completion_date FROM tracking WHERE habit_id = ? ORDER BY completion_date",
+                (habit_id,)).fetchall()
+            seconds += time.perf_counter() - start
+            after = _bytes_read()
+            read = None if before is None or read is None else read + after - before
+        finally:
+            connection.close()
+    return {
+        "seconds": seconds / len(habit_ids),
+        "bytes": read / len(habit_ids) if read is not None else None
+    }
+
+
+def benchmark_layouts(directory, habits=100, days=365, page_size=4096, samples=20, seed=1):
+    """
+    Compare file size and per-habit read I/O of the rowid and clustered layouts.
+
+    Both databases get the same synthetic history, written day by day over
+    all habits the way a live app writes it, with roughly 70% of days completed.
+
+    Args:
+        directory (str): Directory for the two database files
+        habits (int): Number of habits
+        days (int): Days of history
+        page_size (int): Page size of both databases
+        samples (int): Habits read per layout
+        seed (int): Random seed for the history and the sampled habits
+
+    Returns:
+        dict: {layout: {"rows", "bytes", "tracking_pages", "read_seconds", "read_bytes"}}
+    """
+    # Imported here because main.py imports this module for its schema
+    from main import setup_database
+
+    rng = random.Random(seed)
+    start = date.today() - timedelta(days=days)
+    rows = [(habit_id, (start + timedelta(days=day)).isoformat())
+            for day in range(days) for habit_id in range(1, habits + 1) if rng.random() < 0.7]
+    sampled = rng.sample(range(1, habits + 1), min(samples, habits))
+
+    results = {}
+    for layout in (ROWID, CLUSTERED):
+        path = os.path.join(directory, f"benchmark_{layout}.db")
+        if os.path.exists(path):
+            os.remove(path)
+        connection = setup_database(path, clustered=layout == CLUSTERED, page_size=page_size)
+        try:
+            connection.executemany(
+                "INSERT INTO habits (habit_id, habit_name, habit_periodicity) VALUES (?, ?, 'daily')",
+                [(habit_id, f"habit {habit_id}") for habit_id in range(1, habits + 1)])
+            connection.executemany("INSERT INTO tracking (habit_id, completion_date) VALUES (?, ?)", rows)
+            connection.commit()
+            size = database_size(connection)
+            pages = table_pages(connection, ("tracking", "idx_tracking_habit"))
+        finally:
+            connection.close()
+        reads = measure_reads(path, sampled)
+        results[layout] = {
+            "rows": len(rows),
+            "bytes": size,
+            "tracking_pages": pages,
+            "read_seconds": reads["seconds"],
+            "read_bytes": reads["bytes"]
+        }
+    return results
+# endregion Benchmark
+
+
+def main(argv=None):
+    """Convert a database or run the layout benchmark from the command line."""
+    parser = argparse.ArgumentParser(description="Clustered tracking layout tools")
+    commands = parser.add_subparsers(dest="command", required=True)
+    convert = commands.add_parser("convert", help="Convert tracking to the clustered layout")
+    convert.add_argument("--db", default="habits.db", help="SQLite database file")
+    convert.add_argument("--page-size", type=int, default=None, help="New page size, rebuilds the file")
+    convert.add_argument("--chunk-size", type=int, default=DEFAULT_CHUNK_SIZE, help="Rows copied per transaction")
+    benchmark = commands.add_parser("benchmark", help="Compare the rowid and clustered layouts")
+    benchmark.add_argument("--habits", type=int, default=100)
+    benchmark.add_argument("--days", type=int, default=365)
+    benchmark.add_argument("--page-size", type=int, default=4096)
+    benchmark.add_argument("--samples", type=int, default=20, help="Habits read per layout")
+    args = parser.parse_args(argv)
+
+    if args.command == "convert":
+        conn = sqlite3.connect(args.db)
+        conn.execute("PRAGMA foreign_keys = ON")
+        try:
+            report = convert_to_clustered(conn, args.page_size, args.chunk_size)
+        finally:
+            conn.close()
+        print(f'Converted {report["rows_before"]} rows into {report["rows_after"]}, '
+              f'{report["bytes_before"]} -> {report["bytes_after"]} bytes')
+        return 0
+
+    with tempfile.TemporaryDirectory() as directory:
+        results = benchmark_layouts(directory, args.habits, args.days, args.page_size, args.samples)
+    print(f'{"layout":<10} {"rows":>8} {"bytes":>10} {"pages":>7} {"read ms":>8} {"read bytes":>11}')
+    for layout, result in results.items():
+        read_bytes = f'{result["read_bytes"]:.0f}' if result["read_bytes"] is not None else "n/a"
+        print(f'{layout:<10} {result["rows"]:>8} {result["bytes"]:>10} {result["tracking_pages"] or "n/a":>7} '
+              f'{result["read_seconds"] * 1000:>8.3f} {read_bytes:>11}')
+    return 0
+
+
+if __name__ == "__main__":
+    main()
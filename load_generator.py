@@ -0,0 +1,166 @@
+"""
+Load generator for the local habit tracker API server.
+
+Opens a number of keep-alive connections and measures requests per second
+and latency percentiles for a mix of analytics reads and completion writes.
+
+Usage:
+    # Against a running server
+    python load_generator.py --port 8080 --connections 16 --requests 500
+
+    # Against a temporary in-process server with demo data
+    python load_generator.py --spawn
+"""
+
+# region imports
+import os
+import sys
+import json
+import time
+import random
+import asyncio
+import argparse
+import tempfile
+from datetime import date, timedelta
+from urllib.parse import quote
+
+from storage import SQLiteStorage
+from demo_data import setup_demo_data
+from main import setup_database
+from api_server import HabitAPI, start_server
+
+# endregion imports
+
+
+def percentile(sorted_values, fraction):
+    """Return value at given fraction (0..1) of sorted list, nearest rank."""
+    if not sorted_values:
+        return 0.0
+    index = min(len(sorted_values) - 1, max(0, round(fraction * len(sorted_values)) - 1))
+    return sorted_values[index]
+
+
+async def send_request(reader, writer, method, path, body=None):
+    """
+    Send one request on a keep-alive connection and read the response.
+
+    Returns:
+        int: HTTP status code
+    """
+    payload = json.dumps(body).encode("utf-8") if body is not None else b""
+    writer.write(
+        f"{method} {path} HTTP/1.1\r\nHost: localhost\r\nContent-Type: application/json\r\n"
+        f"Content-Length: {len(payload)}\r\n\r\n".encode("latin-1") + payload)
+    await writer.drain()
+    head = await reader.readuntil(b"\r\n\r\n")
+    lines = head.decode("latin-1").split("\r\n")
+    status = int(lines[0].split(" ")[1])
+    length = 0
+    for line in lines[1:]:
+        name, _, value = line.partition(":")
+        if name.strip().lower() == "content-length":
+            length = int(value.strip())
+    await reader.readexactly(length)
+    return status
+
+
+async def client(host, port, habits, requests, write_ratio, latencies, errors, seed):
+    """Run requests sequentially on one keep-alive connection."""
+    rng = random.Random(seed)
+    reader, writer = await asyncio.open_connection(host, port)
+    try:
+        for i in range(requests):
+            habit = quote(rng.choice(habits), safe="")
+            if rng.random() < write_ratio:
+                day = date(2000, 1, 1) + timedelta(days=rng.randrange(10000))
+                method, path, body = "POST", f"/habits/{habit}/completions", {"date": str(day)}
+            else:
+                method, path, body = "GET", f"/habits/{habit}/analytics", None
+            start = time.perf_counter()
+            status = await send_request(reader, writer, method, path, body)
+            latencies.append(time.perf_counter() - start)
+            if status >= 400:
+                errors.append(status)
+    finally:
+        writer.close()
+
+
+async def run_load(host, port, habits, connections=8, requests=200, write_ratio=0.1, seed=0):
+    """
+    Generate load against an API server.
+
+    Args:
+        host (str): Server address
+        port (int): Server port
+        habits (list): Habit names to spread requests over
+        connections (int): Concurrent keep-alive connections
+        requests (int): Requests per connection
+        write_ratio (float): Share of completion writes, rest are analytics reads
+        seed (int): Random seed for reproducible request mix
+
+    Returns:
+        dict: requests, errors, seconds, rps, p50_ms, p95_ms, p99_ms
+    """
+    latencies = []
+    errors = []
+    start = time.perf_counter()
+    await asyncio.gather(*(
+        client(host, port, habits, requests, write_ratio, latencies, errors, seed + i)
+        for i in range(connections)))
+    elapsed = time.perf_counter() - start
+    latencies.sort()
+    return {
+        "requests": len(latencies),
+        "errors": len(errors),
+        "seconds": elapsed,
+        "rps": len(latencies) / elapsed if elapsed else 0.0,
+        "p50_ms": percentile(latencies, 0.50) * 1000,
+        "p95_ms": percentile(latencies, 0.95) * 1000,
+        "p99_ms": percentile(latencies, 0.99) * 1000
+    }
+
+
+async def run_spawned(connections, requests, write_ratio):
+    """Start a temporary server with demo data and run load against it."""
+    with tempfile.TemporaryDirectory() as directory:
+        conn = setup_database(os.path.join(directory, "habits.db"))
+        storage = SQLiteStorage(conn)
+        setup_demo_data(storage)
+        server = await start_server(HabitAPI(storage), "127.0.0.1", 0)
+        port = server.sockets[0].getsockname()[1]
+        try:
+            return await run_load("127.0.0.1", port, storage.load_all_habits(),
+                                  connections, requests, write_ratio)
+        finally:
+            server.close()
+            await server.wait_closed()
+            conn.close()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Load generator for the habit tracker API")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8080)
+    parser.add_argument("--connections", type=int, default=8)
+    parser.add_argument("--requests", type=int, default=200, help="Requests per connection")
+    parser.add_argument("--write-ratio", type=float, default=0.1)
+    parser.add_argument("--habit", action="append", help="Habit name to request (repeatable)")
+    parser.add_argument("--spawn", action="store_true", help="Run against a temporary in-process server")
+    args = parser.parse_args(argv)
+
+    if args.spawn:
+        result = asyncio.run(run_spawned(args.connections, args.requests, args.write_ratio))
+    else:
+        if not args.habit:
+            parser.error("--habit is required unless --spawn is used")
+        result = asyncio.run(run_load(args.host, args.port, args.habit,
+                                      args.connections, args.requests, args.write_ratio))
+
+    print(f'{result["requests"]} requests in {result["seconds"]:.2f}s '
+          f'({result["rps"]:.0f} req/s), {result["errors"]} errors')
+    print(f'latency p50 {result["p50_ms"]:.2f} ms, p95 {result["p95_ms"]:.2f} ms, p99 {result["p99_ms"]:.2f} ms')
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
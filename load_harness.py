@@ -0,0 +1,182 @@
+"""
+Concurrent-writer load harness for SQLiteStorage.
+
+Spawns N processes with T threads each. Every thread opens its own
+connection to one habits.db and writes and reads completions, so the
+harness exercises SQLite's file locking the way several CLI instances or
+server workers would. Reports throughput, tail latency and lock-error rate.
+
+Usage:
+    python load_harness.py --db load.db --processes 4 --threads 4 --operations 500
+    python load_harness.py --processes 4 --threads 4 --retries 0 --busy-timeout 0
+"""
+
+# region imports
+import os
+import sys
+import time
+import random
+import sqlite3
+import argparse
+import tempfile
+import threading
+import multiprocessing
+from datetime import date, timedelta
+
+from storage import SQLiteStorage, RetryPolicy, is_busy_error
+from habits import Habit
+from main import setup_database
+from load_generator import percentile
+
+# endregion imports
+
+HABIT_COUNT = 10
+
+
+def prepare_database(path, journal_mode="wal"):
+    """
+    Create schema and load-test habits in path.
+
+    Args:
+        path (str): Database file
+        journal_mode (str): "wal" or "delete"
+    """
+    conn = setup_database(path)
+    conn.execute(f"PRAGMA journal_mode = {journal_mode}")
+    storage = SQLiteStorage(conn)
+    for i in range(HABIT_COUNT):
+        storage.save_habit(Habit(f"load {i}", "daily", "Load test habit"))
+    conn.close()
+
+
+def run_thread(path, operations, write_ratio, busy_timeout, retries, seed, results):
+    """Run operations on a private connection and append per-thread stats to results."""
+    rng = random.Random(seed)
+    # timeout=0 disables the Python-level busy handler, busy_timeout sets SQLite's
+    conn = sqlite3.connect(path, timeout=0)
+    policy = RetryPolicy(retries=retries) if retries else None
+    storage = SQLiteStorage(conn, busy_timeout=busy_timeout, retry_policy=policy)
+    stats = {"reads": [], "writes": [], "lock_errors": 0, "other_errors": 0}
+    try:
+        for _ in range(operations):
+            habit = f"load {rng.randrange(HABIT_COUNT)}"
+            is_write = rng.random() < write_ratio
+            start = time.perf_counter()
+            try:
+                if is_write:
+                    day = date(2000, 1, 1) + timedelta(days=rng.randrange(10000))
+                    storage.save_tracking_data((habit, day))
+                else:
+                    storage.load_tracking_data(habit)
+            except sqlite3.OperationalError as e:
+                conn.rollback()
+                if is_busy_error(e):
+                    stats["lock_errors"] += 1
+                else:
+                    stats["other_errors"] += 1
+                continue
+            stats["writes" if is_write else "reads"].append(time.perf_counter() - start)
+    finally:
+        stats["retries"] = storage.lock_retries
+        conn.close()
+    results.append(stats)
+
+
+def run_process(path, threads, operations, write_ratio, busy_timeout, retries, seed, queue):
+    """Run worker threads in this process and send combined stats to queue."""
+    results = []
+    workers = [
+        threading.Thread(target=run_thread, args=(
+            path, operations, write_ratio, busy_timeout, retries, seed * 1000 + i, results))
+        for i in range(threads)]
+    for worker in workers:
+        worker.start()
+    for worker in workers:
+        worker.join()
+    queue.put(results)
+
+
+def run_harness(path, processes=4, threads=4, operations=200, write_ratio=0.5,
+                busy_timeout=5000, retries=5, journal_mode="wal"):
+    """
+    Run the load harness against a database file.
+
+    Args:
+        path (str): Database file, created and filled with load-test habits
+        processes (int): Worker processes
+        threads (int): Threads per process, each with its own connection
+        operations (int): Operations per thread
+        write_ratio (float): Share of completion writes, rest are reads
+        busy_timeout (int): SQLite busy_timeout in milliseconds per connection
+        retries (int): RetryPolicy retries per write, 0 disables retrying
+        journal_mode (str): "wal" or "delete"
+
+    Returns:
+        dict: Throughput, latency percentiles in ms, lock errors, retries and error rate
+    """
+    prepare_database(path, journal_mode)
+    queue = multiprocessing.Queue()
+    workers = [
+        multiprocessing.Process(target=run_process, args=(
+            path, threads, operations, write_ratio, busy_timeout, retries, i, queue))
+        for i in range(processes)]
+
+    start = time.perf_counter()
+    for worker in workers:
+        worker.start()
+    thread_stats = []
+    for _ in workers:
+        thread_stats.extend(queue.get())
+    for worker in workers:
+        worker.join()
+    elapsed = time.perf_counter() - start
+
+    reads = sorted(latency for stats in thread_stats for latency in stats["reads"])
+    writes = sorted(latency for stats in thread_stats for latency in stats["writes"])
+    lock_errors = sum(stats["lock_errors"] for stats in thread_stats)
+    attempted = processes * threads * operations
+    return {
+        "operations": len(reads) + len(writes),
+        "seconds": elapsed,
+        "ops_per_second": (len(reads) + len(writes)) / elapsed if elapsed else 0.0,
+        "read_p50_ms": percentile(reads, 0.50) * 1000,
+        "read_p99_ms": percentile(reads, 0.99) * 1000,
+        "write_p50_ms": percentile(writes, 0.50) * 1000,
+        "write_p95_ms": percentile(writes, 0.95) * 1000,
+        "write_p99_ms": percentile(writes, 0.99) * 1000,
+        "lock_errors": lock_errors,
+        "other_errors": sum(stats["other_errors"] for stats in thread_stats),
+        "retries": sum(stats["retries"] for stats in thread_stats),
+        "lock_error_rate": lock_errors / attempted if attempted else 0.0
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Concurrent SQLiteStorage load harness")
+    parser.add_argument("--db", default=None, help="Database file, default a temporary file")
+    parser.add_argument("--processes", type=int, default=4)
+    parser.add_argument("--threads", type=int, default=4)
+    parser.add_argument("--operations", type=int, default=200, help="Operations per thread")
+    parser.add_argument("--write-ratio", type=float, default=0.5)
+    parser.add_argument("--busy-timeout", type=int, default=5000, help="Milliseconds")
+    parser.add_argument("--retries", type=int, default=5, help="0 disables retry with backoff")
+    parser.add_argument("--journal-mode", choices=["wal", "delete"], default="wal")
+    args = parser.parse_args(argv)
+
+    with tempfile.TemporaryDirectory() as directory:
+        path = args.db or os.path.join(directory, "load.db")
+        result = run_harness(path, args.processes, args.threads, args.operations, args.write_ratio,
+                             args.busy_timeout, args.retries, args.journal_mode)
+
+    print(f'{result["operations"]} operations in {result["seconds"]:.2f}s '
+          f'({result["ops_per_second"]:.0f} ops/s)')
+    print(f'read  p50 {result["read_p50_ms"]:.2f} ms, p99 {result["read_p99_ms"]:.2f} ms')
+    print(f'write p50 {result["write_p50_ms"]:.2f} ms, p95 {result["write_p95_ms"]:.2f} ms, '
+          f'p99 {result["write_p99_ms"]:.2f} ms')
+    print(f'lock errors {result["lock_errors"]} ({result["lock_error_rate"]:.2%}), '
+          f'retries {result["retries"]}, other errors {result["other_errors"]}')
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -3,33 +3,63 @@
 import sys
 import time
 import sqlite3
+import argparse
 import questionary
 from datetime import datetime
+from prompt_toolkit.completion import Completer, Completion
+from prompt_toolkit.shortcuts import CompleteStyle
 
-from storage import SQLiteStorage
+from storage import SQLiteStorage, RetryPolicy, ensure_search_schema, ensure_changelog_schema
 from habits import Habit
 from analytics import longest_streak, current_streak, completion_rate, longest_streak_by_periodicity
 from demo_data import setup_demo_data
+from metrics import REGISTRY, serve_metrics
+from analytics_cache import AnalyticsCache
+from write_buffer import CompletionWriteBuffer
+from periodicity import report_periodicities
+from layout import ROWID, create_clustered_tracking, tracking_layout
+from scheduler import ensure_schedule_schema
+from tags import ensure_tags_schema
+from maintenance import run_maintenance, format_report, BUSY_TIMEOUT_MS
 
 # endregion imports
 
-def setup_database():
+# Above this many habits pickers switch from a full list to search-as-you-type
+SELECT_LIST_LIMIT = 30
+SEARCH_RESULT_LIMIT = 20
+
+def setup_database(path='habits.db', clustered=False, page_size=None):
     """
     Set up database connection and initialize schema.
 
-    Creates connection to habits.db and creates 2 tables if they don't exist:
+    Creates connection to habits.db (or given path) and creates 2 tables if they don't exist:
     - habits: Stores habit ID, name, periodicity, and description  
     - tracking: Stores tracking ID, habit ID, and completion dates
+    - change_log: Append-only log of changes for incremental consumers
+    - habit_schedule: Next deadlines of every habit, kept up to date by triggers
+    - tags, habit_tags: Tags and the habits they group
+
+    Enables foreign key constraints for data integrity. New databases use
+    incremental auto-vacuum, so maintenance.py can release free pages in steps.
 
-    Enables foreign key constraints for data integrity.
+    Args:
+        path (str, optional): Database file path, default "habits.db"
+        clustered (bool, optional): Create tracking in the clustered WITHOUT ROWID
+            layout, see layout.py. Only applies to a new database.
+        page_size (int, optional): Page size of a new database
 
     Returns:
         sqlite3.Connection: Active database connection to habits.db.
     """
-    conn = sqlite3.connect('habits.db')
+    conn = sqlite3.connect(path)
     cursor = conn.cursor()
 
     cursor.execute("PRAGMA foreign_keys = ON")
+    if page_size is not None:
+        # Only takes effect before the first table is created
+        cursor.execute(f"PRAGMA page_size = {int(page_size)}")
+    # Like page_size, only takes effect on a new database
+    cursor.execute("PRAGMA auto_vacuum = INCREMENTAL")
 
     cursor.execute("""
         CREATE TABLE IF NOT EXISTS habits(
@@ -39,6 +69,8 @@ def setup_database():
             habit_description VARCHAR) 
     """)
 
+    if clustered:
+        create_clustered_tracking(conn)
     cursor.execute("""
         CREATE TABLE IF NOT EXISTS tracking(
             tracking_id INTEGER PRIMARY KEY,
@@ -48,15 +80,50 @@ def setup_database():
             FOREIGN KEY (habit_id) REFERENCES habits(habit_id) ON DELETE CASCADE)
     """)
 
+    # The clustered primary key already starts with habit_id
+    if tracking_layout(conn) == ROWID:
+        cursor.execute("CREATE INDEX IF NOT EXISTS idx_tracking_habit ON tracking(habit_id)")
+    ensure_search_schema(conn)
+    ensure_changelog_schema(conn)
+    ensure_schedule_schema(conn)
+    ensure_tags_schema(conn)
+
     return conn
 
-def main():
+def parse_args(argv=None):
+    """
+    Parse command line options.
+
+    Args:
+        argv (list, optional): Arguments to parse, defaults to sys.argv[1:]
+
+    Returns:
+        argparse.Namespace: Parsed options
+    """
+    parser = argparse.ArgumentParser(description="Habit tracker CLI")
+    parser.add_argument("--metrics-port", type=int, default=None,
+                        help="Expose Prometheus metrics on 127.0.0.1:<port>/metrics")
+    parser.add_argument("--metrics-textfile", default=None,
+                        help="Write Prometheus metrics to this .prom file on exit")
+    parser.add_argument("--write-behind", choices=["buffered", "flush_on_ack"], default=None,
+                        help="Queue completions and write them in batches (group commit)")
+    parser.add_argument("--analytics-report", action="store_true",
+                        help="Print analytics of all habits and exit instead of starting the menu")
+    parser.add_argument("--maintenance", action="store_true",
+                        help="Run database maintenance (ANALYZE, vacuum, checkpoint) and exit")
+    parser.add_argument("--profile", metavar="PREFIX", default=None,
+                        help="Profile the run, writes PREFIX.pstats, PREFIX_hot.txt and PREFIX_memory.txt")
+    return parser.parse_args(argv)
+
+def main(argv=None):
     """
     Main application entry point and event loop.
     
     Initializes database connection and enters interactive CLI loop.
     Handles user navigation between smart start menu and main menu,
     processing user choices until exit is selected.
+    Optionally exposes metrics on a local HTTP endpoint or writes them
+    to a textfile-collector path on exit.
     
     Flow:
         1. Set up database connection and tables
@@ -68,11 +135,93 @@ def main():
     Returns:
         None: Application terminates when user exits
     """
+    args = parse_args(argv)
+    if args.profile is None:
+        run_app(args)
+        return
+
+    # Imported only when profiling, so normal runs don't load cProfile or tracemalloc
+    from profiling import Profiler
+    with Profiler(args.profile) as profiler:
+        run_app(args)
+    print(f'Profile written to {", ".join(profiler.files.values())}', file=sys.stderr)
+
+def run_app(args):
+    """
+    Run the session or the single command selected by the parsed options.
+
+    Args:
+        args (argparse.Namespace): Options from parse_args()
+    """
+    if args.metrics_port is not None:
+        serve_metrics(REGISTRY, port=args.metrics_port)
+
     conn = setup_database()
-    storage = SQLiteStorage(conn)
+    storage = SQLiteStorage(conn, retry_policy=RetryPolicy())
+
+    if args.analytics_report or args.maintenance:
+        try:
+            if args.maintenance:
+                conn.execute(f"PRAGMA busy_timeout = {BUSY_TIMEOUT_MS}")
+                print(format_report(run_maintenance(conn)))
+            else:
+                print(analytics_report(storage))
+        finally:
+            conn.close()
+            if args.metrics_textfile:
+                REGISTRY.write_textfile(args.metrics_textfile)
+        return
+
+    buffer = None
+    if args.write_behind:
+        buffer = start_write_buffer(conn, args.write_behind)
+
+    try:
+        run_cli(storage, conn, buffer)
+    finally:
+        if args.metrics_textfile:
+            REGISTRY.write_textfile(args.metrics_textfile)
+
+def start_write_buffer(conn, durability):
+    """
+    Start a write-behind buffer that flushes on its own connection.
+
+    The buffer flushes every flush_interval on a background thread. It gets
+    a second connection to the same database file, so its group commits
+    never interleave with the CLI's transactions; analytics on conn see
+    flushed completions once they are committed.
+
+    Args:
+        conn (sqlite3.Connection): CLI connection, whose database file the buffer writes to
+        durability (str): "buffered" or "flush_on_ack"
+
+    Returns:
+        CompletionWriteBuffer: Running buffer, quit_app() stops it
+    """
+    path = conn.execute("PRAGMA database_list").fetchone()[2]
+    buffer_conn = sqlite3.connect(path, check_same_thread=False)
+    buffer_conn.execute("PRAGMA foreign_keys = ON")
+    buffer_storage = SQLiteStorage(buffer_conn, busy_timeout=BUSY_TIMEOUT_MS, retry_policy=RetryPolicy())
+    buffer = CompletionWriteBuffer(buffer_storage, durability=durability)
+    buffer.start()
+    return buffer
+
+def run_cli(storage, conn, buffer=None):
+    """
+    Run the interactive CLI session.
+
+    Args:
+        storage (HabitStorage): Database storage object
+        conn (sqlite3.Connection): Connection closed on exit
+        buffer (CompletionWriteBuffer, optional): Write-behind buffer for completions
+
+    Returns:
+        None: Returns when user exits
+    """
+    cache = AnalyticsCache(storage)
 
     # Auto-load demo data if database is empty
-    if not storage.load_all_habits():
+    if not storage.load_habits_page(limit=1):
         print("First run detected: Setting up demo data...")
               
         try:
@@ -93,7 +242,7 @@ def main():
         choice = smart_start(storage)
 
         if choice == "Exit":
-            quit_app(conn)
+            quit_app(conn, buffer)
             break
         elif choice == "Main Menu":
             while True:
@@ -101,9 +250,9 @@ def main():
                 if menu_choice == "Track Completion":
                     choice = smart_start(storage)
                     if choice == "Exit":
-                        quit_app(conn)
+                        quit_app(conn, buffer)
                         return
-                    success, message = create_completion(storage, choice)
+                    success, message = create_completion(storage, choice, buffer)
                     print(message)
                 elif menu_choice == "Show Habits by periodicity":
                     periodicity, result = get_habits_by_periodicity(storage)
@@ -114,7 +263,7 @@ def main():
                     else:
                         print(f'No {periodicity} habit found')
                 elif menu_choice == "Show analytics":
-                    analytics = show_analytics(storage)
+                    analytics = show_analytics(storage, cache)
                     if analytics:
                         print(analytics)
                     else:
@@ -142,13 +291,71 @@ def main():
                     else:
                         print(message)
                 elif menu_choice == "Exit" or menu_choice is None:
-                    quit_app(conn)
+                    quit_app(conn, buffer)
                     return
         else:
-            success, message = create_completion(storage, choice)
+            success, message = create_completion(storage, choice, buffer)
             print(message)
 
 
+# region Habit picker
+class HabitCompleter(Completer):
+
+    """
+    Completer querying storage for matching habits on every keystroke.
+
+    Extra choices (e.g. "Main Menu") are offered when they match the typed text.
+    """
+
+    def __init__(self, storage, extra_choices=None, limit=SEARCH_RESULT_LIMIT):
+        self.storage = storage
+        self.extra_choices = extra_choices or []
+        self.limit = limit
+
+    def get_completions(self, document, complete_event):
+        text = document.text_before_cursor
+        names = self.storage.search_habits(text, self.limit) if text.strip() else \
+            self.storage.load_habits_page(limit=self.limit)
+        extras = filter(lambda choice: text.strip().lower() in choice.lower(), self.extra_choices)
+        for name in names + list(extras):
+            yield Completion(name, start_position=-len(text))
+
+
+def choose_habit(storage, message, extra_choices=None):
+    """
+    Prompt the user to pick a habit, scaling with the size of the catalog.
+
+    Small catalogs keep the plain select list. Above SELECT_LIST_LIMIT habits
+    the user types to search instead, so the prompt never loads or renders
+    the whole catalog.
+
+    Args:
+        storage (HabitStorage): Database storage object
+        message (str): Prompt message
+        extra_choices (list, optional): Non-habit choices such as "Exit"
+
+    Returns:
+        str or None: Selected habit or extra choice, None if canceled
+    """
+    extra_choices = extra_choices or []
+    first_page = storage.load_habits_page(limit=SELECT_LIST_LIMIT + 1)
+    if len(first_page) <= SELECT_LIST_LIMIT:
+        choices = first_page + extra_choices
+        if not choices:
+            return None
+        return questionary.select(message, choices=choices).ask()
+
+    def validate(text):
+        if text in extra_choices or storage.load_habit(text) is not None:
+            return True
+        return "Type to search and pick a habit from the list"
+
+    return questionary.autocomplete(
+        message, choices=[], completer=HabitCompleter(storage, extra_choices),
+        validate=validate, complete_style=CompleteStyle.MULTI_COLUMN).ask()
+# endregion Habit picker
+
+
 def smart_start(storage):
     """
     Display smart start menu for quick habit selection or navigation.
@@ -156,31 +363,31 @@ def smart_start(storage):
     Gets list of available habits, adds Main Menu and exit options. Prompts user to make a choice.
     
     Args:
-        storage (SQLiteStorage): Database storage object
+        storage (HabitStorage): Database storage object
         
     Returns:
         str: User's selected choice (habit name, "Main Menu", or "Exit")
     """
-    habits = storage.load_all_habits()
-    choices = habits + ["Main Menu", "Exit"]
+    return choose_habit(storage, "What do you want to do?", ["Main Menu", "Exit"])
 
-    return questionary.select("What do you want to do?", choices=choices).ask()
 
-
-def create_completion(storage, habit):
+def create_completion(storage, habit, buffer=None):
     """
     Handle new completion through CLI interface.
     
     Gets today's date and saves it together with habit name to database.
     
     Args:
-        storage (SQLiteStorage): Database storage object
+        storage (HabitStorage): Database storage object
         habit (str): Name of a habit for completion
+        buffer (CompletionWriteBuffer, optional): Queue completion instead of committing directly
         
     Returns:
         tuple: (success: bool, message: str)
     """
     today = datetime.now().date()
+    if buffer is not None:
+        return buffer.submit(habit, today)
     data = (habit, today)
     
     success, message = storage.save_tracking_data(data)
@@ -194,7 +401,7 @@ def main_menu(storage):
     Prompts user to select next action in the app.
 
     Args:
-        storage (SQLiteStorage): Database storage object (unused but maintained for API consistency)
+        storage (HabitStorage): Database storage object (unused but maintained for API consistency)
     
     Returns:
         str: User's selected choice or "Exit" if cancelled
@@ -215,7 +422,7 @@ def main_menu(storage):
     return menu_choice
 
 
-def show_analytics(storage):
+def show_analytics(storage, cache=None):
     """
     Display analytics for selected habit or cross-habit streak comparison.
     
@@ -229,31 +436,56 @@ def show_analytics(storage):
         Known UX limitation: Habits without tracking data will show 
         duplicate "No tracking data found" messages from longest_streak() 
         and current_streak(), while completion_rate() shows 0%.
+
+    Args:
+        storage (HabitStorage): Database storage object
+        cache (AnalyticsCache, optional): Cache for results, so reopening the
+            menu without new completions does not recompute them
         
     Returns:
         str or False:
             - str: Formatted analytics message for display
             - False if user cancels selection or goes back to main menu
     """
-    habits = storage.load_all_habits()
-    choices = habits + ["Longest Streak by periodicity","Go back to main Menu"]
-    choice = questionary.select("Choose a habit for analytics: ", choices=choices).ask()
+    choice = choose_habit(storage, "Choose a habit for analytics: ",
+                          ["Longest Streak by periodicity", "Go back to main Menu"])
 
     if choice == "Go back to main Menu":
         return False
     
-    elif choice == "Longest Streak by periodicity":
-        message = longest_streak_by_periodicity(storage)
+    if cache is None:
+        cache = AnalyticsCache(storage)
+
+    if choice == "Longest Streak by periodicity":
+        message = cache.get(longest_streak_by_periodicity)
 
     else:
-        longest = longest_streak(storage, choice)
-        current = current_streak(storage, choice)
-        completion = completion_rate(storage, choice)
+        longest = cache.get(longest_streak, choice)
+        current = cache.get(current_streak, choice)
+        completion = cache.get(completion_rate, choice)
 
         message = f'Analytics for {choice}:\n{longest}\n{current}\n{completion}'
     
     return message
 
+def analytics_report(storage):
+    """
+    Build the analytics of all habits without prompting.
+
+    Non-interactive counterpart of show_analytics(), e.g. to reproduce
+    slow analytics under --profile.
+
+    Args:
+        storage (HabitStorage): Database storage object
+
+    Returns:
+        str: Analytics of every habit followed by the longest streak by periodicity
+    """
+    sections = map(lambda habit: f'Analytics for {habit}:\n{longest_streak(storage, habit)}\n'
+                                 f'{current_streak(storage, habit)}\n{completion_rate(storage, habit)}',
+                   storage.load_all_habits())
+    return "\n\n".join(list(sections) + [longest_streak_by_periodicity(storage)])
+
 def create_habit(storage):
     """
     Handle new habit creation through CLI interface.
@@ -262,7 +494,7 @@ def create_habit(storage):
     Includes error recovery workflow for invalid inputs.
     
     Args:
-        storage (SQLiteStorage): Database storage object
+        storage (HabitStorage): Database storage object
         
     Returns:
         tuple: (success: bool, message: str)
@@ -282,7 +514,11 @@ def create_habit(storage):
     elif name.strip() in ["daily", "weekly", "monthly"]:
         return False, "Error: Invalid habit name"
     
-    periodicity = questionary.select("Select periodicity: ", choices=["daily", "weekly", "monthly"]).ask()
+    periodicity = questionary.select(
+        "Select periodicity: ", choices=["daily", "weekly", "monthly", "every N days", "N times per week"]).ask()
+    if periodicity in ["every N days", "N times per week"]:
+        count = questionary.text("Enter N:").ask()
+        periodicity = periodicity.replace("N", (count or "").strip())
     description = questionary.text("Enter description (optional):").ask()
 
     try:
@@ -303,14 +539,15 @@ def get_habits_by_periodicity(storage):
     from the database with the specified periodicity.
     
     Args:
-        storage (SQLiteStorage): Database storage object
+        storage (HabitStorage): Database storage object
         
     Returns:
         tuple: (periodicity: str, result: list)
             - periodicity: Selected periodicity type
             - result: List of habit names matching the periodicity
     """
-    periodicity = questionary.select("Select periodicity: ", choices=["daily", "weekly", "monthly"]).ask()
+    choices = report_periodicities(storage.load_periodicities())
+    periodicity = questionary.select("Select periodicity: ", choices=choices).ask()
     result = storage.load_all_habits_by_periodicity(periodicity)
     return (periodicity, result)
 
@@ -322,39 +559,48 @@ def delete_habit(storage):
     Includes error recovery workflow for invalid inputs.
     
     Args:
-        storage (SQLiteStorage): Database storage object
+        storage (HabitStorage): Database storage object
         
     Returns:
         tuple: (success: bool, message: str)
     """
 
-    choices = storage.load_all_habits()
-    if not choices:
+    if not storage.load_habits_page(limit=1):
         return (False, "No habits to delete")
     
-    habit = questionary.select("Choose a habit to delete: ", choices=choices).ask()
+    habit = choose_habit(storage, "Choose a habit to delete: ")
     if not habit:
         return (False, "Deletion canceled")
 
-    success, message = storage.delete_habit(habit)
+    success, message = storage.delete_habit_chunked(habit)
     
     return (success, message)
 
 
-def quit_app(conn):
+def quit_app(conn, buffer=None):
     """
     Quit the application gracefully.
     
-    Displays goodbye message and closes database connection.
+    Stops the write-behind buffer after flushing queued completions, displays
+    goodbye message and closes database connections.
 
     Args:
         conn (sqlite3.connection): connection to SQLite3 Database.
+        buffer (CompletionWriteBuffer, optional): Write-behind buffer to flush before closing
     
     Returns:
         None: Function performs cleanup and exits
     """
+    if buffer is not None:
+        buffer.close()
+        for (habit, completion_date), message in buffer.failed:
+            print(f'Completion of {habit} on {completion_date} was not saved: {message}', file=sys.stderr)
+        if buffer.storage.connection is not conn:
+            buffer.storage.connection.close()
     print("See you next time!")
     print("The app has been closed")
+    # Lets SQLite refresh statistics of tables whose queries would benefit, usually a no-op
+    conn.execute("PRAGMA optimize")
     conn.close()
 
 
@@ -0,0 +1,382 @@
+"""
+Database maintenance: statistics, free space and WAL checkpoints.
+
+A maintenance run looks at the database and only does what is needed:
+- checkpoint: PASSIVE WAL checkpoint, never waits for readers or writers
+- vacuum: incremental vacuum when free pages exceed FREE_PAGE_RATIO of the
+  file, released in small steps so writers are blocked for one step at a time
+- analyze: bounded ANALYZE when more than CHURN_RATIO of the tracking rows
+  changed since the last one, or ANALYZE_INTERVAL passed
+- optimize: PRAGMA optimize, always
+
+Incremental vacuum needs auto_vacuum = INCREMENTAL. setup_database() creates
+new databases that way; older files are converted once with
+enable_incremental_vacuum(), a full VACUUM that needs exclusive access.
+Until then a run only reports that a vacuum is recommended.
+
+Every step that finds the database busy is skipped and retried by the
+next run, so maintenance can run next to the CLI and the API server.
+
+Usage:
+    python maintenance.py --db habits.db
+    python maintenance.py --db habits.db --interval 3600
+    python maintenance.py --db habits.db --enable-incremental
+"""
+
+# region imports
+import sys
+import time
+import sqlite3
+import argparse
+import threading
+from datetime import datetime, timedelta
+
+from metrics import REGISTRY
+from archive import database_size
+from storage import is_busy_error
+
+# endregion imports
+
+FREE_PAGE_RATIO = 0.1
+MIN_FREE_PAGES = 64
+CHURN_RATIO = 0.2
+ANALYZE_INTERVAL = timedelta(days=7)
+ANALYSIS_LIMIT = 1000
+VACUUM_STEP_PAGES = 256
+DEFAULT_SLEEP = 0.01
+BUSY_TIMEOUT_MS = 5000
+# auto_vacuum values of PRAGMA auto_vacuum
+AUTO_VACUUM_MODES = {0: "none", 1: "full", 2: "incremental"}
+
+MAINTENANCE_RUNS = REGISTRY.counter(
+    "habit_tracker_maintenance_runs_total", "Completed database maintenance runs")
+MAINTENANCE_LATENCY = REGISTRY.histogram(
+    "habit_tracker_maintenance_seconds", "Duration of database maintenance runs")
+MAINTENANCE_RECLAIMED = REGISTRY.counter(
+    "habit_tracker_maintenance_reclaimed_bytes_total", "Bytes returned to the file system by incremental vacuum")
+
+
+# region Schema
+def ensure_maintenance_schema(connection):
+    """
+    Create the maintenance_state table if it doesn't exist.
+
+    Holds one row with the change log position, tracking row count and
+    time of the last ANALYZE, so the next run can measure churn since then.
+
+    Args:
+        connection (sqlite3.Connection): Database connection
+    """
+    connection.execute("""
+        CREATE TABLE IF NOT EXISTS maintenance_state(
+            state_id INTEGER PRIMARY KEY CHECK (state_id = 1),
+            analyzed_seq INTEGER NOT NULL,
+            analyzed_rows INTEGER NOT NULL,
+            analyzed_at DATETIME NOT NULL,
+            last_run DATETIME)
+    """)
+    connection.commit()
+
+
+def enable_incremental_vacuum(connection):
+    """
+    Switch an existing database to auto_vacuum = INCREMENTAL.
+
+    Takes effect through a full VACUUM, which rewrites the file and needs
+    exclusive access; run it while the CLI and API server are stopped.
+
+    Args:
+        connection (sqlite3.Connection): Database connection
+
+    Returns:
+        dict: {"bytes_before": int, "bytes_after": int, "seconds": float}
+    """
+    started = time.perf_counter()
+    bytes_before = database_size(connection)
+    connection.execute("PRAGMA auto_vacuum = INCREMENTAL")
+    connection.execute("VACUUM")
+    return {
+        "bytes_before": bytes_before,
+        "bytes_after": database_size(connection),
+        "seconds": time.perf_counter() - started
+    }
+# endregion Schema
+
+
+# region Planning
+def _pragma(connection, name):
+    """Return the single value of a PRAGMA."""
+    return connection.execute(f"PRAGMA {name}").fetchone()[0]
+
+
+def _tracking_rows(connection):
+    """Return the number of tracking rows."""
+    return connection.execute("SELECT COUNT(*) FROM tracking").fetchone()[0]
+
+
+def _change_seq(connection):
+    """Return the latest change log sequence number, None without change log."""
+    if connection.execute("SELECT 1 FROM sqlite_master WHERE name = 'change_log'").fetchone() is None:
+        return None
+    return connection.execute("SELECT MAX(seq) FROM change_log").fetchone()[0] or 0
+
+
+def plan_maintenance(connection, now=None, force=False):
+    """
+    Decide which maintenance steps a database needs.
+
+    Args:
+        connection (sqlite3.Connection): Database connection
+        now (datetime, optional): Current time, default now
+        force (bool): Run every step that applies regardless of the thresholds
+
+    Returns:
+        dict: {step: reason} for the steps to run, in run order. Steps are
+        "checkpoint", "vacuum", "analyze" and "optimize"; "vacuum_recommended"
+        means free pages can only be released by enable_incremental_vacuum().
+    """
+    ensure_maintenance_schema(connection)
+    now = now or datetime.now()
+    plan = {}
+    if _pragma(connection, "journal_mode") == "wal":
+        plan["checkpoint"] = "WAL mode"
+
+    free_pages, page_count = _pragma(connection, "freelist_count"), _pragma(connection, "page_count")
+    if free_pages and (force or (free_pages >= MIN_FREE_PAGES and free_pages >= FREE_PAGE_RATIO * page_count)):
+        reason = f"{free_pages} of {page_count} pages free"
+        if AUTO_VACUUM_MODES[_pragma(connection, "auto_vacuum")] == "incremental":
+            plan["vacuum"] = reason
+        else:
+            plan["vacuum_recommended"] = reason
+
+    state = connection.execute("SELECT analyzed_seq, analyzed_rows, analyzed_at FROM maintenance_state").fetchone()
+    if force:
+        plan["analyze"] = "forced"
+    elif state is None:
+        plan["analyze"] = "no statistics yet"
+    elif now - datetime.fromisoformat(state[2]) >= ANALYZE_INTERVAL:
+        plan["analyze"] = f"last ANALYZE on {state[2][:10]}"
+    else:
+        # Logged changes miss cascades of delete_habit, the row count drift catches them
+        changes = max((_change_seq(connection) or 0) - state[0], abs(_tracking_rows(connection) - state[1]))
+        if changes > CHURN_RATIO * max(state[1], 1):
+            plan["analyze"] = f"{changes} changed rows since last ANALYZE, {state[1]} tracking rows"
+    plan["optimize"] = "every run"
+    return plan
+# endregion Planning
+
+
+# region Running
+def run_maintenance(connection, now=None, force=False, step_pages=VACUUM_STEP_PAGES, sleep=DEFAULT_SLEEP):
+    """
+    Run the maintenance steps the database needs.
+
+    Each step commits on its own. A step that finds the database locked is
+    skipped and listed in the report; the other steps still run.
+
+    Args:
+        connection (sqlite3.Connection): Database connection, ideally with a busy timeout
+        now (datetime, optional): Current time, default now
+        force (bool): Run every step that applies regardless of the thresholds
+        step_pages (int): Free pages released per incremental vacuum step
+        sleep (float): Seconds to pause between vacuum steps, lets other writers in
+
+    Returns:
+        dict: {"steps": {step: reason}, "skipped": [step], "seconds": float,
+               "bytes_before": int, "bytes_after": int, "reclaimed_bytes": int,
+               "free_pages_before": int, "free_pages_after": int, "checkpointed_frames": int}
+    """
+    started = time.perf_counter()
+    now = now or datetime.now()
+    plan = plan_maintenance(connection, now, force)
+    bytes_before = database_size(connection)
+    free_pages_before = _pragma(connection, "freelist_count")
+    skipped = []
+    checkpointed = 0
+
+    def checkpoint():
+        nonlocal checkpointed
+        busy, frames, done = connection.execute("PRAGMA wal_checkpoint(PASSIVE)").fetchone()
+        checkpointed = max(done, 0)
+
+    def vacuum():
+        while _pragma(connection, "freelist_count") > 0:
+            connection.execute(f"PRAGMA incremental_vacuum({int(step_pages)})").fetchall()
+            time.sleep(sleep)
+
+    def analyze():
+        seq, rows = _change_seq(connection) or 0, _tracking_rows(connection)
+        connection.execute(f"PRAGMA analysis_limit = {ANALYSIS_LIMIT}")
+        connection.execute("ANALYZE")
+        connection.execute("""
+            INSERT INTO maintenance_state (state_id, analyzed_seq, analyzed_rows, analyzed_at) VALUES (1, ?, ?, ?)
+            ON CONFLICT(state_id) DO UPDATE SET analyzed_seq = excluded.analyzed_seq,
+                analyzed_rows = excluded.analyzed_rows, analyzed_at = excluded.analyzed_at
+            """, (seq, rows, now.isoformat(timespec="seconds")))
+        connection.commit()
+
+    def optimize():
+        connection.execute("PRAGMA optimize").fetchall()
+
+    steps = {"checkpoint": checkpoint, "vacuum": vacuum, "analyze": analyze, "optimize": optimize}
+    for step in plan:
+        if step not in steps:
+            continue
+        try:
+            steps[step]()
+        except sqlite3.OperationalError as e:
+            if not is_busy_error(e):
+                raise e
+            if connection.in_transaction:
+                connection.rollback()
+            skipped.append(step)
+
+    try:
+        connection.execute("UPDATE maintenance_state SET last_run = ?", (now.isoformat(timespec="seconds"),))
+        connection.commit()
+    except sqlite3.OperationalError as e:
+        if not is_busy_error(e):
+            raise e
+        connection.rollback()
+
+    bytes_after = database_size(connection)
+    elapsed = time.perf_counter() - started
+    MAINTENANCE_RUNS.inc()
+    MAINTENANCE_LATENCY.observe(elapsed)
+    MAINTENANCE_RECLAIMED.inc(max(bytes_before - bytes_after, 0))
+    return {
+        "steps": plan,
+        "skipped": skipped,
+        "seconds": elapsed,
+        "bytes_before": bytes_before,
+        "bytes_after": bytes_after,
+        "reclaimed_bytes": bytes_before - bytes_after,
+        "free_pages_before": free_pages_before,
+        "free_pages_after": _pragma(connection, "freelist_count"),
+        "checkpointed_frames": checkpointed
+    }
+
+
+def format_report(report):
+    """
+    Format a maintenance report as text.
+
+    Args:
+        report (dict): Result of run_maintenance()
+
+    Returns:
+        str: One line per step followed by a summary line
+    """
+    lines = [f'{step}: {reason}' + (" (skipped, database busy)" if step in report["skipped"] else "")
+             for step, reason in report["steps"].items()]
+    lines.append(f'Reclaimed {report["reclaimed_bytes"]} bytes '
+                 f'({report["bytes_before"]} -> {report["bytes_after"]}), '
+                 f'{report["free_pages_after"]} free pages left, {report["seconds"]:.2f}s')
+    return "\n".join(lines)
+# endregion Running
+
+
+# region MaintenanceScheduler class
+class MaintenanceScheduler:
+
+    """
+    Runs database maintenance in a background thread.
+
+    Uses its own connection with a busy timeout, so it can run inside the
+    API server or next to the CLI. Each run does only what plan_maintenance()
+    finds necessary; most runs just checkpoint and optimize.
+
+    Attributes:
+        path (str): Database file
+        interval (float): Seconds between runs of the background thread
+        runs (int): Number of completed runs
+        last_report (dict): Report of the latest run, None before the first
+    """
+
+    def __init__(self, path, interval=3600.0, busy_timeout=BUSY_TIMEOUT_MS):
+        self.path = path
+        self.interval = interval
+        self.runs = 0
+        self.last_report = None
+        self._connection = sqlite3.connect(path, check_same_thread=False)
+        self._connection.execute(f"PRAGMA busy_timeout = {int(busy_timeout)}")
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread = None
+
+    def run(self, force=False):
+        """
+        Run maintenance now.
+
+        Args:
+            force (bool): Run every step that applies regardless of the thresholds
+
+        Returns:
+            dict: Report of run_maintenance()
+        """
+        with self._lock:
+            self.last_report = run_maintenance(self._connection, force=force)
+            self.runs += 1
+            return self.last_report
+
+    def start(self):
+        """Run maintenance every interval seconds in a background thread."""
+        if self._thread is not None:
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            try:
+                self.run()
+            except sqlite3.Error as e:
+                print(f"Database maintenance failed: {e}", file=sys.stderr)
+
+    def close(self):
+        """Stop the background thread and close the connection."""
+        if self._thread is not None:
+            self._stop.set()
+            self._thread.join()
+            self._thread = None
+        self._connection.close()
+# endregion MaintenanceScheduler class
+
+
+def main(argv=None):
+    """Run database maintenance once or on a schedule from the command line."""
+    parser = argparse.ArgumentParser(description="Maintain the habits database")
+    parser.add_argument("--db", default="habits.db", help="SQLite database file")
+    parser.add_argument("--force", action="store_true", help="Run all steps regardless of thresholds")
+    parser.add_argument("--interval", type=float, default=None, help="Repeat every INTERVAL seconds")
+    parser.add_argument("--enable-incremental", action="store_true",
+                        help="Switch the file to incremental vacuum with a full VACUUM (needs exclusive access)")
+    args = parser.parse_args(argv)
+
+    if args.enable_incremental:
+        conn = sqlite3.connect(args.db)
+        try:
+            result = enable_incremental_vacuum(conn)
+        finally:
+            conn.close()
+        print(f'Incremental vacuum enabled, {result["bytes_before"]} -> {result["bytes_after"]} bytes '
+              f'in {result["seconds"]:.2f}s')
+        return 0
+
+    scheduler = MaintenanceScheduler(args.db, args.interval or 3600.0)
+    try:
+        print(format_report(scheduler.run(args.force)))
+        if args.interval:
+            scheduler.start()
+            while True:
+                time.sleep(3600)
+    except KeyboardInterrupt:
+        pass
+    finally:
+        scheduler.close()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
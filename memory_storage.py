@@ -0,0 +1,381 @@
+"""
+In-memory storage backend.
+
+Keeps habits in dicts and every habit's completions as a sorted
+array('i') of day ordinals, kept in order by bisect insertion. Nothing
+is written to disk. Meant for ephemeral workloads, simulations and fast
+tests: MemoryStorage implements the HabitStorage protocol with the same
+return values as SQLiteStorage, so analytics, the CLI and the API server
+run on it unchanged.
+"""
+
+# region imports
+from array import array
+from bisect import bisect_left, bisect_right, insort
+from collections import namedtuple
+from datetime import date, datetime, timedelta
+
+from storage import (HABIT_CREATED, HABIT_DELETED, COMPLETION_ADDED, COMPLETION_DELETED,
+                     INVALID_HABIT_NAME, HABIT_NOT_FOUND, NO_SUCH_HABIT, NO_DATA_FOUND)
+
+# endregion imports
+
+HABIT_COLUMNS = ("habit_id", "habit_name", "habit_periodicity", "habit_description")
+# SQLite stores any string, this backend needs a real date to store an ordinal
+INVALID_COMPLETION_DATE = "Invalid completion date"
+
+
+class HabitRecord(namedtuple("HabitRecord", HABIT_COLUMNS)):
+
+    """Habit row with access by index and by column name, like sqlite3.Row."""
+
+    __slots__ = ()
+
+    def __getitem__(self, key):
+        if isinstance(key, str):
+            if key not in self._fields:
+                raise IndexError("No item with that key")
+            key = self._fields.index(key)
+        return super().__getitem__(key)
+
+    def keys(self):
+        """Return the column names, so dict(record) works as for sqlite3.Row."""
+        return list(self._fields)
+
+
+def parse_day(value):
+    """Return the day ordinal of a date or "%Y-%m-%d" string, None if it isn't a date."""
+    try:
+        return datetime.strptime(str(value), "%Y-%m-%d").date().toordinal()
+    except ValueError:
+        return None
+
+
+def format_day(ordinal):
+    """Return a day ordinal as ISO date string, as stored in SQLite."""
+    return date.fromordinal(ordinal).isoformat()
+
+
+# region MemoryStorage class
+class MemoryStorage:
+
+    """
+    Storage backend that keeps all data in process memory.
+
+    Completions are day ordinals in one sorted array('i') per habit, so
+    loading a habit copies a compact array and range queries are bisects.
+    Duplicate completions on the same day are kept, as in the default
+    SQLite layout. Completion dates must be real dates and are returned as
+    ISO strings ("2025-8-31" comes back as "2025-08-31"); other values are
+    rejected with INVALID_COMPLETION_DATE instead of being stored as text.
+    There is no archive tier.
+
+    Attributes:
+        has_archive (bool): Always False
+        has_changelog (bool): Whether changes are logged for changes_since()
+        write_version (int): Number of writes made through this storage object
+    """
+
+    def __init__(self, changelog=True):
+        """
+        Initialize an empty storage.
+
+        Args:
+            changelog (bool): Keep a change log like a database with the change_log table
+        """
+        self.has_archive = False
+        self.has_changelog = changelog
+        self.write_version = 0
+        self._habit_versions = {}
+        self._habits = {}
+        # Names in binary order, the order of SQLite's habit_name index
+        self._names = []
+        self._completions = {}
+        self._next_id = 1
+        self._changes = []
+        self._habit_seqs = {}
+
+    # region Change tracking
+    def _record_write(self, habit_name):
+        """Bump global and per-habit write counters after a change."""
+        self.write_version += 1
+        self._habit_versions[habit_name] = self._habit_versions.get(habit_name, 0) + 1
+
+    def _log_change(self, operation, habit_id, habit_name, completion_date=None):
+        """Append a change, no-op without change log."""
+        if self.has_changelog:
+            seq = len(self._changes) + 1
+            self._changes.append((seq, operation, habit_id, habit_name, completion_date))
+            self._habit_seqs[habit_name] = seq
+
+    def change_marker(self, habit=None):
+        """Return a marker that changes whenever data for a habit may have changed."""
+        if self.has_changelog:
+            if habit is None:
+                return ("seq", self.last_change_seq())
+            return ("seq", self._habit_seqs.get(habit, 0))
+        if habit is None:
+            return (0, self.write_version)
+        return (0, self._habit_versions.get(habit, 0))
+
+    def last_change_seq(self):
+        """Return the sequence number of the newest change, 0 if nothing was logged yet."""
+        return len(self._changes)
+
+    def changes_since(self, seq=0, batch_size=500):
+        """
+        Stream changes logged after a sequence number, oldest first.
+
+        Yields:
+            tuple: (seq: int, operation: str, habit_name: str, completion_date: str or None)
+
+        Raises:
+            ValueError: If the change log is disabled
+        """
+        if not self.has_changelog:
+            raise ValueError("Change log is not enabled")
+        # Sequence numbers are list positions + 1, changes made while iterating are picked up
+        position = max(seq, 0)
+        while position < len(self._changes):
+            change_seq, operation, _, habit_name, completion_date = self._changes[position]
+            yield (change_seq, operation, habit_name, completion_date)
+            position += 1
+
+    def dirty_habits(self, since_seq=0):
+        """
+        Return names of existing habits changed after a sequence number, sorted.
+
+        Raises:
+            ValueError: If the change log is disabled
+        """
+        if not self.has_changelog:
+            raise ValueError("Change log is not enabled")
+        habit_ids = {record.habit_id: record.habit_name for record in self._habits.values()}
+        changed = {change[2] for change in self._changes[max(since_seq, 0):]}
+        return sorted(habit_ids[habit_id] for habit_id in changed if habit_id in habit_ids)
+    # endregion Change tracking
+
+    # region Habit operations
+    def save_habit(self, habit):
+        """Save a new habit, return False if the name already exists."""
+        if habit.name in self._habits:
+            return False
+        record = HabitRecord(self._next_id, habit.name, habit.periodicity, habit.description)
+        self._next_id += 1
+        self._habits[habit.name] = record
+        self._completions[record.habit_id] = array("i")
+        insort(self._names, habit.name)
+        self._log_change(HABIT_CREATED, record.habit_id, habit.name)
+        self._record_write(habit.name)
+        return True
+
+    def load_habit(self, habit):
+        """Return the HabitRecord of a habit, None if not found."""
+        return self._habits.get(habit)
+
+    def load_all_habits(self):
+        """Return all habit names, case-insensitively sorted like SQLite's scan of the NOCASE index."""
+        return sorted(self._names, key=str.lower)
+
+    def load_habits_page(self, after=None, limit=50, prefix=None):
+        """Return one page of habit names in alphabetical order, see SQLiteStorage.load_habits_page()."""
+        start = bisect_right(self._names, after) if after is not None else 0
+        page = []
+        for name in self._names[start:]:
+            if len(page) >= limit:
+                break
+            if not prefix or name.lower().startswith(prefix.lower()):
+                page.append(name)
+        return page
+
+    def search_habits(self, text, limit=20):
+        """Search habits by name prefix, then by substring in name or description."""
+        if not text or not text.strip():
+            return []
+        text = text.strip().lower()
+        names = sorted(filter(lambda name: name.lower().startswith(text), self._names), key=str.lower)[:limit]
+        seen = set(names)
+        for name in self._names:
+            if len(names) >= limit:
+                break
+            description = self._habits[name].habit_description or ""
+            if name not in seen and (text in name.lower() or text in description.lower()):
+                names.append(name)
+                seen.add(name)
+        return names
+
+    def delete_habit(self, habit):
+        """Delete a habit with all its completions, return (success, message)."""
+        record = self._habits.pop(habit, None)
+        if record is None:
+            return (False, NO_SUCH_HABIT)
+        del self._completions[record.habit_id]
+        del self._names[bisect_left(self._names, habit)]
+        self._log_change(HABIT_DELETED, record.habit_id, habit)
+        self._record_write(habit)
+        return (True, "Habit succesfully deleted")
+
+    def delete_habit_chunked(self, habit, chunk_size=1000, progress=None):
+        """
+        Delete a habit after removing its completions chunk_size at a time.
+
+        Raises:
+            ValueError: If chunk_size is not positive
+        """
+        if chunk_size < 1:
+            raise ValueError("Invalid chunk size")
+        record = self._habits.get(habit)
+        if record is None:
+            return (False, NO_SUCH_HABIT)
+        days = self._completions[record.habit_id]
+        deleted = 0
+        while days:
+            chunk = days[:chunk_size]
+            del days[:chunk_size]
+            for ordinal in chunk:
+                self._log_change(COMPLETION_DELETED, record.habit_id, habit, format_day(ordinal))
+            self._record_write(habit)
+            deleted += len(chunk)
+            if progress:
+                progress(deleted, (record.habit_id, format_day(chunk[-1])))
+        return self.delete_habit(habit)
+    # endregion Habit operations
+
+    # region Tracking Operations
+    def _resolve(self, habit_name):
+        """Return the HabitRecord of a habit or the error message of SQLiteStorage."""
+        if not habit_name or not habit_name.strip():
+            return INVALID_HABIT_NAME
+        return self._habits.get(habit_name, HABIT_NOT_FOUND)
+
+    def save_tracking_data(self, data):
+        """Save one completion given as (habit_name, completion_date), return (success, message)."""
+        record = self._resolve(data[0])
+        if isinstance(record, str):
+            return (False, record)
+        ordinal = parse_day(data[1])
+        if ordinal is None:
+            return (False, INVALID_COMPLETION_DATE)
+        insort(self._completions[record.habit_id], ordinal)
+        self._log_change(COMPLETION_ADDED, record.habit_id, record.habit_name, format_day(ordinal))
+        self._record_write(record.habit_name)
+        return (True, "Successfully saved")
+
+    def save_tracking_batch(self, data):
+        """Save many completions, return (saved, failed) like SQLiteStorage.save_tracking_batch()."""
+        saved = 0
+        failed = []
+        for habit_name, completion_date in data:
+            success, message = self.save_tracking_data((habit_name, completion_date))
+            if success:
+                saved += 1
+            else:
+                failed.append(((habit_name, completion_date), message))
+        return (saved, failed)
+
+    def load_tracking_data(self, habit_name, include_archive=True):
+        """Return [(completion_date,), ...] in date order, or the SQLiteStorage error message."""
+        record = self._resolve(habit_name)
+        if isinstance(record, str):
+            return record
+        return [(format_day(ordinal),) for ordinal in self._completions[record.habit_id]]
+
+    def delete_tracking_data(self, data):
+        """Delete all completions of a habit on one day, return the SQLiteStorage message."""
+        record = self._resolve(data[0])
+        if isinstance(record, str):
+            return record
+        ordinal = parse_day(data[1])
+        days = self._completions[record.habit_id]
+        if ordinal is None:
+            return NO_DATA_FOUND
+        first, last = bisect_left(days, ordinal), bisect_right(days, ordinal)
+        if first == last:
+            return NO_DATA_FOUND
+        del days[first:last]
+        self._log_change(COMPLETION_DELETED, record.habit_id, record.habit_name, format_day(ordinal))
+        self._record_write(record.habit_name)
+        return "Data successfully deleted"
+
+    def load_all_habits_by_periodicity(self, periodicity):
+        """Return names of all habits with the given periodicity."""
+        return [record.habit_name for record in self._habits.values() if record.habit_periodicity == periodicity]
+
+    def load_periodicities(self):
+        """Return the distinct periodicities of all habits, sorted."""
+        return sorted({record.habit_periodicity for record in self._habits.values()})
+
+    def iter_tracking_data(self, periodicity=None, shard=None):
+        """
+        Yield (habit_name, habit_periodicity, dates) per habit with completions.
+
+        Habits come in creation order like the habit_id order of SQLiteStorage,
+        and shard (index, count) selects habit_id % count == index like there.
+
+        Raises:
+            ValueError: If shard is not (index, count) with 0 <= index < count
+        """
+        if shard is not None and not 0 <= shard[0] < shard[1]:
+            raise ValueError("Shard must be (index, count) with 0 <= index < count")
+        for record in list(self._habits.values()):
+            if periodicity is not None and record.habit_periodicity != periodicity:
+                continue
+            if shard is not None and record.habit_id % shard[1] != shard[0]:
+                continue
+            days = self._completions.get(record.habit_id)
+            if days:
+                yield (record.habit_name, record.habit_periodicity, list(map(format_day, days)))
+
+    def load_archive_summary(self, habit_name):
+        """Return None, this backend has no archive tier."""
+        return None
+    # endregion Tracking Operations
+
+    # region Retention
+    def purge_tracking_data(self, older_than_days, chunk_size=1000, today=None, start_after=None, progress=None):
+        """
+        Delete completions older than a retention period in chunks.
+
+        Same chunking and (habit_id, completion_date) keys as SQLiteStorage
+        in the clustered layout, see SQLiteStorage.purge_tracking_data().
+
+        Returns:
+            dict: {"deleted": int, "chunks": int, "last_key": tuple or None}
+
+        Raises:
+            ValueError: If older_than_days is negative or chunk_size is not positive
+        """
+        if older_than_days < 0 or chunk_size < 1:
+            raise ValueError("Invalid retention settings")
+        cutoff = ((today or datetime.now().date()) - timedelta(days=older_than_days)).toordinal()
+        deleted, chunks, last_key = 0, 0, start_after
+        while True:
+            after_id, after_day = (last_key[0], parse_day(last_key[1])) if last_key else (0, None)
+            chunk = []
+            remaining = chunk_size
+            for record in self._habits.values():
+                if record.habit_id < after_id:
+                    continue
+                days = self._completions[record.habit_id]
+                first = bisect_right(days, after_day) if record.habit_id == after_id and after_day else 0
+                last = min(bisect_left(days, cutoff), first + remaining)
+                if last > first:
+                    chunk.append((record, first, last))
+                    remaining -= last - first
+                if not remaining:
+                    break
+            if not chunk:
+                break
+            for record, first, last in chunk:
+                days = self._completions[record.habit_id]
+                for ordinal in days[first:last]:
+                    self._log_change(COMPLETION_DELETED, record.habit_id, record.habit_name, format_day(ordinal))
+                last_key = (record.habit_id, format_day(days[last - 1]))
+                del days[first:last]
+                self._record_write(record.habit_name)
+            deleted, chunks = deleted + chunk_size - remaining, chunks + 1
+            if progress:
+                progress(deleted, last_key)
+        return {"deleted": deleted, "chunks": chunks, "last_key": last_key}
+    # endregion Retention
+# endregion MemoryStorage class
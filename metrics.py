@@ -0,0 +1,317 @@
+"""
+Metrics registry for habit tracker operations.
+
+Provides counters and latency histograms for storage and analytics calls and
+exports them in Prometheus text format, either to a textfile-collector path
+or on a local-only HTTP endpoint.
+"""
+
+# region imports
+import os
+import time
+import socket
+import threading
+import functools
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+# endregion imports
+
+DEFAULT_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5)
+LOCAL_HOSTS = ("127.0.0.1", "localhost", "::1")
+IPV6_HOSTS = ("::1",)
+
+
+def format_labels(labelnames, labelvalues, extra=()):
+    """
+    Format label pairs as Prometheus label string.
+
+    Args:
+        labelnames (tuple): Label names
+        labelvalues (tuple): Label values in same order as labelnames
+        extra (tuple): Additional (name, value) pairs appended at the end
+
+    Returns:
+        str: '{name="value",...}' or empty string if there are no labels
+    """
+    pairs = list(zip(labelnames, labelvalues)) + list(extra)
+    if not pairs:
+        return ""
+    escaped = map(lambda pair: (pair[0], str(pair[1]).replace("\\", "\\\\").replace('"', '\\"')), pairs)
+    return "{" + ",".join(f'{name}="{value}"' for name, value in escaped) + "}"
+
+
+# region Metric classes
+class Counter:
+
+    """
+    Monotonically increasing counter with optional labels.
+
+    Attributes:
+        name (str): Metric name
+        documentation (str): HELP text
+        labelnames (tuple): Names of labels this counter is keyed by
+    """
+
+    def __init__(self, name, documentation, labelnames=()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._values = {}
+        self._lock = threading.Lock()
+
+    def inc(self, amount=1, **labels):
+        """Increase counter for given label values by amount."""
+        key = tuple(labels.get(name, "") for name in self.labelnames)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def value(self, **labels):
+        """Return current counter value for given label values."""
+        key = tuple(labels.get(name, "") for name in self.labelnames)
+        return self._values.get(key, 0)
+
+    def collect(self):
+        """Return exposition lines for this counter."""
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} counter"]
+        with self._lock:
+            items = sorted(self._values.items())
+        for key, value in items:
+            lines.append(f"{self.name}{format_labels(self.labelnames, key)} {value}")
+        return lines
+
+
+class Histogram:
+
+    """
+    Cumulative histogram with fixed buckets and optional labels.
+
+    Attributes:
+        name (str): Metric name
+        documentation (str): HELP text
+        labelnames (tuple): Names of labels this histogram is keyed by
+        buckets (tuple): Sorted upper bounds, +Inf is added implicitly
+    """
+
+    def __init__(self, name, documentation, labelnames=(), buckets=DEFAULT_BUCKETS):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self.buckets = tuple(sorted(buckets))
+        self._values = {}
+        self._lock = threading.Lock()
+
+    def observe(self, amount, **labels):
+        """Record a single observation for given label values."""
+        key = tuple(labels.get(name, "") for name in self.labelnames)
+        with self._lock:
+            state = self._values.get(key)
+            if state is None:
+                # Per-bucket (non-cumulative) counts, sum, count
+                state = [[0] * (len(self.buckets) + 1), 0.0, 0]
+                self._values[key] = state
+            index = len(self.buckets)
+            for i, bound in enumerate(self.buckets):
+                if amount <= bound:
+                    index = i
+                    break
+            state[0][index] += 1
+            state[1] += amount
+            state[2] += 1
+
+    def count(self, **labels):
+        """Return number of observations for given label values."""
+        key = tuple(labels.get(name, "") for name in self.labelnames)
+        state = self._values.get(key)
+        return state[2] if state else 0
+
+    def time(self, **labels):
+        """Return a context manager observing elapsed seconds on exit."""
+        return _Timer(self, labels)
+
+    def collect(self):
+        """Return exposition lines for this histogram."""
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} histogram"]
+        with self._lock:
+            items = sorted((key, (list(state[0]), state[1], state[2])) for key, state in self._values.items())
+        for key, (bucket_counts, total, count) in items:
+            cumulative = 0
+            for bound, bucket_count in zip(self.buckets + (float("inf"),), bucket_counts):
+                cumulative += bucket_count
+                le = "+Inf" if bound == float("inf") else repr(bound)
+                lines.append(f"{self.name}_bucket{format_labels(self.labelnames, key, (('le', le),))} {cumulative}")
+            lines.append(f"{self.name}_sum{format_labels(self.labelnames, key)} {total}")
+            lines.append(f"{self.name}_count{format_labels(self.labelnames, key)} {count}")
+        return lines
+
+
+class _Timer:
+    """Context manager used by Histogram.time()."""
+
+    def __init__(self, histogram, labels):
+        self.histogram = histogram
+        self.labels = labels
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc_info):
+        self.histogram.observe(time.perf_counter() - self.start, **self.labels)
+        return False
+# endregion Metric classes
+
+
+# region Registry
+class MetricsRegistry:
+
+    """
+    Collection of metrics rendered together in Prometheus text format.
+
+    Rendering only happens on scrape or explicit export, so recording a
+    metric costs a dict update and nothing else.
+    """
+
+    def __init__(self):
+        self._metrics = {}
+        self._lock = threading.Lock()
+
+    def _register(self, metric):
+        with self._lock:
+            existing = self._metrics.get(metric.name)
+            if existing is not None:
+                return existing
+            self._metrics[metric.name] = metric
+            return metric
+
+    def counter(self, name, documentation, labelnames=()):
+        """Create (or return already registered) counter."""
+        return self._register(Counter(name, documentation, labelnames))
+
+    def histogram(self, name, documentation, labelnames=(), buckets=DEFAULT_BUCKETS):
+        """Create (or return already registered) histogram."""
+        return self._register(Histogram(name, documentation, labelnames, buckets))
+
+    def render(self):
+        """
+        Render all registered metrics.
+
+        Returns:
+            str: Prometheus text exposition format (version 0.0.4)
+        """
+        lines = []
+        for metric in list(self._metrics.values()):
+            lines.extend(metric.collect())
+        return "\n".join(lines) + "\n"
+
+    def write_textfile(self, path):
+        """
+        Write metrics to path for node_exporter textfile collector.
+
+        Writes to a temporary file first and renames it, so the collector
+        never reads a half-written file.
+
+        Args:
+            path (str): Target file path, should end with ".prom"
+        """
+        tmp_path = f"{path}.{os.getpid()}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as file:
+            file.write(self.render())
+        os.replace(tmp_path, path)
+# endregion Registry
+
+
+# region HTTP endpoint
+class IPv6ThreadingHTTPServer(ThreadingHTTPServer):
+
+    """ThreadingHTTPServer bound to an IPv6 address, the base class only binds IPv4."""
+
+    address_family = socket.AF_INET6
+
+
+def serve_metrics(registry, port=9464, host="127.0.0.1"):
+    """
+    Serve registry on a local-only HTTP endpoint in a background thread.
+
+    Args:
+        registry (MetricsRegistry): Registry to expose on /metrics
+        port (int): TCP port, 0 picks a free port
+        host (str): Loopback address to bind to
+
+    Returns:
+        ThreadingHTTPServer: Running server, call shutdown() to stop it
+
+    Raises:
+        ValueError: If host is not a loopback address
+    """
+    if host not in LOCAL_HOSTS:
+        raise ValueError("Metrics endpoint must bind to a loopback address")
+
+    class MetricsHandler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            if self.path.split("?")[0] != "/metrics":
+                self.send_error(404)
+                return
+            body = registry.render().encode("utf-8")
+            self.send_response(200)
+            self.send_header("Content-Type", "text/plain; version=0.0.4; charset=utf-8")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, format, *args):
+            # Keep the interactive CLI output clean
+            pass
+
+    server_class = IPv6ThreadingHTTPServer if host in IPV6_HOSTS else ThreadingHTTPServer
+    server = server_class((host, port), MetricsHandler)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    return server
+# endregion HTTP endpoint
+
+
+# region Tracker metrics
+REGISTRY = MetricsRegistry()
+
+COMPLETIONS_WRITTEN = REGISTRY.counter(
+    "habit_tracker_completions_written_total", "Completions saved to the tracking table")
+HABITS_CREATED = REGISTRY.counter(
+    "habit_tracker_habits_created_total", "Habits saved to the habits table")
+HABITS_DELETED = REGISTRY.counter(
+    "habit_tracker_habits_deleted_total", "Habits deleted from the habits table")
+ANALYTICS_COMPUTED = REGISTRY.counter(
+    "habit_tracker_analytics_computed_total", "Analytics results computed", ("function",))
+STORAGE_LATENCY = REGISTRY.histogram(
+    "habit_tracker_storage_latency_seconds", "Latency of storage operations", ("operation",))
+ANALYTICS_LATENCY = REGISTRY.histogram(
+    "habit_tracker_analytics_latency_seconds", "Latency of analytics functions", ("function",))
+
+
+def track_storage(operation):
+    """Decorator recording latency of a storage operation."""
+    def decorator(func):
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            start = time.perf_counter()
+            try:
+                return func(*args, **kwargs)
+            finally:
+                STORAGE_LATENCY.observe(time.perf_counter() - start, operation=operation)
+        return wrapper
+    return decorator
+
+
+def track_analytics(function):
+    """Decorator counting and recording latency of an analytics function."""
+    def decorator(func):
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            start = time.perf_counter()
+            try:
+                return func(*args, **kwargs)
+            finally:
+                ANALYTICS_LATENCY.observe(time.perf_counter() - start, function=function)
+                ANALYTICS_COMPUTED.inc(function=function)
+        return wrapper
+    return decorator
+# endregion Tracker metrics
@@ -0,0 +1,273 @@
+"""
+Periodicity engine.
+
+Turns periodicity strings as stored in the habits table ("daily", "weekly",
+"monthly", "every 3 days", "3 times per week") into PeriodicityRule objects
+with an integer kind code and precomputed gap limits. Analytics resolve a
+habit's rule once and then compare plain integers inside their loops.
+
+"N times per week" is a quota, not a gap: its streaks count consecutive
+ISO weeks (Monday to Sunday) with at least N completions, see week_of().
+"""
+
+# region imports
+import re
+import calendar
+import functools
+from datetime import date
+
+# endregion imports
+
+# Integer periodicity kinds
+DAILY = 0
+WEEKLY = 1
+MONTHLY = 2
+EVERY_N_DAYS = 3
+TIMES_PER_WEEK = 4
+
+BUILTIN_PERIODICITIES = ["daily", "weekly", "monthly"]
+
+# Gap rule table for the built-in periodicities:
+# kind: (min_gap, max_gap, max_gap_to_today, expected completions in 30 days)
+# A streak continues while min_gap <= gap <= max_gap between two completions
+# and is still alive while the last completion is at most max_gap_to_today days ago.
+GAP_TABLE = {
+    DAILY: (1, 1, 1, 30),
+    WEEKLY: (7, 13, 6, 4),
+    MONTHLY: (28, 31, 28, 1)
+}
+
+BUILTIN_KINDS = {"daily": DAILY, "weekly": WEEKLY, "monthly": MONTHLY}
+
+EVERY_N_DAYS_PATTERN = re.compile(r"^every\s+(\d+)\s+days?$")
+TIMES_PER_WEEK_PATTERN = re.compile(r"^(\d+)\s*(?:x|times?)\s*(?:per\s+week|a\s+week|weekly)$")
+
+
+# region PeriodicityRule class
+class PeriodicityRule:
+
+    """
+    Gap rules and expected completions of one periodicity.
+
+    Attributes:
+        kind (int): DAILY, WEEKLY, MONTHLY, EVERY_N_DAYS or TIMES_PER_WEEK
+        n (int): Interval in days for EVERY_N_DAYS, completions per week for TIMES_PER_WEEK, else 1
+        min_gap (int): Smallest gap in days that continues a streak
+        max_gap (int): Largest gap in days that continues a streak
+        max_gap_to_today (int): Largest gap from the last completion to today for a live streak
+        per_30_days (float): Expected completions in a 30-day window
+
+    For TIMES_PER_WEEK the gap limits only approximate the quota for
+    reminders (scheduler.py); streaks are counted per ISO week.
+    """
+
+    __slots__ = ("kind", "n", "min_gap", "max_gap", "max_gap_to_today", "per_30_days")
+
+    def __init__(self, kind, n=1):
+        self.kind = kind
+        self.n = n
+        if kind in GAP_TABLE:
+            self.min_gap, self.max_gap, self.max_gap_to_today, self.per_30_days = GAP_TABLE[kind]
+        elif kind == EVERY_N_DAYS:
+            # Same shape as weekly: due every n days, one missed interval breaks the streak
+            self.min_gap, self.max_gap, self.max_gap_to_today = n, 2 * n - 1, n
+            self.per_30_days = 30 / n
+        elif kind == TIMES_PER_WEEK:
+            # Reminder approximation: n completions at the start of one week and
+            # at the end of the next are 15 - 2n days apart
+            self.min_gap, self.max_gap, self.max_gap_to_today = 1, 15 - 2 * n, 7 - n
+            self.per_30_days = (30 // 7) * n
+        else:
+            raise ValueError("Invalid periodicity")
+
+    @property
+    def is_weekly_quota(self):
+        """True if streaks count ISO weeks with at least n completions instead of gaps."""
+        return self.kind == TIMES_PER_WEEK
+
+    def is_valid_gap(self, gap):
+        """Return True if a gap between two completions continues a streak."""
+        return self.min_gap <= gap <= self.max_gap
+
+    def is_valid_gap_to_today(self, gap):
+        """Return True if the last completion is recent enough for a live streak."""
+        return gap <= self.max_gap_to_today
+
+    def expected(self, start, end):
+        """
+        Calendar-exact number of expected completions between two dates.
+
+        Monthly habits expect one completion per calendar month, pro rata by
+        the actual length of each month touched by the window.
+
+        Args:
+            start (date): First day of the window
+            end (date): Last day of the window (inclusive)
+
+        Returns:
+            float: Expected number of completions
+        """
+        days = (end - start).days + 1
+        if self.kind == DAILY:
+            return float(days)
+        elif self.kind == WEEKLY:
+            return days / 7
+        elif self.kind == EVERY_N_DAYS:
+            return days / self.n
+        elif self.kind == TIMES_PER_WEEK:
+            return days * self.n / 7
+        expected = 0.0
+        year, month = start.year, start.month
+        while (year, month) <= (end.year, end.month):
+            month_days = calendar.monthrange(year, month)[1]
+            first = max(start, date(year, month, 1))
+            last = min(end, date(year, month, month_days))
+            expected += ((last - first).days + 1) / month_days
+            year, month = (year + 1, 1) if month == 12 else (year, month + 1)
+        return expected
+
+    def __str__(self):
+        if self.kind == EVERY_N_DAYS:
+            return f"every {self.n} days"
+        if self.kind == TIMES_PER_WEEK:
+            return f"{self.n} times per week"
+        return BUILTIN_PERIODICITIES[self.kind]
+# endregion PeriodicityRule class
+
+
+@functools.lru_cache(maxsize=None)
+def get_rule(periodicity):
+    """
+    Parse a periodicity string into its PeriodicityRule.
+
+    Accepts "daily", "weekly", "monthly", "every N days" (N >= 2) and
+    "N times per week" (2 <= N <= 6, also "Nx per week"). Rules are cached,
+    so repeated lookups cost one dict access.
+
+    Args:
+        periodicity (str): Periodicity string
+
+    Returns:
+        PeriodicityRule: Rule for the periodicity
+
+    Raises:
+        ValueError: If the periodicity is not supported
+    """
+    if not isinstance(periodicity, str):
+        raise ValueError("Invalid periodicity")
+    text = " ".join(periodicity.lower().split())
+    if text in BUILTIN_KINDS:
+        return PeriodicityRule(BUILTIN_KINDS[text])
+
+    match = EVERY_N_DAYS_PATTERN.match(text)
+    if match and int(match.group(1)) >= 2:
+        return PeriodicityRule(EVERY_N_DAYS, int(match.group(1)))
+    match = TIMES_PER_WEEK_PATTERN.match(text)
+    if match and 2 <= int(match.group(1)) <= 6:
+        return PeriodicityRule(TIMES_PER_WEEK, int(match.group(1)))
+    raise ValueError("Invalid periodicity")
+
+
+def report_periodicities(stored):
+    """
+    Return the periodicities a per-periodicity report or menu lists.
+
+    Args:
+        stored (iterable): Periodicities of existing habits
+
+    Returns:
+        list: Built-in periodicities, then the other stored ones sorted
+    """
+    return BUILTIN_PERIODICITIES + sorted(set(stored) - set(BUILTIN_PERIODICITIES))
+
+
+def week_of(ordinal):
+    """
+    Return the number of the ISO week (Monday to Sunday) containing a day ordinal.
+
+    Consecutive weeks have consecutive numbers; week w starts on ordinal 7 * w + 1.
+    """
+    return (ordinal - 1) // 7
+
+
+def normalize_periodicity(periodicity):
+    """
+    Return the canonical spelling of a periodicity, e.g. "3x per week" -> "3 times per week".
+
+    Raises:
+        ValueError: If the periodicity is not supported
+    """
+    if not isinstance(periodicity, str):
+        raise ValueError("Invalid periodicity")
+    return str(get_rule(periodicity))
+
+
+def gap_sql(periodicity):
+    """
+    Build SQL expressions for the gap limits of a periodicity column.
+
+    SQL counterpart of PeriodicityRule for queries that evaluate rules of
+    many habits at once: built-in values come from GAP_TABLE, "every N days"
+    and "N times per week" use the same formulas as the rule. Values are
+    compared after lower() and trim(); any other value yields NULL instead
+    of a guess, check_stored_periodicities() finds such habits up front.
+
+    Args:
+        periodicity (str): SQL expression of a periodicity string, e.g. "h.habit_periodicity"
+
+    Returns:
+        tuple: (min_gap, max_gap, max_gap_to_today, per_30_days) SQL expressions
+    """
+    text = f"lower(trim({periodicity}))"
+    every = f"CAST(substr({text}, 7) AS INTEGER)"
+    per_week = times_per_week_sql(periodicity)
+    every_formulas = (every, f"2 * {every} - 1", every, f"30.0 / {every}")
+    per_week_formulas = ("1", f"15 - 2 * {per_week}", f"7 - {per_week}", f"{30 // 7} * {per_week}")
+    expressions = []
+    for position in range(4):
+        builtin = " ".join(f"WHEN {text} = '{name}' THEN {GAP_TABLE[kind][position]}"
+                           for name, kind in BUILTIN_KINDS.items())
+        expressions.append(
+            f"CASE {builtin} "
+            f"WHEN {text} LIKE 'every % days' AND {every} >= 2 THEN {every_formulas[position]} "
+            f"WHEN {per_week} > 0 THEN {per_week_formulas[position]} "
+            f"ELSE NULL END")
+    return tuple(expressions)
+
+
+def times_per_week_sql(periodicity):
+    """
+    Build an SQL expression for the weekly quota of a periodicity column.
+
+    Args:
+        periodicity (str): SQL expression of a periodicity string
+
+    Returns:
+        str: SQL expression, N for "N times per week" (2 <= N <= 6), else 0
+    """
+    text = f"lower(trim({periodicity}))"
+    return (f"(CASE WHEN {text} LIKE '% times per week' AND CAST({text} AS INTEGER) BETWEEN 2 AND 6 "
+            f"THEN CAST({text} AS INTEGER) ELSE 0 END)")
+
+
+def check_stored_periodicities(connection):
+    """
+    Reject habits whose periodicity gap_sql() can't evaluate.
+
+    Habit validates periodicities, but rows written by other tools or older
+    versions may not be; SQL analytics call this first instead of treating
+    them as some other periodicity.
+
+    Args:
+        connection (sqlite3.Connection): Database connection
+
+    Raises:
+        ValueError: If a stored periodicity is not supported
+    """
+    for (periodicity,) in connection.execute("SELECT DISTINCT habit_periodicity FROM habits"):
+        try:
+            canonical = normalize_periodicity(periodicity) == periodicity.strip().lower()
+        except ValueError:
+            canonical = False
+        if not canonical:
+            raise ValueError(f"Invalid periodicity {periodicity!r} stored in habits")
@@ -0,0 +1,349 @@
+"""
+Population statistics over all habits.
+
+Streams every habit's current streak, longest streak and completion rate
+into running moments and relative-error quantile sketches, grouped by
+periodicity. Memory is bounded by the sketch size, not the number of
+habits, and results of workers that each processed one shard of the
+habits can be shipped with to_dict() and merged into the result for the
+whole population.
+"""
+
+# region imports
+import math
+from datetime import datetime
+
+from metrics import track_analytics
+from analytics import StreakRunIndex
+
+# endregion imports
+
+POPULATION_METRICS = ("current_streak", "longest_streak", "completion_rate")
+DEFAULT_QUANTILES = (0.5, 0.9, 0.95, 0.99)
+
+
+# region RunningMoments class
+class RunningMoments:
+
+    """
+    Count, mean, variance, min and max of a stream, mergeable.
+
+    Uses Welford's update for single values and Chan's formula to merge
+    two partial results, both numerically stable.
+
+    Attributes:
+        count (int): Number of values
+        mean (float): Mean of the values
+        m2 (float): Sum of squared differences from the mean
+        minimum (float): Smallest value, None if empty
+        maximum (float): Largest value, None if empty
+    """
+
+    def __init__(self):
+        self.count = 0
+        self.mean = 0.0
+        self.m2 = 0.0
+        self.minimum = None
+        self.maximum = None
+
+    def add(self, value):
+        """Add one value."""
+        self.count += 1
+        delta = value - self.mean
+        self.mean += delta / self.count
+        self.m2 += delta * (value - self.mean)
+        self.minimum = value if self.minimum is None else min(self.minimum, value)
+        self.maximum = value if self.maximum is None else max(self.maximum, value)
+
+    def merge(self, other):
+        """Add all values summarized by another RunningMoments."""
+        if other.count == 0:
+            return
+        total = self.count + other.count
+        delta = other.mean - self.mean
+        self.m2 += other.m2 + delta * delta * self.count * other.count / total
+        self.mean += delta * other.count / total
+        self.count = total
+        self.minimum = other.minimum if self.minimum is None else min(self.minimum, other.minimum)
+        self.maximum = other.maximum if self.maximum is None else max(self.maximum, other.maximum)
+
+    def to_dict(self):
+        """Return a JSON-serializable representation, e.g. to ship from a worker."""
+        return {"count": self.count, "mean": self.mean, "m2": self.m2,
+                "minimum": self.minimum, "maximum": self.maximum}
+
+    @classmethod
+    def from_dict(cls, data):
+        """Rebuild moments from to_dict() output."""
+        moments = cls()
+        moments.count, moments.mean, moments.m2 = data["count"], data["mean"], data["m2"]
+        moments.minimum, moments.maximum = data["minimum"], data["maximum"]
+        return moments
+
+    @property
+    def variance(self):
+        """Population variance, 0.0 for fewer than two values."""
+        return self.m2 / self.count if self.count > 1 else 0.0
+
+    @property
+    def stddev(self):
+        """Population standard deviation."""
+        return math.sqrt(self.variance)
+# endregion RunningMoments class
+
+
+# region QuantileSketch class
+class QuantileSketch:
+
+    """
+    Mergeable quantile sketch with relative error guarantee (DDSketch).
+
+    Positive values are counted in logarithmic buckets: bucket k covers
+    (gamma^(k-1), gamma^k] with gamma = (1 + a) / (1 - a), so every quantile
+    is returned within relative accuracy a. Zeros get their own counter.
+    Two sketches with the same accuracy merge by adding bucket counts.
+    If more than max_buckets are used, the lowest buckets are collapsed,
+    which only loses accuracy for the smallest values.
+
+    Attributes:
+        relative_accuracy (float): Relative accuracy a, 0 < a < 1
+        max_buckets (int): Maximum number of buckets kept
+        count (int): Number of values
+        zero_count (int): Number of zero values
+        buckets (dict): {bucket_key: count}
+    """
+
+    def __init__(self, relative_accuracy=0.01, max_buckets=2048):
+        """
+        Initialize an empty sketch.
+
+        Raises:
+            ValueError: If relative_accuracy is not between 0 and 1 or max_buckets < 1
+        """
+        if not 0 < relative_accuracy < 1:
+            raise ValueError("Relative accuracy must be between 0 and 1")
+        if max_buckets < 1:
+            raise ValueError("Sketch needs at least one bucket")
+        self.relative_accuracy = relative_accuracy
+        self.max_buckets = max_buckets
+        self.gamma = (1 + relative_accuracy) / (1 - relative_accuracy)
+        self._log_gamma = math.log(self.gamma)
+        self.count = 0
+        self.zero_count = 0
+        self.buckets = {}
+
+    def add(self, value, count=1):
+        """
+        Add a value count times.
+
+        Raises:
+            ValueError: If value is negative
+        """
+        if value < 0:
+            raise ValueError("Sketch only accepts non-negative values")
+        self.count += count
+        if value == 0:
+            self.zero_count += count
+            return
+        key = math.ceil(math.log(value) / self._log_gamma)
+        self.buckets[key] = self.buckets.get(key, 0) + count
+        self._collapse()
+
+    def merge(self, other):
+        """
+        Add all values summarized by another sketch.
+
+        Raises:
+            ValueError: If the sketches have different accuracy
+        """
+        if other.relative_accuracy != self.relative_accuracy:
+            raise ValueError("Cannot merge sketches with different accuracy")
+        self.count += other.count
+        self.zero_count += other.zero_count
+        for key, count in other.buckets.items():
+            self.buckets[key] = self.buckets.get(key, 0) + count
+        self._collapse()
+
+    def _collapse(self):
+        """Fold the lowest buckets into one until at most max_buckets remain."""
+        if len(self.buckets) <= self.max_buckets:
+            return
+        keys = sorted(self.buckets)
+        excess = keys[:len(keys) - self.max_buckets + 1]
+        target = excess[-1]
+        self.buckets[target] = sum(self.buckets.pop(key) for key in excess[:-1]) + self.buckets[target]
+
+    def quantile(self, q):
+        """
+        Estimate the q-quantile.
+
+        Args:
+            q (float): Quantile between 0 and 1
+
+        Returns:
+            float or None: Estimated value, None if the sketch is empty
+
+        Raises:
+            ValueError: If q is outside [0, 1]
+        """
+        if not 0 <= q <= 1:
+            raise ValueError("Quantile must be between 0 and 1")
+        if self.count == 0:
+            return None
+        rank = q * (self.count - 1)
+        seen = self.zero_count
+        if rank < seen:
+            return 0.0
+        for key in sorted(self.buckets):
+            seen += self.buckets[key]
+            if rank < seen:
+                return 2 * self.gamma ** key / (self.gamma + 1)
+        return 2 * self.gamma ** max(self.buckets) / (self.gamma + 1)
+
+    def to_dict(self):
+        """Return a JSON-serializable representation, e.g. to ship from a worker."""
+        return {
+            "relative_accuracy": self.relative_accuracy,
+            "max_buckets": self.max_buckets,
+            "zero_count": self.zero_count,
+            "buckets": {str(key): count for key, count in self.buckets.items()}
+        }
+
+    @classmethod
+    def from_dict(cls, data):
+        """Rebuild a sketch from to_dict() output."""
+        sketch = cls(data["relative_accuracy"], data["max_buckets"])
+        sketch.zero_count = data["zero_count"]
+        sketch.buckets = {int(key): count for key, count in data["buckets"].items()}
+        sketch.count = sketch.zero_count + sum(sketch.buckets.values())
+        return sketch
+# endregion QuantileSketch class
+
+
+# region PopulationStats class
+class PopulationStats:
+
+    """
+    Sketches and moments of habit analytics per periodicity and metric.
+
+    Attributes:
+        relative_accuracy (float): Accuracy of every quantile sketch
+        groups (dict): {periodicity: {metric: (QuantileSketch, RunningMoments)}}
+    """
+
+    def __init__(self, relative_accuracy=0.01):
+        self.relative_accuracy = relative_accuracy
+        self.groups = {}
+
+    def _group(self, periodicity):
+        if periodicity not in self.groups:
+            self.groups[periodicity] = {
+                metric: (QuantileSketch(self.relative_accuracy), RunningMoments())
+                for metric in POPULATION_METRICS}
+        return self.groups[periodicity]
+
+    def add(self, periodicity, values):
+        """
+        Add one habit's analytics.
+
+        Args:
+            periodicity (str): Periodicity of the habit
+            values (dict): {metric: value} for every metric in POPULATION_METRICS
+        """
+        group = self._group(periodicity)
+        for metric in POPULATION_METRICS:
+            sketch, moments = group[metric]
+            sketch.add(values[metric])
+            moments.add(values[metric])
+
+    def merge(self, other):
+        """Combine with a partial result from another worker or shard."""
+        for periodicity, group in other.groups.items():
+            own = self._group(periodicity)
+            for metric, (sketch, moments) in group.items():
+                own[metric][0].merge(sketch)
+                own[metric][1].merge(moments)
+
+    def to_dict(self):
+        """Return a JSON-serializable representation, e.g. to ship from a worker process."""
+        return {
+            "relative_accuracy": self.relative_accuracy,
+            "groups": {
+                periodicity: {metric: {"sketch": sketch.to_dict(), "moments": moments.to_dict()}
+                              for metric, (sketch, moments) in group.items()}
+                for periodicity, group in self.groups.items()}
+        }
+
+    @classmethod
+    def from_dict(cls, data):
+        """Rebuild statistics from to_dict() output."""
+        stats = cls(data["relative_accuracy"])
+        for periodicity, group in data["groups"].items():
+            stats.groups[periodicity] = {
+                metric: (QuantileSketch.from_dict(parts["sketch"]), RunningMoments.from_dict(parts["moments"]))
+                for metric, parts in group.items()}
+        return stats
+
+    def summary(self, quantiles=DEFAULT_QUANTILES):
+        """
+        Summarize all groups.
+
+        Args:
+            quantiles (iterable): Quantiles to estimate
+
+        Returns:
+            dict: {periodicity: {metric: {"count", "mean", "stddev", "min", "max", "p50", ...}}}
+        """
+        result = {}
+        for periodicity, group in sorted(self.groups.items()):
+            result[periodicity] = {}
+            for metric, (sketch, moments) in group.items():
+                row = {
+                    "count": moments.count,
+                    "mean": moments.mean,
+                    "stddev": moments.stddev,
+                    "min": moments.minimum,
+                    "max": moments.maximum
+                }
+                for q in quantiles:
+                    row[f"p{q * 100:g}"] = sketch.quantile(q)
+                result[periodicity][metric] = row
+        return result
+# endregion PopulationStats class
+
+
+@track_analytics("population_statistics")
+def population_statistics(storage, as_of=None, periodicity=None, shard=None, relative_accuracy=0.01):
+    """
+    Stream analytics of all habits into population statistics.
+
+    Reads tracking data once via storage.iter_tracking_data(), only the rows
+    of the shard if one is given. Habits without tracking data are not included.
+
+    Args:
+        storage (HabitStorage): Database storage object
+        as_of (date, optional): Reference date, default today
+        periodicity (str, optional): Restrict to habits of one periodicity
+        shard (tuple, optional): (index, count) to read and process only one of
+            count disjoint shards of the habits, e.g. one per worker; merge the
+            results afterwards
+        relative_accuracy (float): Relative accuracy of the quantile sketches
+
+    Returns:
+        PopulationStats: Mergeable statistics, see PopulationStats.summary()
+
+    Example:
+        stats = population_statistics(storage)
+        stats.summary()["daily"]["current_streak"]["p50"]
+    """
+    as_of = as_of or datetime.now().date()
+    stats = PopulationStats(relative_accuracy)
+    for habit, habit_periodicity, values in storage.iter_tracking_data(periodicity, shard):
+        dates = sorted(map(lambda value: datetime.strptime(value, "%Y-%m-%d").date(), values))
+        index = StreakRunIndex(dates, habit_periodicity)
+        stats.add(habit_periodicity, {
+            "current_streak": index.current_streak(as_of),
+            "longest_streak": index.longest_streak(as_of),
+            "completion_rate": index.completion_rate(as_of)
+        })
+    return stats
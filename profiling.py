@@ -0,0 +1,150 @@
+"""
+Profiling mode for the CLI and analytics.
+
+Runs code under cProfile and tracemalloc and writes three files next to
+a path prefix:
+- <prefix>.pstats: raw profile, e.g. for python -m pstats or snakeviz
+- <prefix>_hot.txt: hottest functions by cumulative and by own time
+- <prefix>_memory.txt: peak traced memory and the allocation sites
+  that held it
+
+Only imported when profiling is requested, so normal runs pay nothing.
+"""
+
+# region imports
+import io
+import pstats
+import cProfile
+import threading
+import tracemalloc
+
+# endregion imports
+
+DEFAULT_TOP = 30
+DEFAULT_FRAMES = 10
+# Seconds between checks for a new memory high-water mark
+DEFAULT_INTERVAL = 0.01
+
+
+# region Profiler class
+class Profiler:
+
+    """
+    Context manager that profiles CPU time and memory of the code it wraps.
+
+    tracemalloc only reports the size of the peak, not where the memory
+    was allocated at that moment. A background thread therefore samples
+    the traced size every interval seconds and takes a snapshot whenever
+    it reaches a new high, the breakdown is taken from that snapshot.
+
+    Attributes:
+        prefix (str): Path prefix of the written files
+        top (int): Number of functions and allocation sites in the reports
+        frames (int): Stack frames stored per allocation
+        interval (float): Seconds between memory samples
+        peak (int): Peak traced memory in bytes, set on exit
+        files (dict): {"pstats", "hot", "memory"}: paths written on exit
+
+    Example:
+        with Profiler("analytics") as profiler:
+            run_analytics()
+        print(profiler.files["hot"])
+    """
+
+    def __init__(self, prefix, top=DEFAULT_TOP, frames=DEFAULT_FRAMES, interval=DEFAULT_INTERVAL):
+        self.prefix = prefix
+        self.top = top
+        self.frames = frames
+        self.interval = interval
+        self.peak = 0
+        self.files = {}
+        self._profile = cProfile.Profile()
+        self._snapshot = None
+        self._snapshot_size = -1
+        self._stop = threading.Event()
+        self._thread = None
+
+    def __enter__(self):
+        tracemalloc.start(self.frames)
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._sample, daemon=True)
+        self._thread.start()
+        self._profile.enable()
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self._profile.disable()
+        self._stop.set()
+        self._thread.join()
+        self._take_snapshot()
+        self.peak = tracemalloc.get_traced_memory()[1]
+        tracemalloc.stop()
+        self.write()
+        return False
+
+    def _sample(self):
+        while not self._stop.wait(self.interval):
+            self._take_snapshot()
+
+    def _take_snapshot(self):
+        """Keep a snapshot of the allocations if the traced size reached a new high."""
+        current = tracemalloc.get_traced_memory()[0]
+        if current > self._snapshot_size:
+            self._snapshot = tracemalloc.take_snapshot()
+            self._snapshot_size = current
+
+    def hot_report(self):
+        """Return the hottest functions sorted by cumulative time and by own time."""
+        stream = io.StringIO()
+        stats = pstats.Stats(self._profile, stream=stream)
+        stats.strip_dirs()
+        stream.write("Hot functions by cumulative time\n\n")
+        stats.sort_stats(pstats.SortKey.CUMULATIVE).print_stats(self.top)
+        stream.write("Hot functions by own time\n\n")
+        stats.sort_stats(pstats.SortKey.TIME).print_stats(self.top)
+        return stream.getvalue()
+
+    def memory_report(self):
+        """Return peak memory and the allocation sites of the largest sampled snapshot."""
+        lines = [f"Peak traced memory: {self.peak / 1024:.1f} KiB",
+                 f"Largest sample: {self._snapshot_size / 1024:.1f} KiB, allocations by site:", ""]
+        if self._snapshot is not None:
+            snapshot = self._snapshot.filter_traces((
+                tracemalloc.Filter(False, tracemalloc.__file__),
+                tracemalloc.Filter(False, __file__)))
+            for statistic in snapshot.statistics("lineno")[:self.top]:
+                frame = statistic.traceback[0]
+                lines.append(f"{statistic.size / 1024:10.1f} KiB {statistic.count:8} blocks  "
+                             f"{frame.filename}:{frame.lineno}")
+        return "\n".join(lines) + "\n"
+
+    def write(self):
+        """Write the pstats file and both reports, return their paths."""
+        self.files = {
+            "pstats": f"{self.prefix}.pstats",
+            "hot": f"{self.prefix}_hot.txt",
+            "memory": f"{self.prefix}_memory.txt"
+        }
+        self._profile.dump_stats(self.files["pstats"])
+        with open(self.files["hot"], "w") as report:
+            report.write(self.hot_report())
+        with open(self.files["memory"], "w") as report:
+            report.write(self.memory_report())
+        return self.files
+# endregion Profiler class
+
+
+def profile_call(prefix, func, *args, **kwargs):
+    """
+    Call a function under the Profiler and write its reports.
+
+    Args:
+        prefix (str): Path prefix of the written files
+        func (callable): Function to profile, called as func(*args, **kwargs)
+
+    Returns:
+        tuple: (result of func, dict of written file paths)
+    """
+    with Profiler(prefix) as profiler:
+        result = func(*args, **kwargs)
+    return (result, profiler.files)
@@ -0,0 +1,206 @@
+"""
+Incremental nightly analytics recompute.
+
+Stores longest streak, current streak and completion rate per habit in the
+habit_stats table. A run only recomputes habits that changed since the
+previous run, taken from the change log, and habits whose stored values
+went stale because the date rolled over (current streak expired or a
+completion left the 30-day window). Both sets are found through indexes,
+so nightly cost scales with activity instead of catalog size.
+
+Usage:
+    python recompute.py --db habits.db
+    python recompute.py --db habits.db --full
+"""
+
+# region imports
+import sqlite3
+import argparse
+from bisect import bisect_left, bisect_right
+from datetime import date, datetime
+
+from storage import SQLiteStorage, ensure_changelog_schema
+from analytics import build_streak_index
+
+# endregion imports
+
+
+# region Schema
+def ensure_stats_schema(connection):
+    """
+    Create the habit_stats and recompute_state tables if they don't exist.
+
+    habit_stats.expires_on is the first day on which a stored value changes
+    without any new write. It is indexed, so habits affected by the date
+    rollover are found without scanning all habits.
+
+    Args:
+        connection (sqlite3.Connection): Database connection
+    """
+    connection.execute("""
+        CREATE TABLE IF NOT EXISTS habit_stats(
+            habit_id INTEGER PRIMARY KEY,
+            longest_streak INTEGER NOT NULL,
+            current_streak INTEGER NOT NULL,
+            completion_rate REAL NOT NULL,
+            last_completion DATE,
+            expires_on DATE,
+            computed_on DATE NOT NULL,
+
+            FOREIGN KEY (habit_id) REFERENCES habits(habit_id) ON DELETE CASCADE)
+    """)
+    connection.execute("CREATE INDEX IF NOT EXISTS idx_habit_stats_expires ON habit_stats(expires_on)")
+    connection.execute("""
+        CREATE TABLE IF NOT EXISTS recompute_state(
+            state_id INTEGER PRIMARY KEY CHECK (state_id = 1),
+            last_seq INTEGER NOT NULL,
+            last_run DATE NOT NULL)
+    """)
+    connection.commit()
+# endregion Schema
+
+
+# region Recompute
+def compute_stats(index, today):
+    """
+    Compute stored analytics values of one habit.
+
+    Args:
+        index (StreakRunIndex): Streak index of the habit
+        today (date): Reference date
+
+    Returns:
+        dict: longest_streak, current_streak, completion_rate, last_completion and expires_on
+    """
+    ordinals = index.ordinals
+    position = bisect_right(ordinals, today.toordinal()) - 1
+    current = index.current_streak(today)
+    expiries = []
+    if current > 0:
+        expiries.append(index.breaks_on(today))
+    # Oldest completion in the window [today - 30, today] drops out 31 days after it
+    oldest = bisect_left(ordinals, today.toordinal() - 30)
+    if oldest <= position:
+        expiries.append(ordinals[oldest] + 31)
+    # Completions dated after today enter the window on their date
+    if position + 1 < len(ordinals):
+        expiries.append(ordinals[position + 1])
+
+    return {
+        "longest_streak": index.longest_streak(today),
+        "current_streak": current,
+        "completion_rate": index.completion_rate(today),
+        "last_completion": date.fromordinal(ordinals[position]).isoformat() if position >= 0 else None,
+        "expires_on": date.fromordinal(min(expiries)).isoformat() if expiries else None
+    }
+
+
+def recompute_analytics(storage, today=None, full=False):
+    """
+    Refresh stored analytics for dirty and expired habits.
+
+    The first run, and any run with full=True, recomputes every habit.
+    All updates and the new checkpoint are committed in one transaction.
+
+    Args:
+        storage (SQLiteStorage): Database storage object
+        today (date, optional): Reference date, default today
+        full (bool): Recompute all habits
+
+    Returns:
+        dict: {"dirty": int, "expired": int, "recomputed": int, "full": bool, "last_seq": int}
+    """
+    connection = storage.connection
+    ensure_changelog_schema(connection)
+    ensure_stats_schema(connection)
+    storage.has_changelog = True
+    today = today or datetime.now().date()
+
+    state = connection.execute("SELECT last_seq FROM recompute_state WHERE state_id = 1").fetchone()
+    # Read the checkpoint before computing, later changes are picked up next run
+    last_seq = storage.last_change_seq()
+    full = full or state is None
+    if full:
+        dirty = storage.load_all_habits()
+        expired = []
+    else:
+        dirty = storage.dirty_habits(state[0])
+        expired = [row[0] for row in connection.execute("""
+            SELECT h.habit_name FROM habit_stats s JOIN habits h ON h.habit_id = s.habit_id
+            WHERE s.expires_on <= ?
+            """, (today.isoformat(),))]
+    habits = sorted(set(dirty) | set(expired))
+
+    try:
+        for habit in habits:
+            index = build_streak_index(storage, habit)
+            if isinstance(index, str):
+                continue
+            stats = compute_stats(index, today)
+            connection.execute("""
+                INSERT OR REPLACE INTO habit_stats
+                (habit_id, longest_streak, current_streak, completion_rate, last_completion, expires_on, computed_on)
+                SELECT habit_id, ?, ?, ?, ?, ?, ? FROM habits WHERE habit_name = ?
+                """, (stats["longest_streak"], stats["current_streak"], stats["completion_rate"],
+                      stats["last_completion"], stats["expires_on"], today.isoformat(), habit))
+        connection.execute("""
+            INSERT OR REPLACE INTO recompute_state (state_id, last_seq, last_run) VALUES (1, ?, ?)
+            """, (last_seq, today.isoformat()))
+        connection.commit()
+    except Exception as e:
+        connection.rollback()
+        raise e
+    return {
+        "dirty": len(dirty),
+        "expired": len(expired),
+        "recomputed": len(habits),
+        "full": full,
+        "last_seq": last_seq
+    }
+
+
+def load_stats(storage, habit):
+    """
+    Load stored analytics of a habit.
+
+    Args:
+        storage (SQLiteStorage): Database storage object
+        habit (str): Name of the habit
+
+    Returns:
+        dict or None: Stored values and computed_on, None if not computed yet
+    """
+    try:
+        row = storage.connection.execute("""
+            SELECT s.longest_streak, s.current_streak, s.completion_rate,
+                   s.last_completion, s.expires_on, s.computed_on
+            FROM habit_stats s JOIN habits h ON h.habit_id = s.habit_id
+            WHERE h.habit_name = ?
+            """, (habit,)).fetchone()
+    except sqlite3.OperationalError:
+        return None
+    return dict(row) if row else None
+# endregion Recompute
+
+
+def main(argv=None):
+    """Run the analytics recompute from the command line."""
+    parser = argparse.ArgumentParser(description="Refresh stored analytics for changed habits")
+    parser.add_argument("--db", default="habits.db", help="SQLite database file")
+    parser.add_argument("--full", action="store_true", help="Recompute all habits")
+    parser.add_argument("--date", type=date.fromisoformat, default=None, help="Reference date, default today")
+    args = parser.parse_args(argv)
+
+    conn = sqlite3.connect(args.db)
+    conn.execute("PRAGMA foreign_keys = ON")
+    try:
+        report = recompute_analytics(SQLiteStorage(conn), args.date, args.full)
+    finally:
+        conn.close()
+    print(f'Recomputed {report["recomputed"]} habits '
+          f'({report["dirty"]} changed, {report["expired"]} expired{", full run" if report["full"] else ""})')
+    return 0
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,302 @@
+"""
+Read replicas of the habits database via the SQLite online backup API.
+
+Copies the live database in small page steps with a pause between steps,
+so CLI and API writers on the primary are only blocked for one step at a
+time. Analytics and report jobs then read the replica instead of holding
+long read transactions on the primary.
+
+Every copy is a snapshot: written to a temporary file and renamed over
+the target, so the file is never modified while a reader has it open and
+readers never wait for a lock. Safe to open with
+open_replica(path, immutable=True), which skips all locking.
+- Snapshot: written once with create_snapshot().
+- Replica: replaced by ReplicaRefresher whenever the primary changed.
+  ReplicaStorage reads it and reopens the file after each refresh.
+
+Usage:
+    python replica.py --db habits.db --replica replica.db --interval 60
+    python replica.py --db habits.db --replica snapshot.db --snapshot
+"""
+
+# region imports
+import os
+import sys
+import time
+import sqlite3
+import argparse
+import threading
+from urllib.parse import quote
+
+from metrics import REGISTRY
+from storage import SQLiteStorage
+
+# endregion imports
+
+DEFAULT_PAGES = 256
+DEFAULT_SLEEP = 0.01
+
+REPLICA_REFRESHES = REGISTRY.counter(
+    "habit_tracker_replica_refreshes_total", "Completed replica refreshes and snapshots")
+REPLICA_LATENCY = REGISTRY.histogram(
+    "habit_tracker_replica_refresh_seconds", "Duration of replica refreshes and snapshots")
+
+
+# region Copying
+def backup_to(source, path, pages=DEFAULT_PAGES, sleep=DEFAULT_SLEEP, progress=None):
+    """
+    Copy a live database into a file in throttled steps.
+
+    If another connection writes to the source during the copy, SQLite
+    restarts the copy, so the result is always a consistent database.
+    The copy is switched to rollback journal mode, so read-only readers
+    don't need WAL side files.
+
+    Args:
+        source (sqlite3.Connection): Connection to the primary database
+        path (str): Destination file, created or overwritten in place
+        pages (int): Pages copied per step
+        sleep (float): Seconds to pause between steps
+        progress (callable, optional): Called as progress(status, remaining, total) after each step
+
+    Returns:
+        dict: {"pages": int, "seconds": float}
+    """
+    start = time.perf_counter()
+    destination = sqlite3.connect(path)
+    try:
+        source.backup(destination, pages=pages, progress=progress, sleep=sleep)
+        destination.execute("PRAGMA journal_mode = DELETE")
+        page_count = destination.execute("PRAGMA page_count").fetchone()[0]
+    finally:
+        destination.close()
+    elapsed = time.perf_counter() - start
+    REPLICA_REFRESHES.inc()
+    REPLICA_LATENCY.observe(elapsed)
+    return {"pages": page_count, "seconds": elapsed}
+
+
+def create_snapshot(source, path, pages=DEFAULT_PAGES, sleep=DEFAULT_SLEEP, progress=None):
+    """
+    Write a snapshot file that is replaced atomically, never modified in place.
+
+    Readers that opened the previous snapshot keep reading it unchanged,
+    new readers get the new one.
+
+    Args:
+        source (sqlite3.Connection): Connection to the primary database
+        path (str): Snapshot file
+        pages (int): Pages copied per step
+        sleep (float): Seconds to pause between steps
+        progress (callable, optional): Called as progress(status, remaining, total) after each step
+
+    Returns:
+        dict: {"pages": int, "seconds": float}
+    """
+    temporary = f"{path}.tmp"
+    if os.path.exists(temporary):
+        os.remove(temporary)
+    try:
+        result = backup_to(source, temporary, pages, sleep, progress)
+        os.replace(temporary, path)
+    except Exception as e:
+        if os.path.exists(temporary):
+            os.remove(temporary)
+        raise e
+    return result
+
+
+def open_replica(path, immutable=False):
+    """
+    Open a replica or snapshot read-only.
+
+    Args:
+        path (str): Replica or snapshot file
+        immutable (bool): Open with immutable=1, which skips locking and change
+            detection. Only for snapshots from create_snapshot().
+
+    Returns:
+        sqlite3.Connection: Read-only connection
+
+    Raises:
+        sqlite3.OperationalError: If the file doesn't exist
+    """
+    uri = f"file:{quote(os.path.abspath(path))}?mode=ro"
+    if immutable:
+        uri += "&immutable=1"
+    return sqlite3.connect(uri, uri=True, check_same_thread=False)
+# endregion Copying
+
+
+# region ReplicaRefresher class
+class ReplicaRefresher:
+
+    """
+    Keeps a replica file up to date with the primary database.
+
+    A refresh only copies when the primary changed since the last copy,
+    detected by PRAGMA data_version of a dedicated connection.
+
+    Attributes:
+        primary_path (str): Primary database file
+        replica_path (str): Replica file, replaced atomically on every refresh
+        interval (float): Seconds between checks of the background thread
+        pages (int): Pages copied per backup step
+        sleep (float): Seconds to pause between backup steps
+        refreshes (int): Number of completed copies
+    """
+
+    def __init__(self, primary_path, replica_path, interval=60.0, pages=DEFAULT_PAGES, sleep=DEFAULT_SLEEP):
+        self.primary_path = primary_path
+        self.replica_path = replica_path
+        self.interval = interval
+        self.pages = pages
+        self.sleep = sleep
+        self.refreshes = 0
+        self._source = sqlite3.connect(primary_path, check_same_thread=False)
+        self._data_version = None
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread = None
+
+    def refresh(self, force=False):
+        """
+        Copy the primary into the replica if it changed.
+
+        Args:
+            force (bool): Copy even if the primary is unchanged
+
+        Returns:
+            bool: True if the replica was refreshed
+        """
+        with self._lock:
+            data_version = self._source.execute("PRAGMA data_version").fetchone()[0]
+            if not force and data_version == self._data_version:
+                return False
+            create_snapshot(self._source, self.replica_path, self.pages, self.sleep)
+            self._data_version = data_version
+            self.refreshes += 1
+            return True
+
+    def start(self):
+        """Refresh now and then every interval seconds in a background thread."""
+        if self._thread is not None:
+            return
+        self.refresh()
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            try:
+                self.refresh()
+            except sqlite3.Error as e:
+                print(f"Replica refresh failed: {e}", file=sys.stderr)
+
+    def close(self):
+        """Stop the background thread and close the primary connection."""
+        if self._thread is not None:
+            self._stop.set()
+            self._thread.join()
+            self._thread = None
+        self._source.close()
+# endregion ReplicaRefresher class
+
+
+# region ReplicaStorage class
+class ReplicaStorage:
+
+    """
+    Read-only SQLiteStorage on a replica that follows its refreshes.
+
+    ReplicaRefresher renames every new copy over the replica file, while
+    open connections keep reading the file they opened. Before each
+    attribute access the replica's inode is compared with the opened one
+    and a changed file is opened again, in the reader's own thread. The
+    previous connection is closed then, so the renamed-away copy is freed
+    on disk; consume a generator like iter_tracking_data() before the next
+    access.
+
+    Attributes:
+        path (str): Replica file
+        generation (int): Number of times the replica was opened
+    """
+
+    def __init__(self, path):
+        """
+        Open the replica.
+
+        Raises:
+            FileNotFoundError: If the replica doesn't exist yet
+        """
+        self.path = path
+        self.generation = 0
+        self._inode = None
+        self._storage = None
+        self._current()
+
+    def _current(self):
+        """Return the storage on the newest copy, reopening it after a refresh."""
+        # stat before opening: a copy renamed in between is only opened once more
+        inode = os.stat(self.path).st_ino
+        if inode != self._inode:
+            previous = self._storage
+            self._storage = SQLiteStorage(open_replica(self.path, immutable=True))
+            self._inode = inode
+            self.generation += 1
+            if previous is not None:
+                previous.connection.close()
+        return self._storage
+
+    def close(self):
+        """Close the connection to the current copy."""
+        if self._storage is not None:
+            self._storage.connection.close()
+            self._storage = None
+            self._inode = None
+
+    def change_marker(self, habit=None):
+        """Return the replica's change marker, also changed by every reopen."""
+        storage = self._current()
+        return (self.generation, storage.change_marker(habit))
+
+    def __getattr__(self, name):
+        return getattr(self._current(), name)
+# endregion ReplicaStorage class
+
+
+def main(argv=None):
+    """Keep a replica up to date, or write one snapshot, from the command line."""
+    parser = argparse.ArgumentParser(description="Maintain a read replica of the habits database")
+    parser.add_argument("--db", default="habits.db", help="Primary SQLite database file")
+    parser.add_argument("--replica", required=True, help="Replica or snapshot file")
+    parser.add_argument("--snapshot", action="store_true", help="Write one atomic snapshot and exit")
+    parser.add_argument("--interval", type=float, default=60.0, help="Seconds between refreshes")
+    parser.add_argument("--pages", type=int, default=DEFAULT_PAGES, help="Pages copied per step")
+    parser.add_argument("--sleep", type=float, default=DEFAULT_SLEEP, help="Seconds between steps")
+    args = parser.parse_args(argv)
+
+    if args.snapshot:
+        source = sqlite3.connect(args.db)
+        try:
+            result = create_snapshot(source, args.replica, args.pages, args.sleep)
+        finally:
+            source.close()
+        print(f'Snapshot of {result["pages"]} pages written in {result["seconds"]:.2f}s')
+        return 0
+
+    refresher = ReplicaRefresher(args.db, args.replica, args.interval, args.pages, args.sleep)
+    try:
+        refresher.start()
+        while True:
+            time.sleep(3600)
+    except KeyboardInterrupt:
+        pass
+    finally:
+        refresher.close()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
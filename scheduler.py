@@ -0,0 +1,256 @@
+"""
+Due and at-risk habit scheduler.
+
+Keeps every habit's next deadlines in the habit_schedule table:
+- due_on: first day a new completion continues the streak (last completion + min gap)
+- breaks_on: first day a new completion no longer continues the streak
+  (last completion + max gap + 1), so the at-risk deadline matches check_gap()
+
+"N times per week" habits are due until the quota of the week is met and
+then from the next Monday on; their streak breaks on the Monday after a
+week that missed the quota, like StreakRunIndex counts it.
+
+Triggers on habits and tracking update the row in the same transaction as
+every write, from any connection. Both columns are indexed, so the due and
+at-risk lists are index range scans that read only the k habits returned,
+O(k log n) instead of running current_streak() for every habit.
+
+Usage:
+    python scheduler.py --db habits.db
+    python scheduler.py --db habits.db --date 2025-09-30 --within-days 1
+"""
+
+# region imports
+import sqlite3
+import argparse
+from datetime import date, datetime, timedelta
+
+from storage import SQLiteStorage
+from periodicity import gap_sql, times_per_week_sql
+
+# endregion imports
+
+DEFAULT_LIMIT = 50
+# due_on of habits without completions, sorts before every date so they are due first
+NEVER_COMPLETED = ""
+# Completions of a habit_schedule row's habit in the ISO week of last_completion,
+# shifted by a number of weeks ("weekday 0" moves to that week's Sunday)
+WEEK_COUNT = """(SELECT COUNT(*) FROM tracking t WHERE t.habit_id = habit_schedule.habit_id
+    AND t.completion_date BETWEEN date(last_completion, 'weekday 0', '{start} days')
+                              AND date(last_completion, 'weekday 0', '{end} days'))"""
+PER_WEEK = f"""(SELECT {times_per_week_sql("h.habit_periodicity")} FROM habits h
+    WHERE h.habit_id = habit_schedule.habit_id)"""
+# Both deadlines of a habit_schedule row from its last_completion, min_gap and grace,
+# the largest gap that continues the streak
+DEADLINES = f"""
+    due_on = CASE
+        WHEN last_completion IS NULL THEN '{NEVER_COMPLETED}'
+        WHEN {PER_WEEK} > 0 AND {WEEK_COUNT.format(start=-6, end=0)} >= {PER_WEEK}
+        THEN date(last_completion, 'weekday 0', '+1 days')
+        ELSE date(last_completion, '+' || min_gap || ' days') END,
+    breaks_on = CASE
+        WHEN {PER_WEEK} = 0 THEN date(last_completion, '+' || (grace + 1) || ' days')
+        WHEN {WEEK_COUNT.format(start=-6, end=0)} >= {PER_WEEK} THEN date(last_completion, 'weekday 0', '+8 days')
+        WHEN {WEEK_COUNT.format(start=-13, end=-7)} >= {PER_WEEK} THEN date(last_completion, 'weekday 0', '+1 days')
+        END
+"""
+# Completions that can change the deadlines: the latest one and, for weekly
+# quotas, every one in its week or the week before
+RECENT = "date({last}, 'weekday 0', '-13 days')"
+
+
+# region Schema
+def ensure_schedule_schema(connection):
+    """
+    Create the habit_schedule table and its triggers if they don't exist.
+
+    Existing habits are scheduled from their latest completion in the
+    tracking table. Completions moved to the archive tier are not taken
+    into account; they are years old and can't keep a streak alive.
+
+    Args:
+        connection (sqlite3.Connection): Database connection
+    """
+    connection.execute("""
+        CREATE TABLE IF NOT EXISTS habit_schedule(
+            habit_id INTEGER PRIMARY KEY,
+            min_gap INTEGER NOT NULL,
+            grace INTEGER NOT NULL,
+            last_completion DATE,
+            due_on DATE NOT NULL,
+            breaks_on DATE,
+
+            FOREIGN KEY (habit_id) REFERENCES habits(habit_id) ON DELETE CASCADE)
+    """)
+    connection.execute("CREATE INDEX IF NOT EXISTS idx_habit_schedule_due ON habit_schedule(due_on)")
+    connection.execute("CREATE INDEX IF NOT EXISTS idx_habit_schedule_breaks ON habit_schedule(breaks_on)")
+
+    # gap_sql() gives NULL for unsupported periodicities, so the NOT NULL columns
+    # reject such habits here and the backfill below skips them
+    min_gap, max_gap, _, _ = gap_sql("new.habit_periodicity")
+    last = "(SELECT last_completion FROM habit_schedule WHERE habit_id = {}.habit_id)"
+    triggers = {
+        "schedule_habit_insert": f"""
+        CREATE TRIGGER schedule_habit_insert AFTER INSERT ON habits
+        BEGIN
+            INSERT OR REPLACE INTO habit_schedule (habit_id, min_gap, grace, last_completion, due_on, breaks_on)
+            VALUES (new.habit_id, {min_gap}, {max_gap}, NULL, '{NEVER_COMPLETED}', NULL);
+        END""",
+        "schedule_tracking_insert": f"""
+        CREATE TRIGGER schedule_tracking_insert AFTER INSERT ON tracking
+        WHEN new.completion_date >= coalesce({RECENT.format(last=last.format("new"))}, '')
+        BEGIN
+            UPDATE habit_schedule SET last_completion = max(coalesce(last_completion, ''), new.completion_date)
+            WHERE habit_id = new.habit_id;
+            UPDATE habit_schedule SET {DEADLINES} WHERE habit_id = new.habit_id;
+        END""",
+        "schedule_tracking_delete": f"""
+        CREATE TRIGGER schedule_tracking_delete AFTER DELETE ON tracking
+        WHEN old.completion_date >= {RECENT.format(last=last.format("old"))}
+        BEGIN
+            UPDATE habit_schedule
+            SET last_completion = (SELECT MAX(completion_date) FROM tracking WHERE habit_id = old.habit_id)
+            WHERE habit_id = old.habit_id;
+            UPDATE habit_schedule SET {DEADLINES} WHERE habit_id = old.habit_id;
+        END"""
+    }
+    # Re-create triggers of older versions, whose deadlines are recomputed below
+    outdated = False
+    for name, sql in triggers.items():
+        row = connection.execute("SELECT sql FROM sqlite_master WHERE type = 'trigger' AND name = ?",
+                                 (name,)).fetchone()
+        if row is None or row[0] != sql.strip():
+            outdated = outdated or row is not None
+            connection.execute(f"DROP TRIGGER IF EXISTS {name}")
+            connection.execute(sql)
+
+    min_gap, max_gap, _, _ = gap_sql("h.habit_periodicity")
+    if outdated:
+        # Older versions stored the gap to today as grace
+        connection.execute(f"""
+            UPDATE habit_schedule SET grace = coalesce(
+                (SELECT {max_gap} FROM habits h WHERE h.habit_id = habit_schedule.habit_id), grace)
+        """)
+    # Schedule habits that existed before the table, only they have no deadlines yet
+    connection.execute(f"""
+        INSERT OR IGNORE INTO habit_schedule (habit_id, min_gap, grace, last_completion, due_on)
+        SELECT h.habit_id, {min_gap}, {max_gap},
+               (SELECT MAX(completion_date) FROM tracking t WHERE t.habit_id = h.habit_id), '{NEVER_COMPLETED}'
+        FROM habits h
+    """)
+    connection.execute(f"""
+        UPDATE habit_schedule SET {DEADLINES}
+        WHERE last_completion IS NOT NULL AND (breaks_on IS NULL OR ?)
+    """, (outdated,))
+    connection.commit()
+# endregion Schema
+
+
+# region Queries
+def _day(value):
+    """Return a stored date string as date, None for a missing one."""
+    return date.fromisoformat(value) if value else None
+
+
+def due_habits(storage, today=None, limit=DEFAULT_LIMIT):
+    """
+    Return habits that are due, most overdue first.
+
+    A habit is due when a completion today continues its streak or, if the
+    streak is already broken, starts a new one. Habits that were never
+    completed are due first.
+
+    Args:
+        storage (SQLiteStorage): Database storage object
+        today (date, optional): Reference date, default today
+        limit (int): Maximum number of habits
+
+    Returns:
+        list: [(habit_name: str, due_on: date or None)], due_on None if never completed
+    """
+    today = today or datetime.now().date()
+    rows = storage.connection.execute("""
+        SELECT h.habit_name, s.due_on FROM habit_schedule s
+        JOIN habits h ON h.habit_id = s.habit_id
+        WHERE s.due_on <= ? ORDER BY s.due_on, s.habit_id LIMIT ?
+        """, (today.isoformat(), limit)).fetchall()
+    return [(row[0], _day(row[1])) for row in rows]
+
+
+def at_risk_habits(storage, today=None, within_days=0, limit=DEFAULT_LIMIT):
+    """
+    Return habits whose streak breaks unless they are completed soon.
+
+    The deadline is the last day a completion still continues the streak,
+    last completion + max gap like check_gap(), never before due_on.
+
+    Args:
+        storage (SQLiteStorage): Database storage object
+        today (date, optional): Reference date, default today
+        within_days (int): 0 for streaks that need a completion today, 1 to
+            include those that can wait until tomorrow, and so on
+        limit (int): Maximum number of habits
+
+    Returns:
+        list: [(habit_name: str, last_day: date, last_completion: date)], soonest first.
+        last_day is the last day a completion keeps the streak alive.
+
+    Raises:
+        ValueError: If within_days is negative
+    """
+    if within_days < 0:
+        raise ValueError("within_days must not be negative")
+    today = today or datetime.now().date()
+    rows = storage.connection.execute("""
+        SELECT h.habit_name, s.breaks_on, s.last_completion FROM habit_schedule s
+        JOIN habits h ON h.habit_id = s.habit_id
+        WHERE s.breaks_on > ? AND s.breaks_on <= ? ORDER BY s.breaks_on, s.habit_id LIMIT ?
+        """, (today.isoformat(), (today + timedelta(days=within_days + 1)).isoformat(), limit)).fetchall()
+    return [(row[0], _day(row[1]) - timedelta(days=1), _day(row[2])) for row in rows]
+
+
+def reminders(storage, today=None, within_days=0, limit=DEFAULT_LIMIT):
+    """
+    Build the reminder text for due and at-risk habits.
+
+    Args:
+        storage (SQLiteStorage): Database storage object
+        today (date, optional): Reference date, default today
+        within_days (int): Look-ahead for at-risk habits, see at_risk_habits()
+        limit (int): Maximum number of habits per list
+
+    Returns:
+        str: One line per at-risk habit, then the due habits, or a message that nothing is due
+    """
+    today = today or datetime.now().date()
+    at_risk = at_risk_habits(storage, today, within_days, limit)
+    due = due_habits(storage, today, limit)
+    if not at_risk and not due:
+        return "Nothing is due"
+    lines = [f"Complete {habit} by {last_day} to keep its streak" for habit, last_day, _ in at_risk]
+    lines += [f"{habit} is due" + (f" since {due_on}" if due_on and due_on < today else "") for habit, due_on in due]
+    return "\n".join(lines)
+# endregion Queries
+
+
+def main(argv=None):
+    """Print due and at-risk habits from the command line."""
+    parser = argparse.ArgumentParser(description="List due and at-risk habits")
+    parser.add_argument("--db", default="habits.db", help="SQLite database file")
+    parser.add_argument("--date", type=date.fromisoformat, default=None, help="Reference date, default today")
+    parser.add_argument("--within-days", type=int, default=0, help="Look-ahead for at-risk streaks")
+    parser.add_argument("--limit", type=int, default=DEFAULT_LIMIT, help="Maximum habits per list")
+    args = parser.parse_args(argv)
+
+    conn = sqlite3.connect(args.db)
+    conn.execute("PRAGMA foreign_keys = ON")
+    try:
+        ensure_schedule_schema(conn)
+        print(reminders(SQLiteStorage(conn), args.date, args.within_days, args.limit))
+    finally:
+        conn.close()
+    return 0
+
+
+if __name__ == "__main__":
+    main()
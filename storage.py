@@ -1,4 +1,214 @@
+import time
+import random
 import sqlite3
+import functools
+from typing import Protocol, runtime_checkable
+from datetime import date, datetime, timedelta
+
+from archive import encode_days, decode_days
+from layout import CLUSTERED, tracking_layout
+from metrics import REGISTRY, track_storage, COMPLETIONS_WRITTEN, HABITS_CREATED, HABITS_DELETED
+
+LOCK_RETRIES = REGISTRY.counter(
+    "habit_tracker_storage_lock_retries_total", "Writes retried because the database was locked")
+
+# region Busy handling
+class RetryPolicy:
+
+    """
+    Retry-with-backoff policy for writes that fail with "database is locked".
+
+    SQLite's busy_timeout only waits for locks inside a single statement. A
+    deferred transaction that already read and then needs the write lock gets
+    SQLITE_BUSY immediately, so the whole write has to be rolled back and
+    retried. Delays grow exponentially up to max_delay, with random jitter
+    so competing writers do not retry in lockstep.
+
+    Attributes:
+        retries (int): Retries after the first attempt
+        base_delay (float): Delay in seconds before the first retry
+        max_delay (float): Upper bound for a single delay in seconds
+        jitter (bool): Randomize each delay between 50% and 100%
+    """
+
+    def __init__(self, retries=5, base_delay=0.01, max_delay=1.0, jitter=True):
+        if retries < 0 or base_delay < 0 or max_delay < base_delay:
+            raise ValueError("Invalid retry policy")
+        self.retries = retries
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.jitter = jitter
+
+    def delay(self, attempt):
+        """Return delay in seconds before retry number attempt (0-based)."""
+        delay = min(self.max_delay, self.base_delay * (2 ** attempt))
+        if self.jitter:
+            delay *= random.uniform(0.5, 1.0)
+        return delay
+
+
+def is_busy_error(error):
+    """Return True if a sqlite3 error means the database is locked or busy."""
+    if getattr(error, "sqlite_errorcode", None) in (sqlite3.SQLITE_BUSY, sqlite3.SQLITE_LOCKED):
+        return True
+    message = str(error)
+    return "database is locked" in message or "database is busy" in message
+
+
+def retry_on_busy(func):
+    """Decorator retrying a storage write according to self.retry_policy."""
+    @functools.wraps(func)
+    def wrapper(self, *args, **kwargs):
+        attempt = 0
+        while True:
+            try:
+                return func(self, *args, **kwargs)
+            except sqlite3.OperationalError as e:
+                policy = self.retry_policy
+                if policy is None or attempt >= policy.retries or not is_busy_error(e):
+                    raise
+                self.connection.rollback()
+                time.sleep(policy.delay(attempt))
+                attempt += 1
+                self.lock_retries += 1
+                LOCK_RETRIES.inc()
+    return wrapper
+# endregion Busy handling
+
+# region Search schema
+def ensure_search_schema(connection):
+    """
+    Create indexes used by habit search and pagination.
+
+    Adds a NOCASE index on habit_name, which SQLite uses for case-insensitive
+    prefix LIKE queries, and an FTS5 trigram index over habit name and
+    description kept in sync by triggers. The FTS5 part is skipped if the
+    SQLite build doesn't support it; search then falls back to a scan.
+
+    Args:
+        connection (sqlite3.Connection): Database connection
+
+    Returns:
+        bool: True if the FTS5 index is available
+    """
+    connection.execute("CREATE INDEX IF NOT EXISTS idx_habits_name_nocase ON habits(habit_name COLLATE NOCASE)")
+    try:
+        exists = connection.execute(
+            "SELECT 1 FROM sqlite_master WHERE name = 'habits_fts'").fetchone() is not None
+        if not exists:
+            connection.execute("""
+                CREATE VIRTUAL TABLE habits_fts USING fts5(
+                    habit_name, habit_description,
+                    content='habits', content_rowid='habit_id', tokenize='trigram')
+            """)
+            connection.execute("""
+                CREATE TRIGGER habits_fts_insert AFTER INSERT ON habits BEGIN
+                    INSERT INTO habits_fts(rowid, habit_name, habit_description)
+                    VALUES (new.habit_id, new.habit_name, new.habit_description);
+                END
+            """)
+            connection.execute("""
+                CREATE TRIGGER habits_fts_delete AFTER DELETE ON habits BEGIN
+                    INSERT INTO habits_fts(habits_fts, rowid, habit_name, habit_description)
+                    VALUES ('delete', old.habit_id, old.habit_name, old.habit_description);
+                END
+            """)
+            connection.execute("""
+                CREATE TRIGGER habits_fts_update AFTER UPDATE ON habits BEGIN
+                    INSERT INTO habits_fts(habits_fts, rowid, habit_name, habit_description)
+                    VALUES ('delete', old.habit_id, old.habit_name, old.habit_description);
+                    INSERT INTO habits_fts(rowid, habit_name, habit_description)
+                    VALUES (new.habit_id, new.habit_name, new.habit_description);
+                END
+            """)
+            connection.execute("INSERT INTO habits_fts(habits_fts) VALUES ('rebuild')")
+        connection.commit()
+        return True
+    except sqlite3.OperationalError:
+        connection.rollback()
+        return False
+
+
+def escape_like(value):
+    """Escape LIKE wildcards so value is matched literally (ESCAPE '\\')."""
+    return value.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+# endregion Search schema
+
+# region Change log schema
+# Operations recorded in the change log
+HABIT_CREATED = "habit_created"
+HABIT_DELETED = "habit_deleted"
+COMPLETION_ADDED = "completion_added"
+COMPLETION_DELETED = "completion_deleted"
+
+
+def ensure_changelog_schema(connection):
+    """
+    Create the append-only change_log table if it doesn't exist.
+
+    Every mutation made through SQLiteStorage appends one row in the same
+    transaction. AUTOINCREMENT guarantees sequence numbers only grow, even
+    after the newest rows are removed, so consumers can resume from the
+    last sequence number they processed.
+
+    Args:
+        connection (sqlite3.Connection): Database connection
+    """
+    connection.execute("""
+        CREATE TABLE IF NOT EXISTS change_log(
+            seq INTEGER PRIMARY KEY AUTOINCREMENT,
+            operation VARCHAR NOT NULL,
+            habit_id INTEGER NOT NULL,
+            habit_name VARCHAR NOT NULL,
+            completion_date DATE,
+            changed_at DATETIME DEFAULT CURRENT_TIMESTAMP)
+    """)
+    connection.execute("CREATE INDEX IF NOT EXISTS idx_change_log_habit ON change_log(habit_name, seq)")
+    connection.commit()
+# endregion Change log schema
+
+# region Storage protocol
+# Messages returned by storage backends, callers compare against these
+INVALID_HABIT_NAME = "Invalid habit name"
+HABIT_NOT_FOUND = "Habit name was not found"
+NO_SUCH_HABIT = "There is no such habit"
+NO_DATA_FOUND = "No data found"
+
+
+@runtime_checkable
+class HabitStorage(Protocol):
+
+    """
+    Interface shared by all storage backends.
+
+    Analytics, the CLI, the API server and the write buffer only use these
+    methods. SQLiteStorage is the persistent backend; MemoryStorage in
+    memory_storage.py keeps everything in process memory. Return values,
+    including the message strings above, are the same for both backends,
+    see SQLiteStorage for the documentation of each method.
+    """
+
+    def save_habit(self, habit): ...
+    def load_habit(self, habit): ...
+    def load_all_habits(self): ...
+    def load_habits_page(self, after=None, limit=50, prefix=None): ...
+    def search_habits(self, text, limit=20): ...
+    def delete_habit(self, habit): ...
+    def delete_habit_chunked(self, habit, chunk_size=1000, progress=None): ...
+    def save_tracking_data(self, data): ...
+    def save_tracking_batch(self, data): ...
+    def load_tracking_data(self, habit_name, include_archive=True): ...
+    def delete_tracking_data(self, data): ...
+    def load_all_habits_by_periodicity(self, periodicity): ...
+    def load_periodicities(self): ...
+    def iter_tracking_data(self, periodicity=None, shard=None): ...
+    def purge_tracking_data(self, older_than_days, chunk_size=1000, today=None, start_after=None, progress=None): ...
+    def load_archive_summary(self, habit_name): ...
+    def change_marker(self, habit=None): ...
+    def last_change_seq(self): ...
+    def changes_since(self, seq=0, batch_size=500): ...
+    def dirty_habits(self, since_seq=0): ...
+# endregion Storage protocol
 
 # region SQLiteStorage class
 class SQLiteStorage:
@@ -12,10 +222,17 @@ class SQLiteStorage:
     Attributes:
         connection: SQLite database connection object
         cursor: Database cursor for executing SQL commands
+        write_version (int): Number of writes made through this storage object
+        retry_policy (RetryPolicy): Retry policy for locked writes, None to fail immediately
+        lock_retries (int): Number of write retries caused by locks
+        has_archive (bool): Whether the tracking_archive table exists
+        has_search (bool): Whether the habits_fts search index exists
+        has_changelog (bool): Whether the change_log table exists
+        clustered (bool): Whether tracking uses the clustered WITHOUT ROWID layout
     """
 
     # region Initialisation
-    def __init__(self, connection):
+    def __init__(self, connection, busy_timeout=None, retry_policy=None):
         """
         Initialize SQLiteStorage with database connection.
         
@@ -24,13 +241,184 @@ class SQLiteStorage:
         
         Args:
             connection: sqlite3.Connection object to existing database
+            busy_timeout (int, optional): Milliseconds SQLite waits for a lock per statement
+            retry_policy (RetryPolicy, optional): Retry policy for writes that still
+                fail with "database is locked"
         """
         self.connection = connection
         self.connection.row_factory = sqlite3.Row
         self.cursor = self.connection.cursor()
+        if busy_timeout is not None:
+            self.connection.execute(f"PRAGMA busy_timeout = {int(busy_timeout)}")
+        self.retry_policy = retry_policy
+        self.lock_retries = 0
+        self._schema_version = None
+        self.has_search = self._has_table("habits_fts")
+        self.has_changelog = self._has_table("change_log")
+        self.write_version = 0
+        self._habit_versions = {}
+
+    def _has_table(self, name):
+        """Return True if a table with the given name exists."""
+        return self.connection.execute("""
+            SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = ?
+            """, (name,)).fetchone() is not None
+
+    def _refresh_schema(self):
+        """
+        Re-detect tables other connections may add or rebuild, when the schema changed.
+
+        PRAGMA schema_version changes with every schema change, also those
+        committed by other connections, so a long-lived storage object picks
+        up e.g. an archive created or a layout conversion run by another process.
+        """
+        version = self.connection.execute("PRAGMA schema_version").fetchone()[0]
+        if version != self._schema_version:
+            self._has_archive = self._has_table("tracking_archive")
+            self._clustered = tracking_layout(self.connection) == CLUSTERED
+            self._schema_version = version
+
+    @property
+    def has_archive(self):
+        """Whether the tracking_archive table exists, checked again after schema changes."""
+        self._refresh_schema()
+        return self._has_archive
+
+    @property
+    def clustered(self):
+        """Whether tracking uses the clustered layout, checked again after schema changes."""
+        self._refresh_schema()
+        return self._clustered
+
+    @property
+    def _tracking_key(self):
+        """Key the tracking B-tree is ordered by, used for chunked deletes."""
+        return ("habit_id", "completion_date") if self.clustered else ("tracking_id",)
     # endregion Initialisation
 
+    # region Change tracking
+    def _record_write(self, habit_name):
+        """Bump global and per-habit write counters after a committed change."""
+        self.write_version += 1
+        self._habit_versions[habit_name] = self._habit_versions.get(habit_name, 0) + 1
+
+    def change_marker(self, habit=None):
+        """
+        Return a marker that changes whenever data for a habit may have changed.
+
+        Combines SQLite's PRAGMA data_version, which changes when another
+        connection commits, with write counters of this storage object.
+        With a change log the marker is the habit's latest sequence number
+        instead, so commits from other connections only invalidate the
+        habits they touched.
+
+        Args:
+            habit (str, optional): Habit name, or None for a marker over all habits
+
+        Returns:
+            tuple: Hashable marker, equal markers mean unchanged data
+        """
+        if self.has_changelog:
+            if habit is None:
+                return ("seq", self.last_change_seq())
+            row = self.connection.execute("""
+                SELECT MAX(seq) FROM change_log WHERE habit_name = ?
+                """, (habit,)).fetchone()
+            return ("seq", row[0] or 0)
+        data_version = self.connection.execute("PRAGMA data_version").fetchone()[0]
+        if habit is None:
+            return (data_version, self.write_version)
+        return (data_version, self._habit_versions.get(habit, 0))
+
+    def _log_change(self, operation, habit_id, habit_name, completion_date=None):
+        """Append a change inside the caller's transaction, no-op without change log."""
+        if self.has_changelog:
+            self.connection.execute("""
+                INSERT INTO change_log (operation, habit_id, habit_name, completion_date)
+                VALUES (?, ?, ?, ?)
+                """, (operation, habit_id, habit_name, completion_date))
+
+    def last_change_seq(self):
+        """
+        Return the sequence number of the newest change.
+
+        Returns:
+            int: Latest sequence number, 0 if nothing was logged yet
+        """
+        if not self.has_changelog:
+            return 0
+        row = self.connection.execute("SELECT MAX(seq) FROM change_log").fetchone()
+        return row[0] or 0
+
+    def changes_since(self, seq=0, batch_size=500):
+        """
+        Stream changes logged after a sequence number, oldest first.
+
+        Reads the log in keyset batches of batch_size rows, so consumers
+        can process changes of any volume with bounded memory and may
+        write to the database between items. Not timed by track_storage,
+        which would only measure creating the generator.
+
+        Args:
+            seq (int): Last sequence number the consumer has processed, 0 for all
+            batch_size (int): Rows fetched per query
+
+        Yields:
+            tuple: (seq: int, operation: str, habit_name: str, completion_date: str or None)
+
+        Raises:
+            ValueError: If the database has no change log
+
+        Example:
+            for seq, operation, habit, completion_date in storage.changes_since(checkpoint):
+                apply(operation, habit, completion_date)
+                checkpoint = seq
+        """
+        if not self.has_changelog:
+            raise ValueError("Change log is not enabled")
+        while True:
+            rows = self.connection.execute("""
+                SELECT seq, operation, habit_name, completion_date FROM change_log
+                WHERE seq > ? ORDER BY seq LIMIT ?
+                """, (seq, batch_size)).fetchall()
+            for row in rows:
+                yield tuple(row)
+            if len(rows) < batch_size:
+                return
+            seq = rows[-1]["seq"]
+
+    @track_storage("dirty_habits")
+    def dirty_habits(self, since_seq=0):
+        """
+        Return habits changed after a change log sequence number.
+
+        The dirty set for incremental jobs: a job stores last_change_seq()
+        when it runs and next time only processes habits returned here.
+        Uses the change log's primary key, so the cost depends on the number
+        of changes, not on the number of habits. Deleted habits are left out.
+
+        Args:
+            since_seq (int): Sequence number of the previous run
+
+        Returns:
+            list: Names of existing habits with changes, sorted
+
+        Raises:
+            ValueError: If the database has no change log
+        """
+        if not self.has_changelog:
+            raise ValueError("Change log is not enabled")
+        res = self.connection.execute("""
+            SELECT DISTINCT h.habit_name FROM change_log c
+            JOIN habits h ON h.habit_id = c.habit_id
+            WHERE c.seq > ? ORDER BY h.habit_name
+            """, (since_seq,))
+        return [row["habit_name"] for row in res]
+    # endregion Change tracking
+
     # region Habit operations
+    @track_storage("save_habit")
+    @retry_on_busy
     def save_habit(self, habit):
         """
         Save a new habit to a database.
@@ -52,7 +440,10 @@ class SQLiteStorage:
                     INSERT INTO habits (habit_name, habit_periodicity, habit_description) VALUES
                     (?, ?, ?)
                 """, (habit.name, habit.periodicity, habit.description))
+            self._log_change(HABIT_CREATED, self.cursor.lastrowid, habit.name)
             self.connection.commit()
+            self._record_write(habit.name)
+            HABITS_CREATED.inc()
             return True
         except sqlite3.IntegrityError:
             return False
@@ -61,6 +452,7 @@ class SQLiteStorage:
             raise e # <--- WIRF DEN FEHLER NEU, UM TRACEBACK ZU ERHALTEN!
 
     
+    @track_storage("load_habit")
     def load_habit(self, habit):
         """
         Load a single habit by name from database.
@@ -85,6 +477,7 @@ class SQLiteStorage:
         answer = res.fetchone()
         return answer
     
+    @track_storage("load_all_habits")
     def load_all_habits(self):
         """
         Load all habits by name from database.
@@ -99,6 +492,95 @@ class SQLiteStorage:
         answer = res.fetchall()
         return [habit["habit_name"] for habit in answer]
     
+    @track_storage("load_habits_page")
+    def load_habits_page(self, after=None, limit=50, prefix=None):
+        """
+        Load one page of habit names in alphabetical order.
+
+        Keyset pagination: pass the last name of the previous page as after.
+        Uses the UNIQUE index on habit_name, so every page costs the same
+        no matter how deep the caller pages.
+
+        Args:
+            after (str, optional): Return names sorting after this one
+            limit (int): Maximum number of names
+            prefix (str, optional): Only names starting with prefix (case-insensitive)
+
+        Returns:
+            list: Habit names, empty list when there are no more pages
+
+        Example:
+            page = storage.load_habits_page(limit=50)
+            while page:
+                show(page)
+                page = storage.load_habits_page(after=page[-1], limit=50)
+        """
+        query = "SELECT habit_name FROM habits WHERE 1 = 1"
+        params = []
+        if after is not None:
+            query += " AND habit_name > ?"
+            params.append(after)
+        if prefix:
+            query += " AND habit_name LIKE ? ESCAPE '\\'"
+            params.append(escape_like(prefix) + "%")
+        query += " ORDER BY habit_name LIMIT ?"
+        params.append(limit)
+        res = self.connection.execute(query, params)
+        return [habit["habit_name"] for habit in res.fetchall()]
+
+    @track_storage("search_habits")
+    def search_habits(self, text, limit=20):
+        """
+        Search habits by name prefix, then by substring in name or description.
+
+        Prefix matches come first and use the NOCASE name index. Remaining
+        slots are filled from the FTS5 trigram index (substring matches
+        ranked by relevance), or by a LIKE scan if the index doesn't exist.
+
+        Args:
+            text (str): Search text
+            limit (int): Maximum number of names
+
+        Returns:
+            list: Matching habit names, empty list for empty text
+        """
+        if not text or not text.strip():
+            return []
+        text = text.strip()
+        results = self.connection.execute("""
+            SELECT habit_name FROM habits
+            WHERE habit_name LIKE ? ESCAPE '\\'
+            ORDER BY habit_name COLLATE NOCASE LIMIT ?
+            """, (escape_like(text) + "%", limit)).fetchall()
+        names = [row["habit_name"] for row in results]
+        if len(names) >= limit:
+            return names
+
+        if self.has_search and len(text) >= 3:
+            # Trigram tokenizer matches any substring of at least 3 characters
+            phrase = '"' + text.replace('"', '""') + '"'
+            res = self.connection.execute("""
+                SELECT habit_name FROM habits_fts WHERE habits_fts MATCH ?
+                ORDER BY rank LIMIT ?
+                """, (phrase, limit + len(names)))
+        else:
+            pattern = "%" + escape_like(text) + "%"
+            res = self.connection.execute("""
+                SELECT habit_name FROM habits
+                WHERE habit_name LIKE ? ESCAPE '\\' OR habit_description LIKE ? ESCAPE '\\'
+                ORDER BY habit_name LIMIT ?
+                """, (pattern, pattern, limit + len(names)))
+        seen = set(names)
+        for row in res:
+            if row[0] not in seen:
+                names.append(row[0])
+                seen.add(row[0])
+                if len(names) >= limit:
+                    break
+        return names
+
+    @track_storage("delete_habit")
+    @retry_on_busy
     def delete_habit(self, habit):
         """
         Delete single habit by name from database.
@@ -120,17 +602,26 @@ class SQLiteStorage:
             else:
                 print(message)
         """
+        row = self.cursor.execute("""
+            SELECT habit_id FROM habits WHERE habit_name = ?
+            """, (habit,)).fetchone()
+        if row:
+            self._log_change(HABIT_DELETED, row["habit_id"], habit)
         res = self.cursor.execute("""
                                  DELETE FROM habits WHERE habit_name = ? 
                                   """, (habit,))
         self.connection.commit()
         if self.cursor.rowcount > 0:
+            self._record_write(habit)
+            HABITS_DELETED.inc()
             return (True, "Habit succesfully deleted")
         else:
-            return (False, "There is no such habit")
+            return (False, NO_SUCH_HABIT)
     # endregion Habit operations
 
     # region Tracking Operations    
+    @track_storage("save_tracking_data")
+    @retry_on_busy
     def save_tracking_data(self, data):
         """
         Save tracking data in a database.
@@ -179,7 +670,7 @@ class SQLiteStorage:
         """
         habit_name, single_date = data[0], str(data[1])
         if not habit_name or not habit_name.strip():
-            return (False, "Invalid habit name")
+            return (False, INVALID_HABIT_NAME)
         
         res = self.cursor.execute("""
             SELECT habit_id FROM habits
@@ -187,17 +678,88 @@ class SQLiteStorage:
             """, (habit_name,))
         habit_id = res.fetchone()
         if not habit_id:
-            return (False, "Habit name was not found")
+            return (False, HABIT_NOT_FOUND)
         habit_id = habit_id["habit_id"]
                                           
+        # The clustered layout keeps one completion per day, a repeat is ignored
         self.cursor.execute("""
-            INSERT INTO tracking (habit_id, completion_date) 
+            INSERT OR IGNORE INTO tracking (habit_id, completion_date) 
             VALUES (?, ?)
             """, (habit_id, single_date))
+        inserted = self.cursor.rowcount
+        if inserted:
+            self._log_change(COMPLETION_ADDED, habit_id, habit_name, single_date)
         self.connection.commit()
+        if inserted:
+            self._record_write(habit_name)
+            COMPLETIONS_WRITTEN.inc()
         return (True, "Successfully saved")
     
-    def load_tracking_data(self, habit_name):
+    @track_storage("save_tracking_batch")
+    @retry_on_busy
+    def save_tracking_batch(self, data):
+        """
+        Save many completions in a single transaction.
+
+        Group commit for write-behind buffering: habit IDs are resolved once
+        per distinct name and all valid rows are inserted with one commit.
+        Entries with invalid or unknown habit names are skipped and reported
+        back. Like save_tracking_data(), only completions that were actually
+        inserted are counted and logged; repeats the clustered layout ignores
+        are not.
+
+        Args:
+            data (list): [(habit_name: str, completion_date: date), ...]
+
+        Returns:
+            tuple: (saved: int, failed: list of ((habit_name, completion_date), message)),
+            saved counts the inserted completions
+
+        Raises:
+            sqlite3.Error: If the transaction fails, nothing is saved
+        """
+        habit_ids = {}
+        rows = []
+        failed = []
+        for habit_name, completion_date in data:
+            if not habit_name or not habit_name.strip():
+                failed.append(((habit_name, completion_date), INVALID_HABIT_NAME))
+                continue
+            if habit_name not in habit_ids:
+                res = self.cursor.execute("""
+                    SELECT habit_id FROM habits
+                    WHERE habit_name = ?
+                    """, (habit_name,))
+                habit_id = res.fetchone()
+                habit_ids[habit_name] = habit_id["habit_id"] if habit_id else None
+            if habit_ids[habit_name] is None:
+                failed.append(((habit_name, completion_date), HABIT_NOT_FOUND))
+                continue
+            rows.append((habit_ids[habit_name], habit_name, str(completion_date)))
+
+        saved = 0
+        if rows:
+            try:
+                # Row by row so rowcount tells which rows INSERT OR IGNORE skipped
+                for habit_id, habit_name, completion_date in rows:
+                    self.cursor.execute("""
+                        INSERT OR IGNORE INTO tracking (habit_id, completion_date)
+                        VALUES (?, ?)
+                        """, (habit_id, completion_date))
+                    if self.cursor.rowcount:
+                        self._log_change(COMPLETION_ADDED, habit_id, habit_name, completion_date)
+                        saved += 1
+                self.connection.commit()
+            except Exception as e:
+                self.connection.rollback()
+                raise e
+            for habit_name in {row[1] for row in rows}:
+                self._record_write(habit_name)
+            COMPLETIONS_WRITTEN.inc(saved)
+        return (saved, failed)
+
+    @track_storage("load_tracking_data")
+    def load_tracking_data(self, habit_name, include_archive=True):
         """
         Retrieve tracking data for a given habit.
 
@@ -206,6 +768,8 @@ class SQLiteStorage:
 
         Args:
             habit (str): Name of the habit to retrieve tracking data.
+            include_archive (bool): Also return completions compacted into the archive tier.
+                Archived completions come first, as (completion_date,) tuples.
 
         Returns:
             list or str:
@@ -241,22 +805,28 @@ class SQLiteStorage:
 
         """
         if not habit_name or not habit_name.strip():
-            return "Invalid habit name"
+            return INVALID_HABIT_NAME
         res = self.cursor.execute("""
             SELECT habit_id FROM habits
             WHERE habit_name = ?
             """, (habit_name,))
         habit_id = res.fetchone()
         if not habit_id:
-            return "Habit name was not found"
+            return HABIT_NOT_FOUND
         habit_id = habit_id["habit_id"]
         
         res = self.cursor.execute("""
                             SELECT completion_date FROM tracking WHERE habit_id = ?
                             """, (habit_id,))
         load_result = res.fetchall()
+        if include_archive and self.has_archive:
+            archived = self._load_archived_days(habit_id)
+            if archived:
+                load_result = [(date.fromordinal(ordinal).isoformat(),) for ordinal in archived] + load_result
         return load_result
     
+    @track_storage("delete_tracking_data")
+    @retry_on_busy
     def delete_tracking_data(self,data):
         """
         Delete certain tracking data for given habit.
@@ -283,27 +853,33 @@ class SQLiteStorage:
         """
         habit_name, completion_date = data[0], str(data[1])
         if not habit_name or not habit_name.strip():
-            return "Invalid habit name"
+            return INVALID_HABIT_NAME
         res = self.cursor.execute("""
             SELECT habit_id FROM habits
             WHERE habit_name = ?
             """, (habit_name,))
         habit_id = res.fetchone()
         if not habit_id:
-            return "Habit name was not found"
+            return HABIT_NOT_FOUND
         habit_id = habit_id["habit_id"]
 
         self.cursor.execute("""
                             DELETE FROM tracking WHERE habit_id = ?
                             AND completion_date = ?
                             """, (habit_id, completion_date,))
-        self.connection.commit()
         rows = self.cursor.rowcount
+        if rows == 0 and self.has_archive:
+            rows = self._delete_archived_day(habit_id, completion_date)
+        if rows > 0:
+            self._log_change(COMPLETION_DELETED, habit_id, habit_name, completion_date)
+        self.connection.commit()
         if rows > 0:
+            self._record_write(habit_name)
             return "Data successfully deleted"
         else:
-            return "No data found"
+            return NO_DATA_FOUND
         
+    @track_storage("load_all_habits_by_periodicity")
     def load_all_habits_by_periodicity(self, periodicity):
         """
         Load all habits with the same periodicity from database.
@@ -312,7 +888,7 @@ class SQLiteStorage:
         for user selection in CLI menus.
 
         Args:
-            periodicity (str): Periodicity to search in DB: "daily", "weekly" or "monthly"
+            periodicity (str): Periodicity to search in DB, e.g. "daily" or "3 times per week"
 
         Returns:
             list: List of all habit names as strings, empty list if no habits exist
@@ -326,7 +902,317 @@ class SQLiteStorage:
         answer = res.fetchall()
         
         return [habit["habit_name"] for habit in answer]
-        
+
+    def load_periodicities(self):
+        """
+        Load the distinct periodicities of all habits.
+
+        Returns:
+            list: Periodicity strings, sorted
+        """
+        res = self.cursor.execute("SELECT DISTINCT habit_periodicity FROM habits ORDER BY habit_periodicity")
+        return [row[0] for row in res]
+
+    def iter_tracking_data(self, periodicity=None, shard=None):
+        """
+        Stream completion dates of all habits grouped by habit.
+
+        Uses dedicated cursors so rows are fetched lazily while the caller
+        iterates, instead of loading the whole tracking table into memory.
+        Archived completions are merged in habit by habit.
+        Habits without tracking data are not included.
+
+        Args:
+            periodicity (str, optional): Restrict to habits with this periodicity
+            shard (tuple, optional): (index, count) to read only the habits with
+                habit_id % count == index; the filter runs in SQL, so other
+                shards' rows are never read
+
+        Yields:
+            tuple: (habit_name: str, habit_periodicity: str, dates: list of str)
+
+        Raises:
+            ValueError: If shard is not (index, count) with 0 <= index < count
+        """
+        where, params = self._habit_filter(periodicity, shard)
+        live = self._iter_live_groups(where, params)
+        if not self.has_archive:
+            for habit_id, name, habit_periodicity, dates in live:
+                yield (name, habit_periodicity, dates)
+            return
+
+        archived = self.connection.execute(f"""
+            SELECT a.habit_id, h.habit_name, h.habit_periodicity, a.day_blob
+            FROM tracking_archive a JOIN habits h ON h.habit_id = a.habit_id
+            WHERE {where} ORDER BY a.habit_id
+            """, params)
+
+        # Merge two streams sorted by habit_id
+        live_group = next(live, None)
+        archive_row = next(archived, None)
+        while live_group is not None or archive_row is not None:
+            if archive_row is None or (live_group is not None and live_group[0] < archive_row[0]):
+                yield live_group[1:]
+                live_group = next(live, None)
+                continue
+            dates = [date.fromordinal(ordinal).isoformat() for ordinal in decode_days(archive_row[3])]
+            if live_group is not None and live_group[0] == archive_row[0]:
+                dates += live_group[3]
+                live_group = next(live, None)
+            yield (archive_row[1], archive_row[2], dates)
+            archive_row = next(archived, None)
+
+    @staticmethod
+    def _habit_filter(periodicity, shard):
+        """Return (where, params) selecting habits h of a periodicity and shard."""
+        conditions, params = ["1"], []
+        if periodicity is not None:
+            conditions.append("h.habit_periodicity = ?")
+            params.append(periodicity)
+        if shard is not None:
+            index, count = shard
+            if not 0 <= index < count:
+                raise ValueError("Shard must be (index, count) with 0 <= index < count")
+            conditions.append("h.habit_id % ? = ?")
+            params += [count, index]
+        return (" AND ".join(conditions), tuple(params))
+
+    def _iter_live_groups(self, where, params):
+        """Yield (habit_id, habit_name, habit_periodicity, dates) from the tracking table."""
+        cursor = self.connection.execute(f"""
+            SELECT h.habit_id, h.habit_name, h.habit_periodicity, t.completion_date
+            FROM habits h JOIN tracking t ON t.habit_id = h.habit_id
+            WHERE {where} ORDER BY h.habit_id
+            """, params)
+        current_id, name, habit_periodicity, dates = None, None, None, []
+        for row in cursor:
+            if row["habit_id"] != current_id:
+                if current_id is not None:
+                    yield (current_id, name, habit_periodicity, dates)
+                current_id, name, habit_periodicity, dates = (
+                    row["habit_id"], row["habit_name"], row["habit_periodicity"], [])
+            dates.append(row["completion_date"])
+        if current_id is not None:
+            yield (current_id, name, habit_periodicity, dates)
+
     # endregion Tracking Operations
 
+    # region Retention
+    @retry_on_busy
+    def _delete_tracking_chunk(self, where, params, chunk_size):
+        """
+        Delete up to chunk_size tracking rows matching where, in one transaction.
+
+        Rows are taken in key order of the tracking table: tracking_id, or
+        (habit_id, completion_date) in the clustered layout. They are the
+        rows matching where up to the chunk's last key, so they are deleted
+        by that key range with a fixed number of bound parameters; a list
+        of keys would exceed the 999 parameter limit of older SQLite builds.
+        where may only refer to columns of tracking t.
+
+        Returns:
+            tuple: (deleted: int, last_key: int, tuple or None, habit_names: set)
+        """
+        columns = ", ".join(f"t.{column}" for column in self._tracking_key)
+        rows = self.connection.execute(f"""
+            SELECT {columns}, h.habit_name FROM tracking t
+            JOIN habits h ON h.habit_id = t.habit_id
+            WHERE {where} ORDER BY {columns} LIMIT ?
+            """, params + (chunk_size,)).fetchall()
+        if not rows:
+            return (0, None, set())
+        width = len(self._tracking_key)
+        last_key = tuple(rows[-1][:width])
+        matches = f"{where} AND ({columns}) <= ({', '.join('?' * width)})"
+        values = params + last_key
+        if self.has_changelog:
+            self.connection.execute(f"""
+                INSERT INTO change_log (operation, habit_id, habit_name, completion_date)
+                SELECT ?, t.habit_id, h.habit_name, t.completion_date FROM tracking t
+                JOIN habits h ON h.habit_id = t.habit_id
+                WHERE {matches} ORDER BY {columns}
+                """, (COMPLETION_DELETED, *values))
+        deleted = self.connection.execute(f"DELETE FROM tracking AS t WHERE {matches}", values).rowcount
+        self.connection.commit()
+        names = {row[width] for row in rows}
+        for habit_name in names:
+            self._record_write(habit_name)
+        return (deleted, last_key[0] if width == 1 else last_key, names)
+
+    @retry_on_busy
+    def _purge_archived_days(self, habit_id, habit_name, cutoff):
+        """Remove archived days before cutoff ordinal of one habit in one transaction, return count."""
+        ordinals = self._load_archived_days(habit_id)
+        kept = [ordinal for ordinal in ordinals if ordinal >= cutoff]
+        if len(kept) == len(ordinals):
+            return 0
+        if kept:
+            self.connection.execute("""
+                UPDATE tracking_archive
+                SET completion_count = ?, first_day = ?, last_day = ?, day_blob = ?
+                WHERE habit_id = ?
+                """, (len(kept), kept[0], kept[-1], encode_days(kept), habit_id))
+        else:
+            self.connection.execute("DELETE FROM tracking_archive WHERE habit_id = ?", (habit_id,))
+        for ordinal in ordinals[:len(ordinals) - len(kept)]:
+            self._log_change(COMPLETION_DELETED, habit_id, habit_name, date.fromordinal(ordinal).isoformat())
+        self.connection.commit()
+        self._record_write(habit_name)
+        return len(ordinals) - len(kept)
+
+    @track_storage("purge_tracking_data")
+    def purge_tracking_data(self, older_than_days, chunk_size=1000, today=None, start_after=None, progress=None):
+        """
+        Delete completions older than a retention period in chunks.
+
+        Every chunk of at most chunk_size rows is its own transaction, so
+        other writers get the lock between chunks. Purging is idempotent:
+        after an interruption, run it again, or pass the last reported
+        last_key as start_after to skip rows that were already checked.
+        Archived completions are purged too, one habit per transaction.
+
+        Args:
+            older_than_days (int): Delete completions dated more than this many days before today
+            chunk_size (int): Rows deleted per transaction
+            today (date, optional): Reference date, default today
+            start_after (int or tuple, optional): Only check tracking rows after this key,
+                a tracking_id, or (habit_id, completion_date) in the clustered layout
+            progress (callable, optional): Called as progress(deleted, last_key) after each chunk
+
+        Returns:
+            dict: {"deleted": int, "chunks": int, "last_key": int, tuple or None}
+
+        Raises:
+            ValueError: If older_than_days is negative or chunk_size is not positive
+        """
+        if older_than_days < 0 or chunk_size < 1:
+            raise ValueError("Invalid retention settings")
+        cutoff = (today or datetime.now().date()) - timedelta(days=older_than_days)
+        columns = ", ".join(f"t.{column}" for column in self._tracking_key)
+        after = f"({columns}) > ({', '.join('?' * len(self._tracking_key))}) AND "
+        deleted, chunks, last_key = 0, 0, start_after
+        while True:
+            key = () if last_key is None else (last_key,) if len(self._tracking_key) == 1 else tuple(last_key)
+            count, chunk_last_key, _ = self._delete_tracking_chunk(
+                (after if key else "") + "t.completion_date < ?", key + (cutoff.isoformat(),), chunk_size)
+            if not count:
+                break
+            deleted, chunks, last_key = deleted + count, chunks + 1, chunk_last_key
+            if progress:
+                progress(deleted, last_key)
+
+        if self.has_archive:
+            archived = self.connection.execute("""
+                SELECT a.habit_id, h.habit_name FROM tracking_archive a
+                JOIN habits h ON h.habit_id = a.habit_id
+                WHERE a.first_day < ?
+                """, (cutoff.toordinal(),)).fetchall()
+            for habit_id, habit_name in archived:
+                count = self._purge_archived_days(habit_id, habit_name, cutoff.toordinal())
+                if count:
+                    deleted, chunks = deleted + count, chunks + 1
+                    if progress:
+                        progress(deleted, last_key)
+        return {"deleted": deleted, "chunks": chunks, "last_key": last_key}
+
+    @track_storage("delete_habit_chunked")
+    def delete_habit_chunked(self, habit, chunk_size=1000, progress=None):
+        """
+        Delete a habit with a huge history without holding the lock for the whole cascade.
+
+        Completions are deleted in chunks of chunk_size rows, each in its own
+        transaction, before the habit row itself. If interrupted, calling it
+        again continues with the remaining completions.
+
+        Args:
+            habit (str): Name of the habit to delete
+            chunk_size (int): Completions deleted per transaction
+            progress (callable, optional): Called as progress(deleted, last_key) after each chunk
+
+        Returns:
+            tuple: (success: bool, message: str), as delete_habit()
+
+        Raises:
+            ValueError: If chunk_size is not positive
+        """
+        if chunk_size < 1:
+            raise ValueError("Invalid chunk size")
+        row = self.connection.execute("SELECT habit_id FROM habits WHERE habit_name = ?", (habit,)).fetchone()
+        if not row:
+            return (False, NO_SUCH_HABIT)
+        deleted = 0
+        while True:
+            count, last_key, _ = self._delete_tracking_chunk("t.habit_id = ?", (row[0],), chunk_size)
+            if not count:
+                break
+            deleted += count
+            if progress:
+                progress(deleted, last_key)
+        return self.delete_habit(habit)
+    # endregion Retention
+
+    # region Archive tier
+    def _load_archived_days(self, habit_id):
+        """Return archived day ordinals of a habit, empty list if none."""
+        row = self.connection.execute("""
+            SELECT day_blob FROM tracking_archive WHERE habit_id = ?
+            """, (habit_id,)).fetchone()
+        return decode_days(row[0]) if row else []
+
+    def _delete_archived_day(self, habit_id, completion_date):
+        """
+        Remove one archived completion inside the caller's transaction.
+
+        Returns:
+            int: 1 if a completion was removed, 0 otherwise
+        """
+        try:
+            ordinal = datetime.strptime(completion_date, "%Y-%m-%d").date().toordinal()
+        except ValueError:
+            return 0
+        ordinals = self._load_archived_days(habit_id)
+        if ordinal not in ordinals:
+            return 0
+        ordinals.remove(ordinal)
+        if ordinals:
+            self.connection.execute("""
+                UPDATE tracking_archive
+                SET completion_count = ?, first_day = ?, last_day = ?, day_blob = ?
+                WHERE habit_id = ?
+                """, (len(ordinals), ordinals[0], ordinals[-1], encode_days(ordinals), habit_id))
+        else:
+            self.connection.execute("DELETE FROM tracking_archive WHERE habit_id = ?", (habit_id,))
+        return 1
+
+    @track_storage("load_archive_summary")
+    def load_archive_summary(self, habit_name):
+        """
+        Load pre-aggregated summary of a habit's archived completions.
+
+        Lets analytics skip decoding the archive when the archived range
+        doesn't overlap the dates they need.
+
+        Args:
+            habit_name (str): Name of the habit
+
+        Returns:
+            dict or None: {"completion_count": int, "first_day": date, "last_day": date},
+            None if the habit has no archived completions or doesn't exist
+        """
+        if not self.has_archive:
+            return None
+        row = self.connection.execute("""
+            SELECT a.completion_count, a.first_day, a.last_day
+            FROM tracking_archive a JOIN habits h ON h.habit_id = a.habit_id
+            WHERE h.habit_name = ?
+            """, (habit_name,)).fetchone()
+        if row is None:
+            return None
+        return {
+            "completion_count": row[0],
+            "first_day": date.fromordinal(row[1]),
+            "last_day": date.fromordinal(row[2])
+        }
+    # endregion Archive tier
+
 # enrregion SQLiteStorage class
\ No newline at end of file
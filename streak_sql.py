@@ -0,0 +1,255 @@
+"""
+Streak analytics computed inside SQLite.
+
+The Python analytics load every completion of a habit and walk the dates.
+Here the same rules run as one query over all habits with window
+functions: LAG gives each completion's gap to the previous one, running
+sums over "gap breaks the streak" flags number the runs (gaps and
+islands), and GROUP BY reduces them to one row per habit. Only these
+aggregates cross the sqlite3 boundary, a few values per habit instead of
+every completion.
+
+Results match StreakRunIndex; completions moved to the archive tier are
+not included.
+
+Usage:
+    python streak_sql.py --db habits.db
+    python streak_sql.py --db habits.db --date 2025-09-30 --periodicity daily
+"""
+
+# region imports
+import sqlite3
+import argparse
+from datetime import datetime, timedelta
+
+from storage import SQLiteStorage
+from periodicity import gap_sql, times_per_week_sql, check_stored_periodicities
+
+# endregion imports
+
+
+# region Query
+def streak_ctes(habit_filter=""):
+    """
+    Build the common table expressions that compute per-habit streaks.
+
+    The last one, habit_streaks, has one row per selected habit with the
+    columns habit_id, habit_name, habit_periodicity, completions,
+    completion_rate, longest_streak, current_streak and last_completion.
+    Callers put them after WITH, optionally behind their own CTEs, and
+    bind the named parameters :as_of and :window_start (as_of - 30 days).
+
+    Longest streak: gaps within the periodicity's range extend a run,
+    larger gaps start a new one and smaller ones are ignored. Current
+    streak: the completions since the last gap outside the range, if the
+    last completion is recent enough. "N times per week" habits count
+    consecutive ISO weeks with at least N completions instead (week_runs),
+    like StreakRunIndex. Callers run check_stored_periodicities() first,
+    gap_sql() has no limits for unsupported periodicities.
+
+    Args:
+        habit_filter (str): WHERE clause on habits aliased h, e.g. "WHERE h.habit_periodicity = :periodicity"
+
+    Returns:
+        str: CTE definitions without the leading WITH
+    """
+    min_gap, max_gap, max_gap_to_today, per_30_days = gap_sql("h.habit_periodicity")
+    # ISO week number as in periodicity.week_of(), julianday 1721425.5 is ordinal 1
+    week = "CAST((julianday(t.completion_date) - 1721425.5) / 7 AS INTEGER)"
+    return f"""
+        rules AS (
+            SELECT h.habit_id, h.habit_name, h.habit_periodicity,
+                   {min_gap} AS min_gap, {max_gap} AS max_gap,
+                   {max_gap_to_today} AS max_gap_to_today, {per_30_days} AS per_30_days,
+                   {times_per_week_sql("h.habit_periodicity")} AS per_week
+            FROM habits h {habit_filter}
+        ),
+        quota_weeks AS (
+            SELECT t.habit_id, {week} AS week
+            FROM tracking t JOIN rules r ON r.habit_id = t.habit_id
+            WHERE r.per_week > 0 AND t.completion_date <= :as_of
+            GROUP BY t.habit_id, week HAVING COUNT(*) >= MAX(r.per_week)
+        ),
+        week_runs AS (
+            SELECT habit_id, COUNT(*) AS length, MAX(week) AS last_week FROM (
+                SELECT habit_id, week, week - row_number() OVER (PARTITION BY habit_id ORDER BY week) AS island
+                FROM quota_weeks)
+            GROUP BY habit_id, island
+        ),
+        week_streaks AS (
+            SELECT habit_id, MAX(length) AS longest,
+                   MAX(CASE WHEN last_week >= CAST((julianday(:as_of) - 1721425.5) / 7 AS INTEGER) - 1
+                            THEN length END) AS current
+            FROM week_runs GROUP BY habit_id
+        ),
+        gaps AS (
+            SELECT t.habit_id, t.completion_date,
+                   julianday(t.completion_date) - julianday(lag(t.completion_date) OVER (
+                       PARTITION BY t.habit_id ORDER BY t.completion_date)) AS gap
+            FROM tracking t
+            WHERE t.habit_id IN (SELECT habit_id FROM rules) AND t.completion_date <= :as_of
+        ),
+        runs AS (
+            SELECT g.habit_id, g.completion_date,
+                   g.gap BETWEEN r.min_gap AND r.max_gap AS continues,
+                   coalesce(NOT g.gap BETWEEN r.min_gap AND r.max_gap, 1) AS run_start,
+                   total(g.gap > r.max_gap) OVER ordered AS longest_run,
+                   row_number() OVER ordered AS position
+            FROM gaps g JOIN rules r ON r.habit_id = g.habit_id
+            WINDOW ordered AS (PARTITION BY g.habit_id ORDER BY g.completion_date ROWS UNBOUNDED PRECEDING)
+        ),
+        longest_runs AS (
+            SELECT habit_id, MAX(length) AS longest FROM (
+                SELECT habit_id, 1 + total(continues) AS length FROM runs GROUP BY habit_id, longest_run)
+            GROUP BY habit_id
+        ),
+        summary AS (
+            SELECT habit_id, COUNT(*) AS completions, total(completion_date >= :window_start) AS recent,
+                   MAX(completion_date) AS last_completion,
+                   COUNT(*) - MAX(CASE WHEN run_start THEN position END) + 1 AS last_run
+            FROM runs GROUP BY habit_id
+        ),
+        habit_streaks AS (
+            SELECT r.habit_id, r.habit_name, r.habit_periodicity,
+                   coalesce(s.completions, 0) AS completions,
+                   coalesce(s.recent, 0) * 100.0 / r.per_30_days AS completion_rate,
+                   CASE WHEN r.per_week > 0 THEN coalesce(w.longest, 0)
+                        ELSE CAST(coalesce(l.longest, 0) AS INTEGER) END AS longest_streak,
+                   CASE WHEN r.per_week > 0 THEN coalesce(w.current, 0)
+                        WHEN julianday(:as_of) - julianday(s.last_completion) <= r.max_gap_to_today
+                        THEN s.last_run ELSE 0 END AS current_streak,
+                   s.last_completion
+            FROM rules r
+            LEFT JOIN summary s ON s.habit_id = r.habit_id
+            LEFT JOIN longest_runs l ON l.habit_id = r.habit_id
+            LEFT JOIN week_streaks w ON w.habit_id = r.habit_id
+        )
+    """
+
+
+def streak_params(as_of=None):
+    """Return the named parameters streak_ctes() needs for a reference date, default today."""
+    as_of = as_of or datetime.now().date()
+    return {"as_of": as_of.isoformat(), "window_start": (as_of - timedelta(days=30)).isoformat()}
+# endregion Query
+
+
+# region Analytics
+def habit_streaks(storage, as_of=None, periodicity=None):
+    """
+    Compute streak aggregates of all habits in one query.
+
+    Args:
+        storage (SQLiteStorage): Database storage object
+        as_of (date, optional): Reference date, completions after it are ignored, default today
+        periodicity (str, optional): Only habits with this periodicity
+
+    Returns:
+        list: One dict per habit, sorted by name, with keys habit, periodicity,
+        completions, completion_rate (percent), longest_streak, current_streak
+        and last_completion (ISO date or None)
+
+    Raises:
+        ValueError: If a habit has an unsupported periodicity
+    """
+    check_stored_periodicities(storage.connection)
+    params = streak_params(as_of)
+    habit_filter = ""
+    if periodicity is not None:
+        habit_filter = "WHERE h.habit_periodicity = :periodicity"
+        params["periodicity"] = periodicity
+    res = storage.connection.execute(f"""
+        WITH {streak_ctes(habit_filter)}
+        SELECT habit_name, habit_periodicity, completions, completion_rate,
+               longest_streak, current_streak, last_completion
+        FROM habit_streaks ORDER BY habit_name
+        """, params)
+    return [{
+        "habit": row[0],
+        "periodicity": row[1],
+        "completions": row[2],
+        "completion_rate": row[3],
+        "longest_streak": row[4],
+        "current_streak": row[5],
+        "last_completion": row[6]
+    } for row in res]
+
+
+def sql_streak_leaderboard(storage, k=10, metric="longest", periodicity=None, as_of=None):
+    """
+    Return the top k habits by longest or current streak, ranked in SQL.
+
+    Counterpart of analytics.streak_leaderboard() that transfers only the k
+    result rows. Ties are ordered by habit name.
+
+    Args:
+        storage (SQLiteStorage): Database storage object
+        k (int): Number of habits to return
+        metric (str): "longest" or "current"
+        periodicity (str, optional): Only habits with this periodicity
+        as_of (date, optional): Reference date, default today
+
+    Returns:
+        list: [(habit_name, streak_count), ...] best first. Habits without tracking data are skipped.
+
+    Raises:
+        ValueError: If metric is not "longest" or "current", or a habit has an unsupported periodicity
+    """
+    if metric not in ("longest", "current"):
+        raise ValueError("Invalid metric")
+    check_stored_periodicities(storage.connection)
+    params = streak_params(as_of)
+    params["k"] = k
+    habit_filter = ""
+    if periodicity is not None:
+        habit_filter = "WHERE h.habit_periodicity = :periodicity"
+        params["periodicity"] = periodicity
+    res = storage.connection.execute(f"""
+        WITH {streak_ctes(habit_filter)}
+        SELECT habit_name, {metric}_streak FROM habit_streaks
+        WHERE completions > 0 ORDER BY {metric}_streak DESC, habit_name LIMIT :k
+        """, params)
+    return [tuple(row) for row in res]
+
+
+def streak_report(storage, as_of=None, periodicity=None):
+    """
+    Format streaks of all habits as text, one line per habit.
+
+    Args:
+        storage (SQLiteStorage): Database storage object
+        as_of (date, optional): Reference date, default today
+        periodicity (str, optional): Only habits with this periodicity
+
+    Returns:
+        str: Report, or a message that no habits were found
+    """
+    streaks = habit_streaks(storage, as_of, periodicity)
+    if not streaks:
+        return "No habits found"
+    return "\n".join(
+        f'{row["habit"]} ({row["periodicity"]}): longest streak {row["longest_streak"]}, '
+        f'current streak {row["current_streak"]}, completion rate {row["completion_rate"]:.3g}%'
+        for row in streaks)
+# endregion Analytics
+
+
+def main(argv=None):
+    """Print the streak report of a database file from the command line."""
+    parser = argparse.ArgumentParser(description="Streaks of all habits computed in SQLite")
+    parser.add_argument("--db", default="habits.db", help="SQLite database file")
+    parser.add_argument("--date", type=lambda text: datetime.strptime(text, "%Y-%m-%d").date(), default=None,
+                        help="Reference date, default today")
+    parser.add_argument("--periodicity", default=None, help="Only habits with this periodicity")
+    args = parser.parse_args(argv)
+
+    conn = sqlite3.connect(args.db)
+    try:
+        print(streak_report(SQLiteStorage(conn), args.date, args.periodicity))
+    finally:
+        conn.close()
+    return 0
+
+
+if __name__ == "__main__":
+    main()
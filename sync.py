@@ -0,0 +1,307 @@
+"""
+Incremental sync between two habit databases.
+
+Each database gets a random id and remembers, per peer, the highest
+change_log sequence number it has pulled from that peer. A sync sends only
+habits and completions changed after that watermark, matched by habit
+name, as one zlib-compressed JSON change set per direction, and applies it
+in one transaction.
+
+Completions merge as a set union: a completion is added when the target
+doesn't have it, nothing is overwritten and deletions are not propagated.
+For habits that exist on both sides the target's periodicity and
+description win, differences are reported as conflicts. Archived
+completions are not synced.
+
+Usage:
+    python sync.py laptop.db server.db
+"""
+
+# region imports
+import json
+import zlib
+import uuid
+import sqlite3
+import argparse
+
+from metrics import COMPLETIONS_WRITTEN, HABITS_CREATED
+from storage import SQLiteStorage, ensure_changelog_schema, HABIT_CREATED, COMPLETION_ADDED
+
+# endregion imports
+
+
+# region Schema
+def ensure_sync_schema(connection):
+    """
+    Create the sync_identity and sync_state tables if they don't exist.
+
+    sync_identity holds the database's random id, sync_state the sequence
+    number pulled from every peer. A copied database file keeps the id of
+    the original; sync_databases() refuses to sync two databases with the
+    same id.
+
+    Args:
+        connection (sqlite3.Connection): Database connection
+    """
+    ensure_changelog_schema(connection)
+    connection.execute("CREATE TABLE IF NOT EXISTS sync_identity(database_id VARCHAR NOT NULL)")
+    connection.execute("""
+        CREATE TABLE IF NOT EXISTS sync_state(
+            peer_id VARCHAR PRIMARY KEY,
+            last_seq INTEGER NOT NULL,
+            synced_at DATETIME DEFAULT CURRENT_TIMESTAMP)
+    """)
+    connection.execute("""
+        INSERT INTO sync_identity (database_id)
+        SELECT ? WHERE NOT EXISTS (SELECT 1 FROM sync_identity)
+        """, (uuid.uuid4().hex,))
+    connection.commit()
+
+
+def database_id(connection):
+    """Return the sync id of a database."""
+    return connection.execute("SELECT database_id FROM sync_identity").fetchone()[0]
+
+
+def watermark(connection, peer_id):
+    """Return the last sequence number pulled from a peer, 0 if never synced."""
+    row = connection.execute("SELECT last_seq FROM sync_state WHERE peer_id = ?", (peer_id,)).fetchone()
+    return row[0] if row else 0
+
+
+def set_watermark(connection, peer_id, seq):
+    """Store the sequence number pulled from a peer, inside the caller's transaction."""
+    connection.execute("""
+        INSERT INTO sync_state (peer_id, last_seq) VALUES (?, ?)
+        ON CONFLICT(peer_id) DO UPDATE SET last_seq = excluded.last_seq, synced_at = CURRENT_TIMESTAMP
+        """, (peer_id, seq))
+# endregion Schema
+
+
+# region Change sets
+def export_changes(storage, since_seq=0, skip=(0, 0)):
+    """
+    Encode habits and completions changed after a sequence number.
+
+    With since_seq 0 the whole database is exported, so completions saved
+    before the change log existed are included in the first sync. Otherwise
+    the change log is read from since_seq on; habits and completions that
+    were deleted again are left out.
+
+    Args:
+        storage (SQLiteStorage): Database storage object with sync schema
+        since_seq (int): Sequence number the peer has already pulled
+        skip (tuple): (after_seq, last_seq) range of changes the peer already has,
+            e.g. those logged when they were pulled from it
+
+    Returns:
+        bytes: Compressed change set for apply_changes()
+    """
+    connection = storage.connection
+    # Read first: rows committed while exporting are at worst sent twice
+    high = storage.last_change_seq()
+    if since_seq == 0:
+        habits = connection.execute("""
+            SELECT habit_name, habit_periodicity, habit_description FROM habits ORDER BY habit_id
+            """).fetchall()
+        completions = connection.execute("""
+            SELECT h.habit_name, t.completion_date FROM tracking t
+            JOIN habits h ON h.habit_id = t.habit_id
+            ORDER BY t.habit_id, t.completion_date
+            """).fetchall()
+    else:
+        changes = (since_seq, high, skip[0], skip[1], HABIT_CREATED, COMPLETION_ADDED)
+        habits = connection.execute("""
+            SELECT habit_name, habit_periodicity, habit_description FROM habits
+            WHERE habit_id IN (SELECT habit_id FROM change_log
+                               WHERE seq > ? AND seq <= ? AND NOT (seq > ? AND seq <= ?)
+                               AND operation IN (?, ?))
+            ORDER BY habit_id
+            """, changes).fetchall()
+        completions = connection.execute("""
+            SELECT DISTINCT h.habit_name, t.completion_date FROM change_log c
+            JOIN tracking t ON t.habit_id = c.habit_id AND t.completion_date = c.completion_date
+            JOIN habits h ON h.habit_id = c.habit_id
+            WHERE c.seq > ? AND c.seq <= ? AND NOT (c.seq > ? AND c.seq <= ?) AND c.operation = ?
+            ORDER BY t.habit_id, t.completion_date
+            """, changes[:4] + (COMPLETION_ADDED,)).fetchall()
+    payload = {
+        "source": database_id(connection),
+        "seq": high,
+        "habits": [list(row) for row in habits],
+        "completions": [list(row) for row in completions]
+    }
+    return zlib.compress(json.dumps(payload, separators=(",", ":")).encode("utf-8"))
+
+
+def apply_changes(storage, data):
+    """
+    Merge a change set into a database in one transaction.
+
+    Missing habits are created by name. Incoming completions go to a
+    temporary table and are inserted with one INSERT ... SELECT that skips
+    those the database already has, so applying a change set twice adds
+    nothing. The watermark for the source is stored in the same transaction.
+
+    Args:
+        storage (SQLiteStorage): Database storage object with sync schema
+        data (bytes): Change set from export_changes()
+
+    Returns:
+        dict: {"bytes": int, "rows": int, "habits_created": int, "completions_added": int,
+               "conflicts": list, "seq_before": int, "seq_after": int}.
+        rows counts habits and completions transferred, conflicts lists habits whose
+        periodicity or description differ, seq_before and seq_after are the
+        database's change log positions around the merge.
+
+    Raises:
+        sqlite3.Error: If the transaction fails, nothing is applied
+    """
+    payload = json.loads(zlib.decompress(data).decode("utf-8"))
+    connection = storage.connection
+    habit_ids = {}
+    conflicts = []
+    habits_created = 0
+    try:
+        connection.execute("BEGIN IMMEDIATE")
+        seq_before = storage.last_change_seq()
+        for name, periodicity, description in payload["habits"]:
+            row = connection.execute("""
+                SELECT habit_id, habit_periodicity, habit_description FROM habits WHERE habit_name = ?
+                """, (name,)).fetchone()
+            if row is None:
+                cursor = connection.execute("""
+                    INSERT INTO habits (habit_name, habit_periodicity, habit_description) VALUES (?, ?, ?)
+                    """, (name, periodicity, description))
+                habit_ids[name] = cursor.lastrowid
+                storage._log_change(HABIT_CREATED, cursor.lastrowid, name)
+                habits_created += 1
+            else:
+                habit_ids[name] = row[0]
+                if (row[1], row[2]) != (periodicity, description):
+                    conflicts.append(name)
+
+        connection.execute("""
+            CREATE TEMP TABLE IF NOT EXISTS sync_incoming(
+                habit_id INTEGER, habit_name VARCHAR, completion_date DATE)
+        """)
+        connection.executemany("INSERT INTO sync_incoming VALUES (?, ?, ?)",
+                               sorted((habit_ids[name], name, day) for name, day in payload["completions"]))
+        missing = """
+            FROM (SELECT DISTINCT habit_id, habit_name, completion_date FROM sync_incoming) i
+            WHERE NOT EXISTS (SELECT 1 FROM tracking t
+                              WHERE t.habit_id = i.habit_id AND t.completion_date = i.completion_date)
+            ORDER BY i.habit_id, i.completion_date
+        """
+        if storage.has_changelog:
+            connection.execute(f"""
+                INSERT INTO change_log (operation, habit_id, habit_name, completion_date)
+                SELECT ?, habit_id, habit_name, completion_date {missing}
+                """, (COMPLETION_ADDED,))
+        completions_added = connection.execute(
+            f"INSERT INTO tracking (habit_id, completion_date) SELECT habit_id, completion_date {missing}").rowcount
+        connection.execute("DROP TABLE temp.sync_incoming")
+        set_watermark(connection, payload["source"], payload["seq"])
+        seq_after = storage.last_change_seq()
+        connection.commit()
+    except Exception as e:
+        connection.rollback()
+        raise e
+
+    if habits_created or completions_added:
+        for name in habit_ids:
+            storage._record_write(name)
+    HABITS_CREATED.inc(habits_created)
+    COMPLETIONS_WRITTEN.inc(completions_added)
+    return {
+        "bytes": len(data),
+        "rows": len(payload["habits"]) + len(payload["completions"]),
+        "habits_created": habits_created,
+        "completions_added": completions_added,
+        "conflicts": conflicts,
+        "seq_before": seq_before,
+        "seq_after": seq_after
+    }
+# endregion Change sets
+
+
+# region Sync
+def pull(target, source, skip=(0, 0)):
+    """
+    Apply the changes of source that target hasn't pulled yet.
+
+    Args:
+        target (SQLiteStorage): Database that receives the changes
+        source (SQLiteStorage): Database the changes come from
+        skip (tuple): Range of source changes to leave out, see export_changes()
+
+    Returns:
+        dict: Report of apply_changes()
+    """
+    since_seq = watermark(target.connection, database_id(source.connection))
+    return apply_changes(target, export_changes(source, since_seq, skip))
+
+
+def sync_databases(local, remote):
+    """
+    Sync two databases in both directions.
+
+    Pulls remote into local, then local into remote. Completions a pull
+    adds are logged in the receiving database and would be sent back in
+    the other direction: the push skips the changes logged by the pull,
+    and when nothing else was written to remote in between, local's
+    watermark is moved past the changes logged by the push.
+
+    Args:
+        local (SQLiteStorage): First database
+        remote (SQLiteStorage): Second database
+
+    Returns:
+        dict: {"pulled": report, "pushed": report} with reports of apply_changes(),
+        pulled for remote -> local and pushed for local -> remote
+
+    Raises:
+        ValueError: If both databases have the same sync id, e.g. one is a file copy of the other
+    """
+    for storage in (local, remote):
+        ensure_sync_schema(storage.connection)
+        storage.has_changelog = True
+    local_id, remote_id = database_id(local.connection), database_id(remote.connection)
+    if local_id == remote_id:
+        raise ValueError("Both databases have the same sync id")
+
+    pulled = pull(local, remote)
+    pushed = pull(remote, local, skip=(pulled["seq_before"], pulled["seq_after"]))
+    if pushed["seq_before"] == watermark(local.connection, remote_id):
+        set_watermark(local.connection, remote_id, pushed["seq_after"])
+        local.connection.commit()
+    return {"pulled": pulled, "pushed": pushed}
+# endregion Sync
+
+
+def main(argv=None):
+    """Sync two database files from the command line."""
+    parser = argparse.ArgumentParser(description="Sync habits and completions between two databases")
+    parser.add_argument("local", help="SQLite database file")
+    parser.add_argument("remote", help="SQLite database file to sync with")
+    args = parser.parse_args(argv)
+
+    connections = [sqlite3.connect(path) for path in (args.local, args.remote)]
+    try:
+        for conn in connections:
+            conn.execute("PRAGMA foreign_keys = ON")
+            ensure_sync_schema(conn)
+        report = sync_databases(*map(SQLiteStorage, connections))
+    finally:
+        for conn in connections:
+            conn.close()
+    for direction, result in report.items():
+        print(f'{direction}: {result["rows"]} rows in {result["bytes"]} bytes, '
+              f'{result["habits_created"]} habits and {result["completions_added"]} completions added')
+        if result["conflicts"]:
+            print(f'  kept local settings of {", ".join(result["conflicts"])}')
+    return 0
+
+
+if __name__ == "__main__":
+    main()
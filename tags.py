@@ -0,0 +1,314 @@
+"""
+Habit tags and per-tag statistics.
+
+Tags group habits by team, category or anything else; a habit can have
+any number of tags. They are stored in the tags table and the habit_tags
+junction table, indexed in both directions.
+
+tag_statistics() aggregates total completions, average completion rate
+and the best streak of every tag in a single query: per-habit streaks come
+from the window-function CTEs in streak_sql.py and are rolled up with
+GROUP BY, so the work happens in SQLite instead of a Python loop over habits.
+
+Usage:
+    python tags.py --db habits.db tag running team:ops
+    python tags.py --db habits.db stats --date 2025-09-30
+"""
+
+# region imports
+import sqlite3
+import argparse
+from datetime import datetime
+
+from storage import SQLiteStorage, INVALID_HABIT_NAME, HABIT_NOT_FOUND
+from streak_sql import streak_ctes, streak_params
+from periodicity import check_stored_periodicities
+
+# endregion imports
+
+INVALID_TAG_NAME = "Invalid tag name"
+MAX_TAG_LENGTH = 40
+
+
+# region Schema
+def ensure_tags_schema(connection):
+    """
+    Create the tags and habit_tags tables if they don't exist.
+
+    Tag names are unique regardless of case. The junction table's primary
+    key serves lookups by tag, the extra index lookups by habit; rows go
+    away with their habit or tag.
+
+    Args:
+        connection (sqlite3.Connection): Database connection
+    """
+    connection.execute("""
+        CREATE TABLE IF NOT EXISTS tags(
+            tag_id INTEGER PRIMARY KEY,
+            tag_name VARCHAR NOT NULL UNIQUE COLLATE NOCASE)
+    """)
+    connection.execute("""
+        CREATE TABLE IF NOT EXISTS habit_tags(
+            tag_id INTEGER NOT NULL,
+            habit_id INTEGER NOT NULL,
+            PRIMARY KEY (tag_id, habit_id),
+
+            FOREIGN KEY (tag_id) REFERENCES tags(tag_id) ON DELETE CASCADE,
+            FOREIGN KEY (habit_id) REFERENCES habits(habit_id) ON DELETE CASCADE) WITHOUT ROWID
+    """)
+    connection.execute("CREATE INDEX IF NOT EXISTS idx_habit_tags_habit ON habit_tags(habit_id, tag_id)")
+    connection.commit()
+# endregion Schema
+
+
+# region Tag operations
+def _habit_id(storage, habit):
+    """Return the id of a habit, None if it doesn't exist."""
+    row = storage.connection.execute("SELECT habit_id FROM habits WHERE habit_name = ?", (habit,)).fetchone()
+    return row[0] if row else None
+
+
+def _check_names(habit, tag):
+    """Return an error message for invalid habit or tag names, None if both are valid."""
+    if not habit or not habit.strip():
+        return INVALID_HABIT_NAME
+    if not tag or not tag.strip() or len(tag.strip()) > MAX_TAG_LENGTH:
+        return INVALID_TAG_NAME
+    return None
+
+
+def tag_habit(storage, habit, tag):
+    """
+    Add a tag to a habit, creating the tag if needed.
+
+    Args:
+        storage (SQLiteStorage): Database storage object
+        habit (str): Name of the habit
+        tag (str): Tag name, surrounding whitespace is removed
+
+    Returns:
+        tuple: (success: bool, message: str)
+    """
+    error = _check_names(habit, tag)
+    if error:
+        return (False, error)
+    habit_id = _habit_id(storage, habit)
+    if habit_id is None:
+        return (False, HABIT_NOT_FOUND)
+
+    connection = storage.connection
+    connection.execute("INSERT OR IGNORE INTO tags (tag_name) VALUES (?)", (tag.strip(),))
+    added = connection.execute("""
+        INSERT OR IGNORE INTO habit_tags (tag_id, habit_id)
+        SELECT tag_id, ? FROM tags WHERE tag_name = ?
+        """, (habit_id, tag.strip())).rowcount
+    connection.commit()
+    if not added:
+        return (False, "Habit already has this tag")
+    return (True, "Tag successfully added")
+
+
+def untag_habit(storage, habit, tag):
+    """
+    Remove a tag from a habit.
+
+    Args:
+        storage (SQLiteStorage): Database storage object
+        habit (str): Name of the habit
+        tag (str): Tag name
+
+    Returns:
+        tuple: (success: bool, message: str)
+    """
+    error = _check_names(habit, tag)
+    if error:
+        return (False, error)
+    habit_id = _habit_id(storage, habit)
+    if habit_id is None:
+        return (False, HABIT_NOT_FOUND)
+
+    connection = storage.connection
+    removed = connection.execute("""
+        DELETE FROM habit_tags
+        WHERE habit_id = ? AND tag_id = (SELECT tag_id FROM tags WHERE tag_name = ?)
+        """, (habit_id, tag.strip())).rowcount
+    connection.commit()
+    if not removed:
+        return (False, "Habit doesn't have this tag")
+    return (True, "Tag successfully removed")
+
+
+def load_habit_tags(storage, habit):
+    """
+    Return the tags of a habit.
+
+    Args:
+        storage (SQLiteStorage): Database storage object
+        habit (str): Name of the habit
+
+    Returns:
+        list or str: Sorted tag names, or "Habit name was not found"
+    """
+    habit_id = _habit_id(storage, habit)
+    if habit_id is None:
+        return HABIT_NOT_FOUND
+    res = storage.connection.execute("""
+        SELECT g.tag_name FROM habit_tags ht JOIN tags g ON g.tag_id = ht.tag_id
+        WHERE ht.habit_id = ? ORDER BY g.tag_name
+        """, (habit_id,))
+    return [row[0] for row in res]
+
+
+def load_habits_by_tag(storage, tag):
+    """
+    Return the habits with a tag.
+
+    Args:
+        storage (SQLiteStorage): Database storage object
+        tag (str): Tag name, case-insensitive
+
+    Returns:
+        list: Sorted habit names, empty for an unknown tag
+    """
+    res = storage.connection.execute("""
+        SELECT h.habit_name FROM tags g
+        JOIN habit_tags ht ON ht.tag_id = g.tag_id
+        JOIN habits h ON h.habit_id = ht.habit_id
+        WHERE g.tag_name = ? ORDER BY h.habit_name
+        """, (tag.strip(),))
+    return [row[0] for row in res]
+
+
+def load_all_tags(storage):
+    """
+    Return all tags in use with their number of habits.
+
+    Args:
+        storage (SQLiteStorage): Database storage object
+
+    Returns:
+        list: [(tag_name: str, habits: int)] sorted by tag name
+    """
+    res = storage.connection.execute("""
+        SELECT g.tag_name, COUNT(*) FROM tags g
+        JOIN habit_tags ht ON ht.tag_id = g.tag_id
+        GROUP BY g.tag_id ORDER BY g.tag_name
+        """)
+    return [tuple(row) for row in res]
+# endregion Tag operations
+
+
+# region Statistics
+def tag_statistics(storage, tags=None, as_of=None):
+    """
+    Aggregate analytics of the habits of every tag.
+
+    Per habit the query computes, from completions on or before as_of, the
+    same values as StreakRunIndex (see streak_sql.streak_ctes()): total
+    completions, completion rate in the 30-day window and longest streak.
+    These are rolled up per tag; a habit with several tags counts in each
+    of them. Completions moved to the archive tier are not included.
+
+    Args:
+        storage (SQLiteStorage): Database storage object
+        tags (list, optional): Tag names to report, default all tags
+        as_of (date, optional): Reference date, default today
+
+    Returns:
+        list: One dict per tag, sorted by tag name, with keys
+        tag, habits, total_completions, average_completion_rate (percent),
+        best_streak and best_habit (None if no habit has a streak)
+
+    Raises:
+        ValueError: If a habit has an unsupported periodicity
+    """
+    check_stored_periodicities(storage.connection)
+    params = streak_params(as_of)
+    selected = ""
+    if tags is not None:
+        if not tags:
+            return []
+        selected = f"WHERE g.tag_name IN ({', '.join(f':tag{i}' for i in range(len(tags)))})"
+        params.update((f"tag{i}", tag.strip()) for i, tag in enumerate(tags))
+
+    res = storage.connection.execute(f"""
+        WITH scope AS (
+            SELECT g.tag_id, g.tag_name, ht.habit_id FROM tags g
+            JOIN habit_tags ht ON ht.tag_id = g.tag_id
+            {selected}
+        ),
+        {streak_ctes("WHERE h.habit_id IN (SELECT habit_id FROM scope)")},
+        ranked AS (
+            SELECT sc.tag_id, sc.tag_name, v.habit_name, v.completions, v.completion_rate, v.longest_streak,
+                   row_number() OVER (PARTITION BY sc.tag_id ORDER BY v.longest_streak DESC, v.habit_name) AS position
+            FROM scope sc JOIN habit_streaks v ON v.habit_id = sc.habit_id
+        )
+        SELECT tag_name, COUNT(*), SUM(completions), AVG(completion_rate), MAX(longest_streak),
+               MAX(CASE WHEN position = 1 AND longest_streak > 0 THEN habit_name END)
+        FROM ranked GROUP BY tag_id ORDER BY tag_name
+        """, params)
+    return [{
+        "tag": row[0],
+        "habits": row[1],
+        "total_completions": row[2],
+        "average_completion_rate": row[3],
+        "best_streak": row[4],
+        "best_habit": row[5]
+    } for row in res]
+
+
+def tag_report(storage, tags=None, as_of=None):
+    """
+    Format tag statistics as text, one line per tag.
+
+    Args:
+        storage (SQLiteStorage): Database storage object
+        tags (list, optional): Tag names to report, default all tags
+        as_of (date, optional): Reference date, default today
+
+    Returns:
+        str: Report, or a message that no habits are tagged
+    """
+    statistics = tag_statistics(storage, tags, as_of)
+    if not statistics:
+        return "No tagged habits found"
+    return "\n".join(
+        f'{row["tag"]}: {row["habits"]} habits, {row["total_completions"]} completions, '
+        f'average completion rate {row["average_completion_rate"]:.3g}%, '
+        f'best streak {row["best_streak"]}' + (f' ({row["best_habit"]})' if row["best_habit"] else "")
+        for row in statistics)
+# endregion Statistics
+
+
+def main(argv=None):
+    """Tag habits and print tag statistics from the command line."""
+    parser = argparse.ArgumentParser(description="Tag habits and report statistics per tag")
+    parser.add_argument("--db", default="habits.db", help="SQLite database file")
+    commands = parser.add_subparsers(dest="command", required=True)
+    for command in ("tag", "untag"):
+        command_parser = commands.add_parser(command, help=f"{command.capitalize()} a habit")
+        command_parser.add_argument("habit")
+        command_parser.add_argument("tag")
+    stats = commands.add_parser("stats", help="Print statistics per tag")
+    stats.add_argument("--tag", action="append", default=None, help="Only this tag, repeatable")
+    stats.add_argument("--date", type=lambda text: datetime.strptime(text, "%Y-%m-%d").date(), default=None,
+                       help="Reference date, default today")
+    args = parser.parse_args(argv)
+
+    conn = sqlite3.connect(args.db)
+    conn.execute("PRAGMA foreign_keys = ON")
+    try:
+        ensure_tags_schema(conn)
+        storage = SQLiteStorage(conn)
+        if args.command == "stats":
+            print(tag_report(storage, args.tag, args.date))
+        else:
+            operation = tag_habit if args.command == "tag" else untag_habit
+            print(operation(storage, args.habit, args.tag)[1])
+    finally:
+        conn.close()
+    return 0
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,93 @@
+# region imports
+import pytest
+import sqlite3
+from datetime import date
+
+from freezegun import freeze_time
+
+from test_database import db_setup, valid_habit
+from test_analytics_setup import (
+    setup_analytics_data,
+    daily_habit,
+    weekly_habit,
+    tracking_test_data,
+    single_entry_habit,
+    no_consecutive_dates_habit,
+    no_tracking_data_habit
+)
+
+from storage import SQLiteStorage
+from analytics import longest_streak, current_streak, longest_streak_by_periodicity
+from analytics_cache import AnalyticsCache
+
+# endregion imports
+
+def test_cache_hit(setup_analytics_data):
+    cache = AnalyticsCache(setup_analytics_data)
+    first = cache.get(longest_streak, "10000 steps")
+    second = cache.get(longest_streak, "10000 steps")
+    assert first == second == 'The longest streak for Habit 10000 steps is 3 days'
+    assert cache.hits == 1
+    assert cache.misses == 1
+
+def test_cache_invalidated_by_write(setup_analytics_data):
+    storage = setup_analytics_data
+    cache = AnalyticsCache(storage)
+    cache.get(longest_streak, "10000 steps")
+    cache.get(longest_streak, "gym")
+
+    storage.save_tracking_data(("10000 steps", date(2025, 9, 24)))
+    assert cache.get(longest_streak, "10000 steps") == 'The longest streak for Habit 10000 steps is 7 days'
+    # Other habits stay cached
+    cache.get(longest_streak, "gym")
+    assert cache.hits == 1
+
+def test_cache_invalidated_by_day_rollover(setup_analytics_data):
+    cache = AnalyticsCache(setup_analytics_data)
+    with freeze_time("2025-09-28"):
+        assert cache.get(current_streak, "10000 steps") == "The current streak for Habit 10000 steps is 3 days"
+    with freeze_time("2025-09-29"):
+        assert cache.get(current_streak, "10000 steps") == "Error! The current streak for Habit 10000 steps is 0 days"
+    assert cache.misses == 2
+
+def test_cache_global_function(setup_analytics_data):
+    storage = setup_analytics_data
+    cache = AnalyticsCache(storage)
+    cache.get(longest_streak_by_periodicity)
+    cache.get(longest_streak_by_periodicity)
+    storage.save_tracking_data(("gym", date(2025, 9, 27)))
+    cache.get(longest_streak_by_periodicity)
+    assert cache.hits == 1
+    assert cache.misses == 2
+
+def test_cache_invalidated_by_other_connection(tmp_path, valid_habit):
+    path = str(tmp_path / "habits.db")
+    writer = sqlite3.connect(path)
+    writer.execute("CREATE TABLE habits(habit_id INTEGER PRIMARY KEY, habit_name VARCHAR UNIQUE, habit_periodicity VARCHAR, habit_description VARCHAR)")
+    writer.execute("CREATE TABLE tracking(tracking_id INTEGER PRIMARY KEY, habit_id INTEGER, completion_date DATE)")
+    writer_storage = SQLiteStorage(writer)
+    writer_storage.save_habit(valid_habit)
+    writer_storage.save_tracking_data(("running", date(2025, 9, 1)))
+
+    reader_storage = SQLiteStorage(sqlite3.connect(path))
+    cache = AnalyticsCache(reader_storage)
+    cache.get(longest_streak, "running")
+    writer_storage.save_tracking_data(("running", date(2025, 9, 8)))
+    assert cache.get(longest_streak, "running") == 'The longest streak for Habit running is 2 days'
+
+    reader_storage.connection.close()
+    writer.close()
+
+def test_cache_lru_eviction(setup_analytics_data):
+    cache = AnalyticsCache(setup_analytics_data, maxsize=2)
+    cache.get(longest_streak, "10000 steps")
+    cache.get(longest_streak, "gym")
+    cache.get(longest_streak, "10000 steps")
+    cache.get(longest_streak, "meditation")
+    assert len(cache) == 2
+    cache.get(longest_streak, "10000 steps")
+    assert cache.hits == 2
+
+def test_cache_invalid_size(setup_analytics_data):
+    with pytest.raises(ValueError):
+        AnalyticsCache(setup_analytics_data, maxsize=0)
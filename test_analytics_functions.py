@@ -15,7 +15,19 @@ from test_analytics_setup import (
     no_tracking_data_habit
 )
 
-from analytics import longest_streak, current_streak, completion_rate, longest_streak_by_periodicity
+from habits import Habit
+from analytics import (
+    longest_streak,
+    current_streak,
+    completion_rate,
+    longest_streak_by_periodicity,
+    streak_leaderboard,
+    streak_history,
+    count_current_streak,
+    completion_rates,
+    completion_rate_report,
+    expected_completions
+)
 
 # endregion
 
@@ -107,4 +119,88 @@ def test_completion_date_weekly(setup_analytics_data):
 
 def test_longest_streak_by_periodicity(setup_analytics_data):
     result = longest_streak_by_periodicity(setup_analytics_data)
-    assert result == 'Best Daily Habit: 10000 steps with 3 streak\nBest Weekly Habit: go to Cinema with 2 streak\nNo monthly habits found'
\ No newline at end of file
+    assert result == 'Best Daily Habit: 10000 steps with 3 streak\nBest Weekly Habit: go to Cinema with 2 streak\nNo monthly habits found'
+
+def test_longest_streak_by_periodicity_custom(setup_analytics_data):
+    storage = setup_analytics_data
+    storage.save_habit(Habit("stretching", "every 3 days", "Stretch"))
+    storage.save_habit(Habit("lifting", "2 times per week", "Strength training"))
+    storage.save_tracking_batch([("lifting", date(2025, 9, day)) for day in (1, 3, 8, 12)])
+    result = longest_streak_by_periodicity(storage).split("\n")
+    assert result[3:] == ['Best 2 times per week Habit: lifting with 2 streak', 'Best Every 3 days Habit: None with 0 streak']
+
+# region test streak leaderboard
+def test_streak_leaderboard_longest(setup_analytics_data):
+    result = streak_leaderboard(setup_analytics_data, k=2)
+    assert result == [("10000 steps", 3), ("go to Cinema", 2)]
+
+def test_streak_leaderboard_by_periodicity(setup_analytics_data):
+    result = streak_leaderboard(setup_analytics_data, k=5, periodicity="weekly")
+    assert result == [("go to Cinema", 2), ("meditation", 1)]
+
+@freeze_time("2025-09-28")
+def test_streak_leaderboard_current(setup_analytics_data):
+    result = streak_leaderboard(setup_analytics_data, k=3, metric="current")
+    assert result == [("10000 steps", 3), ("go to Cinema", 2), ("meditation", 1)]
+
+def test_streak_leaderboard_invalid_metric(setup_analytics_data):
+    with pytest.raises(ValueError):
+        streak_leaderboard(setup_analytics_data, metric="fastest")
+# endregion test streak leaderboard
+
+# region test as-of analytics
+def test_current_streak_as_of(setup_analytics_data):
+    result = current_streak(setup_analytics_data, "10000 steps", as_of=date(2025, 9, 23))
+    assert result == "The current streak for Habit 10000 steps is 3 days"
+
+def test_current_streak_as_of_before_first_completion(setup_analytics_data):
+    result = current_streak(setup_analytics_data, "10000 steps", as_of=date(2025, 9, 1))
+    assert result == "Error! The current streak for Habit 10000 steps is 0 days"
+
+def test_completion_rate_as_of(setup_analytics_data):
+    result = completion_rate(setup_analytics_data, "10000 steps", as_of=date(2025, 9, 21))
+    assert result == 'Completion rate for the Habit 10000 steps is 10%'
+
+def test_streak_history_matches_full_rescan(setup_analytics_data):
+    history = streak_history(setup_analytics_data, "10000 steps", date(2025, 9, 10), date(2025, 10, 5))
+    rows = setup_analytics_data.load_tracking_data("10000 steps")
+    dates = sorted(map(lambda row: datetime.strptime(row[0], "%Y-%m-%d").date(), rows))
+
+    assert len(history) == 26
+    for day, current, longest in history:
+        assert current == count_current_streak([d for d in dates if d <= day], "daily", day)
+    assert history[-1][2] == 3
+
+def test_streak_history_no_habit(setup_analytics_data):
+    result = streak_history(setup_analytics_data, "sleeping", date(2025, 9, 1), date(2025, 9, 2))
+    assert result == "Habit sleeping was not found"
+# endregion test as-of analytics
+
+# region test multi-window completion rates
+def test_completion_rates_multiple_windows(setup_analytics_data):
+    result = completion_rates(setup_analytics_data, "10000 steps", windows=(7, 14), as_of=date(2025, 9, 27))
+    # 7 days 21-27: 6 completions, 14 days 14-27: 8 completions
+    assert result[7] == pytest.approx(6 * 100 / 7)
+    assert result[14] == pytest.approx(8 * 100 / 14)
+
+def test_completion_rates_weekly_exact(setup_analytics_data):
+    result = completion_rates(setup_analytics_data, "go to Cinema", windows=(28,), as_of=date(2025, 9, 28))
+    assert result[28] == pytest.approx(75)
+
+def test_completion_rates_no_habit(setup_analytics_data):
+    result = completion_rates(setup_analytics_data, "sleeping")
+    assert result == "Habit sleeping was not found"
+
+def test_completion_rates_invalid_window(setup_analytics_data):
+    with pytest.raises(ValueError):
+        completion_rates(setup_analytics_data, "10000 steps", windows=(0,))
+
+def test_expected_completions_monthly_calendar_exact():
+    assert expected_completions("monthly", date(2024, 2, 1), date(2024, 2, 29)) == pytest.approx(1)
+    assert expected_completions("monthly", date(2025, 1, 1), date(2025, 3, 31)) == pytest.approx(3)
+
+def test_completion_rate_report(setup_analytics_data):
+    report = completion_rate_report(setup_analytics_data, windows=(7,), as_of=date(2025, 9, 27))
+    assert set(report) == {"10000 steps", "go to Cinema", "meditation", "gym"}
+    assert report["meditation"][7] == pytest.approx(100)
+# endregion test multi-window completion rates
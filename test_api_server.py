@@ -0,0 +1,128 @@
+# region imports
+import json
+import pytest
+import sqlite3
+import asyncio
+
+from freezegun import freeze_time
+
+from test_database import db_setup
+from test_analytics_setup import (
+    setup_analytics_data,
+    daily_habit,
+    weekly_habit,
+    tracking_test_data,
+    single_entry_habit,
+    no_consecutive_dates_habit,
+    no_tracking_data_habit
+)
+
+from api_server import HabitAPI, start_server
+from load_generator import send_request, run_spawned
+
+# endregion imports
+
+@pytest.fixture
+def api(setup_analytics_data):
+    return HabitAPI(setup_analytics_data)
+
+def test_create_and_get_habit(api):
+    status, payload = api.handle("POST", "/habits", {"name": "swimming", "periodicity": "weekly"})
+    assert status == 201
+    status, payload = api.handle("GET", "/habits/swimming")
+    assert payload["periodicity"] == "weekly"
+    status, payload = api.handle("POST", "/habits", {"name": "swimming", "periodicity": "weekly"})
+    assert status == 409
+    status, payload = api.handle("POST", "/habits", {"name": "x", "periodicity": "weekly"})
+    assert (status, payload) == (400, {"error": "Habit name is too short"})
+
+def test_list_habits_by_periodicity(api):
+    status, payload = api.handle("GET", "/habits?periodicity=weekly")
+    assert payload == {"habits": ["go to Cinema", "meditation"]}
+
+def test_completions(api):
+    status, payload = api.handle("POST", "/habits/10000%20steps/completions", {"date": "2025-09-28"})
+    assert status == 201
+    status, payload = api.handle("GET", "/habits/10000%20steps/completions")
+    assert payload["completions"][-1] == "2025-09-28"
+    status, payload = api.handle("DELETE", "/habits/10000%20steps/completions/2025-09-28")
+    assert status == 200
+    status, payload = api.handle("POST", "/habits/sleeping/completions")
+    assert (status, payload) == (404, {"error": "Habit name was not found"})
+    status, payload = api.handle("POST", "/habits/gym/completions", {"date": "yesterday"})
+    assert status == 400
+
+@freeze_time("2025-09-28")
+def test_analytics_are_cached(api):
+    status, payload = api.handle("GET", "/habits/10000%20steps/analytics")
+    assert payload["current_streak"] == "The current streak for Habit 10000 steps is 3 days"
+    api.handle("GET", "/habits/10000%20steps/analytics")
+    assert api.cache.hits == 1
+
+def test_leaderboard(api):
+    status, payload = api.handle("GET", "/leaderboard?k=1")
+    assert payload == {"leaderboard": [{"habit": "10000 steps", "streak": 3}]}
+
+def test_batch(api):
+    status, payload = api.handle("POST", "/batch", {"requests": [
+        {"method": "GET", "path": "/habits/gym"},
+        {"method": "DELETE", "path": "/habits/gym"},
+        {"method": "GET", "path": "/habits/gym"},
+        {"method": "POST", "path": "/batch", "body": {"requests": []}}
+    ]})
+    assert status == 200
+    assert [response["status"] for response in payload["responses"]] == [200, 200, 404, 400]
+
+def test_unknown_route_and_method(api):
+    assert api.handle("GET", "/unknown")[0] == 404
+    assert api.handle("PUT", "/habits")[0] == 405
+
+def test_invalid_field_types(api):
+    assert api.handle("POST", "/habits", {"name": 5, "periodicity": "daily"})[0] == 400
+    assert api.handle("POST", "/habits", {"name": "swimming", "periodicity": "daily", "description": []})[0] == 400
+    assert api.handle("POST", "/habits/gym/completions", {"date": 123})[0] == 400
+    assert api.handle("POST", "/batch", {"requests": ["/habits"]})[0] == 400
+
+def test_internal_error_answers_500(api, capsys):
+    def fail(*args):
+        raise sqlite3.OperationalError("disk I/O error")
+    api.storage.load_all_habits = fail
+
+    async def scenario():
+        server = await start_server(api, "127.0.0.1", 0)
+        port = server.sockets[0].getsockname()[1]
+        reader, writer = await asyncio.open_connection("127.0.0.1", port)
+        statuses = [
+            await send_request(reader, writer, "GET", "/habits"),
+            await send_request(reader, writer, "GET", "/habits/gym")
+        ]
+        writer.close()
+        server.close()
+        await server.wait_closed()
+        return statuses
+
+    assert asyncio.run(scenario()) == [500, 200]
+    assert "disk I/O error" in capsys.readouterr().err
+
+def test_keep_alive_over_socket(api):
+    async def scenario():
+        server = await start_server(api, "127.0.0.1", 0)
+        port = server.sockets[0].getsockname()[1]
+        reader, writer = await asyncio.open_connection("127.0.0.1", port)
+        statuses = [
+            await send_request(reader, writer, "GET", "/habits"),
+            await send_request(reader, writer, "GET", "/habits/gym"),
+            await send_request(reader, writer, "GET", "/habits/sleeping")
+        ]
+        writer.close()
+        server.close()
+        await server.wait_closed()
+        return statuses
+
+    assert asyncio.run(scenario()) == [200, 200, 404]
+
+def test_load_generator():
+    result = asyncio.run(run_spawned(connections=2, requests=20, write_ratio=0.5))
+    assert result["requests"] == 40
+    assert result["errors"] == 0
+    assert result["rps"] > 0
@@ -0,0 +1,105 @@
+# region imports
+import pytest
+import sqlite3
+from datetime import date, timedelta
+
+from test_database import db_setup, valid_habit
+from test_analytics_setup import (
+    setup_analytics_data,
+    daily_habit,
+    weekly_habit,
+    tracking_test_data,
+    single_entry_habit,
+    no_consecutive_dates_habit,
+    no_tracking_data_habit
+)
+
+from storage import SQLiteStorage
+from analytics import longest_streak, completion_rate, streak_leaderboard
+from archive import encode_days, decode_days, archive_completions
+
+# endregion imports
+
+def test_codec_roundtrip():
+    ordinals = [date(2020, 1, 1).toordinal(), date(2020, 1, 1).toordinal(), date(2020, 1, 2).toordinal(),
+                date(2024, 6, 30).toordinal()]
+    assert decode_days(encode_days(ordinals)) == ordinals
+    assert decode_days(encode_days([])) == []
+    with pytest.raises(ValueError):
+        encode_days([5, 3])
+
+def test_codec_compresses_daily_history():
+    start = date(2015, 1, 1).toordinal()
+    ordinals = list(range(start, start + 3650))
+    assert len(encode_days(ordinals)) < 100
+
+def test_archive_reads_stay_transparent(setup_analytics_data):
+    storage = setup_analytics_data
+    before = sorted(row[0] for row in storage.load_tracking_data("10000 steps"))
+    longest_before = longest_streak(storage, "10000 steps")
+
+    report = archive_completions(storage, older_than_days=5, today=date(2025, 9, 28))
+    assert report["rows_archived"] > 0
+    live = storage.connection.execute("SELECT COUNT(*) FROM tracking WHERE completion_date < '2025-09-23'").fetchone()[0]
+    assert live == 0
+
+    assert sorted(row[0] for row in storage.load_tracking_data("10000 steps")) == before
+    assert longest_streak(storage, "10000 steps") == longest_before
+    assert streak_leaderboard(storage, k=2) == [("10000 steps", 3), ("go to Cinema", 2)]
+
+def test_archive_is_incremental(setup_analytics_data):
+    storage = setup_analytics_data
+    archive_completions(storage, older_than_days=10, today=date(2025, 9, 28))
+    archive_completions(storage, older_than_days=2, today=date(2025, 9, 28))
+    summary = storage.load_archive_summary("10000 steps")
+    assert summary == {"completion_count": 6, "first_day": date(2025, 9, 15), "last_day": date(2025, 9, 25)}
+    assert len(storage.load_tracking_data("10000 steps")) == 8
+
+def test_delete_archived_completion(setup_analytics_data):
+    storage = setup_analytics_data
+    archive_completions(storage, older_than_days=5, today=date(2025, 9, 28))
+    assert storage.delete_tracking_data(("10000 steps", "2025-09-15")) == "Data successfully deleted"
+    assert storage.delete_tracking_data(("10000 steps", "2025-09-15")) == "No data found"
+    assert storage.load_archive_summary("10000 steps")["first_day"] == date(2025, 9, 19)
+
+def test_completion_rate_skips_old_archive(setup_analytics_data):
+    storage = setup_analytics_data
+    archive_completions(storage, older_than_days=5, today=date(2025, 9, 28))
+    assert completion_rate(storage, "10000 steps", as_of=date(2025, 9, 21)) == 'Completion rate for the Habit 10000 steps is 10%'
+    assert completion_rate(storage, "10000 steps", as_of=date(2025, 11, 1)) == 'Completion rate for the Habit 10000 steps is 0%'
+
+def test_archive_shrinks_database(tmp_path, valid_habit):
+    conn = sqlite3.connect(str(tmp_path / "habits.db"))
+    conn.execute("CREATE TABLE habits(habit_id INTEGER PRIMARY KEY, habit_name VARCHAR UNIQUE, habit_periodicity VARCHAR, habit_description VARCHAR)")
+    conn.execute("CREATE TABLE tracking(tracking_id INTEGER PRIMARY KEY, habit_id INTEGER, completion_date DATE)")
+    storage = SQLiteStorage(conn)
+    storage.save_habit(valid_habit)
+    start = date(2015, 1, 1)
+    storage.save_tracking_batch([("running", start + timedelta(days=i)) for i in range(3000)])
+
+    report = archive_completions(storage, older_than_days=30, today=date(2025, 1, 1), vacuum=True)
+    assert report["rows_archived"] == 3000
+    assert report["bytes_after"] < report["bytes_before"] / 3
+    assert len(storage.load_tracking_data("running")) == 3000
+    conn.close()
+
+def test_open_storage_sees_archive_of_other_connection(tmp_path, valid_habit):
+    path = str(tmp_path / "habits.db")
+    conn = sqlite3.connect(path)
+    conn.execute("CREATE TABLE habits(habit_id INTEGER PRIMARY KEY, habit_name VARCHAR UNIQUE, habit_periodicity VARCHAR, habit_description VARCHAR)")
+    conn.execute("CREATE TABLE tracking(tracking_id INTEGER PRIMARY KEY, habit_id INTEGER, completion_date DATE)")
+    storage = SQLiteStorage(conn)
+    storage.save_habit(valid_habit)
+    storage.save_tracking_batch([("running", date(2025, 1, 1) + timedelta(days=7 * i)) for i in range(10)])
+    assert not storage.has_archive
+    longest_before = longest_streak(storage, "running")
+
+    other = sqlite3.connect(path)
+    report = archive_completions(SQLiteStorage(other), older_than_days=30, today=date(2025, 6, 1))
+    assert report["rows_archived"] == 10
+    other.close()
+
+    assert storage.has_archive
+    assert len(storage.load_tracking_data("running")) == 10
+    assert longest_streak(storage, "running") == longest_before
+    conn.close()
@@ -0,0 +1,76 @@
+# region imports
+import pytest
+from datetime import date
+
+from test_database import db_setup, valid_habit
+
+from habits import Habit
+from storage import SQLiteStorage, ensure_changelog_schema
+from api_server import HabitAPI
+
+# endregion imports
+
+@pytest.fixture
+def log_storage(db_setup, valid_habit):
+    ensure_changelog_schema(db_setup)
+    storage = SQLiteStorage(db_setup)
+    storage.save_habit(valid_habit)
+    return storage
+
+def test_mutations_are_logged_in_order(log_storage):
+    log_storage.save_tracking_data(("running", date(2025, 9, 1)))
+    log_storage.save_tracking_batch([("running", date(2025, 9, 2)), ("unknown", date(2025, 9, 2))])
+    log_storage.delete_tracking_data(("running", date(2025, 9, 1)))
+    log_storage.delete_tracking_data(("running", date(2025, 9, 5)))
+    log_storage.delete_habit("running")
+
+    changes = list(log_storage.changes_since(0))
+    assert [change[0] for change in changes] == [1, 2, 3, 4, 5]
+    assert [change[1:] for change in changes] == [
+        ("habit_created", "running", None),
+        ("completion_added", "running", "2025-09-01"),
+        ("completion_added", "running", "2025-09-02"),
+        ("completion_deleted", "running", "2025-09-01"),
+        ("habit_deleted", "running", None),
+    ]
+    assert log_storage.last_change_seq() == 5
+
+def test_changes_since_streams_deltas_in_batches(log_storage):
+    for day in range(1, 8):
+        log_storage.save_tracking_data(("running", date(2025, 9, day)))
+    assert [change[0] for change in log_storage.changes_since(5, batch_size=2)] == [6, 7, 8]
+    assert list(log_storage.changes_since(8)) == []
+
+def test_sequence_numbers_are_never_reused(log_storage):
+    log_storage.save_tracking_data(("running", date(2025, 9, 1)))
+    log_storage.connection.execute("DELETE FROM change_log WHERE seq = 2")
+    log_storage.save_tracking_data(("running", date(2025, 9, 2)))
+    assert [change[0] for change in log_storage.changes_since(0)] == [1, 3]
+
+def test_failed_write_leaves_no_log_entry(log_storage):
+    log_storage.save_habit(Habit("running", "daily"))
+    log_storage.save_tracking_data(("unknown", date(2025, 9, 1)))
+    assert log_storage.last_change_seq() == 1
+
+def test_change_marker_is_per_habit(log_storage):
+    log_storage.save_habit(Habit("reading", "daily"))
+    marker = log_storage.change_marker("running")
+    log_storage.save_tracking_data(("reading", date(2025, 9, 1)))
+    assert log_storage.change_marker("running") == marker
+    log_storage.save_tracking_data(("running", date(2025, 9, 1)))
+    assert log_storage.change_marker("running") != marker
+
+def test_changes_require_change_log(db_setup):
+    with pytest.raises(ValueError):
+        list(SQLiteStorage(db_setup).changes_since(0))
+
+def test_changes_endpoint(log_storage):
+    for day in range(1, 4):
+        log_storage.save_tracking_data(("running", date(2025, 9, day)))
+    api = HabitAPI(log_storage)
+    status, payload = api.handle("GET", "/changes?since=1&limit=2")
+    assert status == 200
+    assert [change["date"] for change in payload["changes"]] == ["2025-09-01", "2025-09-02"]
+    status, payload = api.handle("GET", f"/changes?since={payload['last_seq']}")
+    assert payload == {"changes": [{"seq": 4, "operation": "completion_added", "habit": "running",
+                                    "date": "2025-09-03"}], "last_seq": 4}
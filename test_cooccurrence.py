@@ -0,0 +1,88 @@
+# region imports
+import pytest
+import random
+from datetime import date, timedelta
+
+from test_database import db_setup
+
+import cooccurrence
+from habits import Habit
+from storage import SQLiteStorage
+from cooccurrence import top_cooccurrences, cooccurrence as compare_habits, build_matrix, pair_count_blocks
+
+# endregion imports
+
+START = date(2025, 9, 1)
+END = date(2025, 9, 10)
+
+@pytest.fixture
+def pair_storage(db_setup):
+    storage = SQLiteStorage(db_setup)
+    completions = {
+        "exercise": [1, 2, 3, 4, 5],
+        "walking": [1, 2, 3, 4, 6],
+        "reading": [6, 7, 8, 9, 10],
+        "cinema": [2],
+    }
+    for habit, days in completions.items():
+        storage.save_habit(Habit(habit, "daily"))
+        for day in days:
+            storage.save_tracking_data((habit, date(2025, 9, day)))
+    storage.save_tracking_data(("cinema", date(2025, 8, 2)))
+    return storage
+
+@pytest.fixture(params=[1024, 1])
+def block_rows(request, monkeypatch):
+    monkeypatch.setattr(cooccurrence, "BLOCK_ROWS", request.param)
+    return request.param
+
+def test_top_pairs_by_count(pair_storage, block_rows):
+    result = top_cooccurrences(pair_storage, k=2, metric="count", start=START, end=END)
+    assert result == [("exercise", "walking", 4, 4.0), ("exercise", "cinema", 1, 1.0)]
+
+def test_top_pairs_by_phi(pair_storage, block_rows):
+    result = top_cooccurrences(pair_storage, k=10, metric="phi", start=START, end=END, min_days=0)
+    assert len(result) == 6
+    assert result[0][:2] == ("exercise", "walking")
+    assert result[0][3] == pytest.approx(0.6)
+    assert result[-1][:3] == ("exercise", "reading", 0)
+    assert result[-1][3] == pytest.approx(-1.0)
+    # Pairs never completed together are left out by default
+    assert len(top_cooccurrences(pair_storage, metric="phi", start=START, end=END)) == 4
+
+def test_invalid_arguments(pair_storage):
+    with pytest.raises(ValueError):
+        top_cooccurrences(pair_storage, metric="lift")
+    with pytest.raises(ValueError):
+        top_cooccurrences(pair_storage, k=0)
+
+def test_blocks_match_brute_force(db_setup, monkeypatch):
+    rng = random.Random(7)
+    storage = SQLiteStorage(db_setup)
+    batch = []
+    for i in range(40):
+        storage.save_habit(Habit(f"habit {i}", "daily"))
+        batch += [(f"habit {i}", START + timedelta(days=day)) for day in range(400) if rng.random() < 0.3]
+    storage.save_tracking_batch(batch)
+    end = START + timedelta(days=399)
+    completed = {habit: set(storage.load_tracking_data(habit)) for habit in storage.load_all_habits()}
+
+    monkeypatch.setattr(cooccurrence, "BLOCK_ROWS", 7)
+    habits, days, rows = build_matrix(storage, START, end)
+    tiles = 0
+    for first, second, counts in pair_count_blocks(rows, days):
+        assert second >= first and max(counts.shape) <= 7
+        for i, row in enumerate(counts.tolist(), first):
+            assert row == [len(completed[habits[i]] & completed[other]) for other in habits[second:second + 7]]
+        tiles += 1
+    assert tiles == 6 * 7 // 2
+
+    expected = sorted(((len(completed[a] & completed[b]), a, b) for n, a in enumerate(habits) for b in habits[n + 1:]),
+                      key=lambda pair: -pair[0])[:15]
+    result = top_cooccurrences(storage, k=15, metric="count", start=START, end=end)
+    assert [(a, b, both) for a, b, both, _ in result] == [(a, b, both) for both, a, b in expected]
+
+def test_compare_two_habits(pair_storage):
+    assert compare_habits(pair_storage, "exercise", "walking", START, END) == \
+        "Habits exercise and walking were completed together on 4 days (correlation 0.60)"
+    assert compare_habits(pair_storage, "exercise", "sleeping") == "Habit sleeping was not found"
@@ -0,0 +1,69 @@
+# region imports
+import pytest
+
+from test_database import db_setup
+
+from habits import Habit
+from storage import SQLiteStorage, ensure_search_schema
+from main import HabitCompleter
+from prompt_toolkit.document import Document
+
+# endregion imports
+
+HABITS = [
+    Habit("running", "daily", "Run 5km around the lake"),
+    Habit("Reading", "daily", "Read twenty pages"),
+    Habit("go to Cinema", "weekly", "Watch a movie"),
+    Habit("meditation", "daily", "Ten minutes of breathing"),
+    Habit("read_news", "daily", "Skim the headlines"),
+]
+
+@pytest.fixture(params=[False, True], ids=["scan", "fts"])
+def search_storage(request, db_setup):
+    if request.param:
+        assert ensure_search_schema(db_setup)
+    storage = SQLiteStorage(db_setup)
+    for habit in HABITS:
+        storage.save_habit(habit)
+    return storage
+
+def test_keyset_pages_cover_all_habits(search_storage):
+    pages = []
+    page = search_storage.load_habits_page(limit=2)
+    while page:
+        pages.append(page)
+        page = search_storage.load_habits_page(after=page[-1], limit=2)
+    assert [len(page) for page in pages] == [2, 2, 1]
+    assert sum(pages, []) == sorted(habit.name for habit in HABITS)
+
+def test_page_prefix(search_storage):
+    assert search_storage.load_habits_page(prefix="re") == ["Reading", "read_news"]
+
+def test_search_prefix_first(search_storage):
+    assert search_storage.search_habits("read") == ["read_news", "Reading"]
+    assert search_storage.search_habits("read", limit=1) == ["read_news"]
+
+def test_search_substring_and_description(search_storage):
+    assert search_storage.search_habits("cinema") == ["go to Cinema"]
+    assert search_storage.search_habits("breathing") == ["meditation"]
+    assert search_storage.search_habits("xyz") == []
+    assert search_storage.search_habits("  ") == []
+
+def test_search_escapes_wildcards(search_storage):
+    assert search_storage.search_habits("d_n") == ["read_news"]
+    assert search_storage.search_habits("%") == []
+
+def test_search_index_follows_changes(db_setup):
+    ensure_search_schema(db_setup)
+    storage = SQLiteStorage(db_setup)
+    storage.save_habit(Habit("swimming", "weekly", "Pool laps"))
+    assert storage.search_habits("laps") == ["swimming"]
+    storage.delete_habit("swimming")
+    assert storage.search_habits("laps") == []
+
+def test_habit_completer(search_storage):
+    completer = HabitCompleter(search_storage, ["Main Menu", "Exit"], limit=10)
+    names = [c.text for c in completer.get_completions(Document("menu"), None)]
+    assert names == ["Main Menu"]
+    names = [c.text for c in completer.get_completions(Document(""), None)]
+    assert len(names) == len(HABITS) + 2
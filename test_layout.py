@@ -0,0 +1,113 @@
+# region imports
+import pytest
+import sqlite3
+from datetime import date, timedelta
+
+from test_database import valid_habit
+
+from habits import Habit
+from main import setup_database
+from api_server import HabitAPI
+from storage import SQLiteStorage
+from archive import archive_completions
+from metrics import COMPLETIONS_WRITTEN
+from layout import CLUSTERED, ROWID, tracking_layout, convert_to_clustered, set_page_size, benchmark_layouts
+
+# endregion imports
+
+TODAY = date(2025, 9, 30)
+
+@pytest.fixture
+def clustered(tmp_path, valid_habit):
+    storage = SQLiteStorage(setup_database(str(tmp_path / "habits.db"), clustered=True, page_size=8192))
+    storage.save_habit(valid_habit)
+    storage.save_tracking_batch([("running", TODAY - timedelta(days=day)) for day in range(100)])
+    return storage
+
+def test_setup_clustered_layout(clustered):
+    assert tracking_layout(clustered.connection) == CLUSTERED and clustered.clustered
+    assert clustered.connection.execute("PRAGMA page_size").fetchone()[0] == 8192
+    assert clustered.connection.execute(
+        "SELECT 1 FROM sqlite_master WHERE name = 'idx_tracking_habit'").fetchone() is None
+
+def test_clustered_keeps_one_completion_per_day(clustered):
+    seq = clustered.last_change_seq()
+    assert clustered.save_tracking_data(("running", TODAY)) == (True, "Successfully saved")
+    assert len(clustered.load_tracking_data("running")) == 100
+    assert clustered.last_change_seq() == seq
+
+def test_repeated_completion_is_counted_once(clustered):
+    written = COMPLETIONS_WRITTEN.value()
+    day = TODAY + timedelta(days=1)
+    assert clustered.save_tracking_data(("running", day)) == (True, "Successfully saved")
+    assert clustered.save_tracking_data(("running", day)) == (True, "Successfully saved")
+    assert COMPLETIONS_WRITTEN.value() == written + 1
+    version = clustered.write_version
+    clustered.save_tracking_data(("running", day))
+    assert clustered.write_version == version
+
+def test_clustered_purge_and_archive(clustered):
+    archive_completions(clustered, older_than_days=80, today=TODAY)
+    result = clustered.purge_tracking_data(30, chunk_size=20, today=TODAY)
+    assert result["deleted"] == 69 and result["last_key"][1] == str(TODAY - timedelta(days=31))
+    assert len(clustered.load_tracking_data("running")) == 31
+    assert clustered.delete_habit_chunked("running", chunk_size=7) == (True, "Habit succesfully deleted")
+
+def test_chunks_stay_below_parameter_limit(clustered):
+    # Default limit of SQLite builds before 3.32
+    clustered.connection.setlimit(sqlite3.SQLITE_LIMIT_VARIABLE_NUMBER, 999)
+    clustered.save_tracking_batch([("running", TODAY - timedelta(days=day)) for day in range(100, 1200)])
+    seq = clustered.last_change_seq()
+    assert clustered.purge_tracking_data(30, today=TODAY)["deleted"] == 1169
+    assert sum(1 for _ in clustered.changes_since(seq)) == 1169
+    assert clustered.delete_habit_chunked("running") == (True, "Habit succesfully deleted")
+
+def test_convert_while_writing(tmp_path, valid_habit):
+    connection = setup_database(str(tmp_path / "habits.db"))
+    storage = SQLiteStorage(connection)
+    storage.save_habit(valid_habit)
+    storage.save_tracking_batch([("running", TODAY - timedelta(days=day)) for day in range(50)] + [("running", TODAY)])
+    assert tracking_layout(connection) == ROWID
+
+    def write_during_copy(copied, total):
+        if copied == 10:
+            storage.save_tracking_data(("running", TODAY + timedelta(days=1)))
+            storage.delete_tracking_data(("running", TODAY - timedelta(days=49)))
+
+    report = convert_to_clustered(connection, chunk_size=10, progress=write_during_copy)
+    assert (report["rows_before"], report["rows_after"]) == (51, 50)
+    assert tracking_layout(connection) == CLUSTERED and SQLiteStorage(connection).clustered
+    dates = sorted(row[0] for row in storage.load_tracking_data("running"))
+    assert dates[0] == str(TODAY - timedelta(days=48)) and dates[-1] == str(TODAY + timedelta(days=1))
+    assert convert_to_clustered(connection)["rows_after"] == 50
+
+def test_open_storage_follows_conversion(tmp_path, valid_habit):
+    path = str(tmp_path / "habits.db")
+    storage = SQLiteStorage(setup_database(path))
+    storage.save_habit(valid_habit)
+    storage.save_habit(Habit("gym", "daily"))
+    storage.save_tracking_batch([(habit, TODAY - timedelta(days=day)) for day in range(50) for habit in ("running", "gym")])
+    assert not storage.clustered
+
+    # Converted by another process while storage stays open
+    other = sqlite3.connect(path)
+    convert_to_clustered(other)
+    other.close()
+    assert storage.clustered
+    assert storage.purge_tracking_data(30, chunk_size=7, today=TODAY)["last_key"][1] == str(TODAY - timedelta(days=31))
+    assert storage.delete_habit_chunked("gym", chunk_size=7) == (True, "Habit succesfully deleted")
+    assert HabitAPI(storage).handle("DELETE", "/habits/running")[0] == 200
+
+def test_set_page_size_rebuilds_database(tmp_path):
+    connection = setup_database(str(tmp_path / "habits.db"))
+    connection.execute("PRAGMA journal_mode = WAL")
+    assert set_page_size(connection, 16384) == 16384
+    assert connection.execute("PRAGMA journal_mode").fetchone()[0] == "wal"
+    with pytest.raises(ValueError):
+        set_page_size(connection, 5000)
+
+def test_benchmark_layouts(tmp_path):
+    results = benchmark_layouts(str(tmp_path), habits=20, days=60, samples=5)
+    assert results[ROWID]["rows"] == results[CLUSTERED]["rows"]
+    assert results[CLUSTERED]["bytes"] < results[ROWID]["bytes"]
+    assert results[CLUSTERED]["read_seconds"] > 0
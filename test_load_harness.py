@@ -0,0 +1,63 @@
+# region imports
+import pytest
+import sqlite3
+import threading
+from datetime import date
+
+from test_database import valid_habit
+
+from storage import SQLiteStorage, RetryPolicy
+from main import setup_database
+from load_harness import run_harness
+
+# endregion imports
+
+@pytest.fixture
+def db_path(tmp_path, valid_habit):
+    path = str(tmp_path / "habits.db")
+    conn = setup_database(path)
+    SQLiteStorage(conn).save_habit(valid_habit)
+    conn.close()
+    return path
+
+def test_retry_policy_delay():
+    policy = RetryPolicy(retries=3, base_delay=0.01, max_delay=0.03, jitter=False)
+    assert [policy.delay(attempt) for attempt in range(4)] == [0.01, 0.02, 0.03, 0.03]
+    with pytest.raises(ValueError):
+        RetryPolicy(retries=-1)
+
+def test_locked_write_fails_without_policy(db_path):
+    blocker = sqlite3.connect(db_path)
+    blocker.execute("BEGIN IMMEDIATE")
+    storage = SQLiteStorage(sqlite3.connect(db_path, timeout=0))
+    with pytest.raises(sqlite3.OperationalError, match="locked"):
+        storage.save_tracking_data(("running", date(2025, 9, 1)))
+    blocker.rollback()
+
+def test_locked_write_retries_with_backoff(db_path):
+    blocker = sqlite3.connect(db_path, check_same_thread=False)
+    blocker.execute("BEGIN IMMEDIATE")
+    release = threading.Timer(0.05, blocker.rollback)
+    release.start()
+
+    storage = SQLiteStorage(sqlite3.connect(db_path, timeout=0),
+                            retry_policy=RetryPolicy(retries=20, base_delay=0.005, max_delay=0.02))
+    assert storage.save_tracking_data(("running", date(2025, 9, 1))) == (True, "Successfully saved")
+    assert storage.lock_retries > 0
+    release.join()
+
+def test_busy_timeout_waits_for_lock(db_path):
+    blocker = sqlite3.connect(db_path, check_same_thread=False)
+    blocker.execute("BEGIN IMMEDIATE")
+    release = threading.Timer(0.05, blocker.rollback)
+    release.start()
+
+    storage = SQLiteStorage(sqlite3.connect(db_path, timeout=0), busy_timeout=2000)
+    assert storage.save_tracking_data(("running", date(2025, 9, 1))) == (True, "Successfully saved")
+    release.join()
+
+def test_run_harness(tmp_path):
+    result = run_harness(str(tmp_path / "load.db"), processes=2, threads=2, operations=25)
+    assert result["operations"] + result["lock_errors"] + result["other_errors"] == 100
+    assert result["other_errors"] == 0
+    assert result["ops_per_second"] > 0
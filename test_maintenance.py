@@ -0,0 +1,90 @@
+# region imports
+import time
+import pytest
+import sqlite3
+from datetime import date, datetime, timedelta
+
+from habits import Habit
+from main import setup_database
+from storage import SQLiteStorage
+from maintenance import (plan_maintenance, run_maintenance, enable_incremental_vacuum, format_report,
+                         MaintenanceScheduler)
+
+# endregion imports
+
+NOW = datetime(2025, 9, 30, 12, 0)
+
+@pytest.fixture
+def database(tmp_path):
+    path = str(tmp_path / "habits.db")
+    conn = setup_database(path)
+    conn.execute("PRAGMA journal_mode = WAL")
+    storage = SQLiteStorage(conn)
+    for number in range(20):
+        storage.save_habit(Habit(f"habit {number}", "daily", "Maintenance test"))
+        storage.save_tracking_batch([(f"habit {number}", date(2025, 9, 30) - timedelta(days=day))
+                                     for day in range(1500)])
+    yield path, storage
+    conn.close()
+
+def test_delete_cascade_is_reclaimed(database):
+    path, storage = database
+    first = run_maintenance(storage.connection, NOW, sleep=0)
+    assert list(first["steps"]) == ["checkpoint", "analyze", "optimize"]
+    for number in range(15):
+        storage.delete_habit(f"habit {number}")
+
+    plan = plan_maintenance(storage.connection, NOW + timedelta(hours=1))
+    assert list(plan) == ["checkpoint", "vacuum", "analyze", "optimize"]
+    assert "changed rows since last ANALYZE" in plan["analyze"]
+    report = run_maintenance(storage.connection, NOW + timedelta(hours=1), step_pages=8, sleep=0)
+    assert report["skipped"] == [] and report["free_pages_after"] == 0
+    assert report["reclaimed_bytes"] > 0 and report["bytes_after"] < report["bytes_before"]
+    assert "Reclaimed" in format_report(report)
+
+    # Nothing left to do until the statistics are a week old
+    assert list(plan_maintenance(storage.connection, NOW + timedelta(days=1))) == ["checkpoint", "optimize"]
+    assert "analyze" in plan_maintenance(storage.connection, NOW + timedelta(days=8))
+
+def test_busy_steps_are_skipped(database):
+    path, storage = database
+    run_maintenance(storage.connection, NOW, sleep=0)
+    storage.delete_habit("habit 0")
+    writer = sqlite3.connect(path, timeout=0)
+    writer.execute("BEGIN IMMEDIATE")
+    maintenance = sqlite3.connect(path, timeout=0)
+    try:
+        report = run_maintenance(maintenance, NOW, force=True, sleep=0)
+        assert "vacuum" in report["skipped"] and "analyze" in report["skipped"]
+        writer.rollback()
+        assert run_maintenance(maintenance, NOW, force=True, sleep=0)["skipped"] == []
+    finally:
+        writer.close()
+        maintenance.close()
+
+def test_legacy_database_needs_conversion(tmp_path):
+    conn = sqlite3.connect(str(tmp_path / "legacy.db"))
+    conn.execute("CREATE TABLE tracking(tracking_id INTEGER PRIMARY KEY, habit_id INTEGER, completion_date DATE)")
+    conn.executemany("INSERT INTO tracking (habit_id, completion_date) VALUES (?, ?)",
+                     [(1, "2025-09-30")] * 20000)
+    conn.commit()
+    conn.execute("DELETE FROM tracking")
+    conn.commit()
+    assert "vacuum_recommended" in plan_maintenance(conn, NOW)
+    result = enable_incremental_vacuum(conn)
+    assert result["bytes_after"] < result["bytes_before"]
+    assert conn.execute("PRAGMA auto_vacuum").fetchone()[0] == 2
+    conn.close()
+
+def test_scheduler_runs(database):
+    path, _ = database
+    scheduler = MaintenanceScheduler(path, interval=0.01)
+    try:
+        assert "optimize" in scheduler.run()["steps"]
+        scheduler.start()
+        deadline = time.monotonic() + 5
+        while scheduler.runs < 3 and time.monotonic() < deadline:
+            time.sleep(0.01)
+        assert scheduler.runs >= 3
+    finally:
+        scheduler.close()
@@ -0,0 +1,124 @@
+# region imports
+import pytest
+from datetime import date, timedelta
+
+from habits import Habit
+from main import setup_database
+from storage import SQLiteStorage, HabitStorage
+from memory_storage import MemoryStorage, HabitRecord, INVALID_COMPLETION_DATE
+from analytics import longest_streak, current_streak, completion_rate, streak_leaderboard
+from cooccurrence import top_cooccurrences
+from population import population_statistics
+
+# endregion imports
+
+TODAY = date(2025, 9, 30)
+
+HABITS = [
+    Habit("running", "weekly", "Run 5 km"),
+    Habit("Reading", "daily", "Read 10 pages"),
+    Habit("meditation", "daily", "Meditate in the morning"),
+    Habit("gym", "3 times per week", "Strength training"),
+    Habit("cleaning", "monthly", "Clean the flat")
+]
+
+def completions():
+    yield from (("running", TODAY - timedelta(days=day)) for day in range(0, 60, 7))
+    yield from (("Reading", TODAY - timedelta(days=day)) for day in range(40) if day % 9)
+    yield from (("meditation", TODAY - timedelta(days=day)) for day in range(0, 40, 2))
+    yield from (("gym", TODAY - timedelta(days=day)) for day in (1, 3, 5, 8, 10, 12, 20))
+    yield ("cleaning", TODAY - timedelta(days=31))
+
+def fill(storage):
+    for habit in HABITS:
+        storage.save_habit(habit)
+    storage.save_tracking_batch(list(completions()))
+    return storage
+
+@pytest.fixture(params=["sqlite", "memory"])
+def storage(request):
+    if request.param == "memory":
+        return MemoryStorage()
+    return SQLiteStorage(setup_database(":memory:"))
+
+@pytest.fixture
+def both():
+    return (fill(SQLiteStorage(setup_database(":memory:"))), fill(MemoryStorage()))
+
+def test_backends_follow_protocol(storage):
+    assert isinstance(storage, HabitStorage)
+
+def test_habit_operations(storage):
+    fill(storage)
+    assert storage.save_habit(HABITS[0]) is False
+    record = storage.load_habit("running")
+    assert (record[1], record["habit_periodicity"], dict(record)["habit_description"]) == ("running", "weekly", "Run 5 km")
+    assert storage.load_habit("swimming") is None
+    assert storage.load_all_habits() == ["cleaning", "gym", "meditation", "Reading", "running"]
+    assert storage.load_habits_page(after="cleaning", limit=2) == ["gym", "meditation"]
+    assert storage.load_habits_page(prefix="r") == ["Reading", "running"]
+    assert storage.load_all_habits_by_periodicity("daily") == ["Reading", "meditation"]
+    assert storage.load_periodicities() == ["3 times per week", "daily", "monthly", "weekly"]
+    assert storage.search_habits("in", limit=3) == ["Reading", "cleaning", "gym"]
+    assert storage.search_habits("flat") == ["cleaning"]
+    assert storage.delete_habit("swimming") == (False, "There is no such habit")
+    assert storage.delete_habit("gym") == (True, "Habit succesfully deleted")
+    assert storage.load_tracking_data("gym") == "Habit name was not found"
+
+def test_tracking_operations(storage):
+    fill(storage)
+    assert storage.save_tracking_data(("", TODAY)) == (False, "Invalid habit name")
+    assert storage.save_tracking_data(("swimming", TODAY)) == (False, "Habit name was not found")
+    assert storage.save_tracking_data(("cleaning", "2025-8-31")) == (True, "Successfully saved")
+    assert storage.save_tracking_batch([("cleaning", TODAY), ("swimming", TODAY)]) == (
+        1, [(("swimming", TODAY), "Habit name was not found")])
+    assert len(storage.load_tracking_data("cleaning")) == 3
+    assert storage.delete_tracking_data(("cleaning", TODAY)) == "Data successfully deleted"
+    assert storage.delete_tracking_data(("cleaning", TODAY)) == "No data found"
+    assert storage.delete_tracking_data((" ", TODAY)) == "Invalid habit name"
+    assert [habit for habit, _, _ in storage.iter_tracking_data("daily")] == ["Reading", "meditation"]
+    shards = [{habit for habit, _, _ in storage.iter_tracking_data(shard=(index, 2))} for index in range(2)]
+    assert shards[0].isdisjoint(shards[1]) and shards[0] | shards[1] == {
+        habit for habit, _, _ in storage.iter_tracking_data()}
+    assert storage.load_archive_summary("cleaning") is None
+
+def test_change_log(storage):
+    marker = storage.change_marker("running")
+    fill(storage)
+    seq = storage.last_change_seq()
+    assert storage.change_marker("running") != marker
+    storage.save_tracking_data(("gym", TODAY))
+    storage.delete_habit("cleaning")
+    assert [change[1:] for change in storage.changes_since(seq)] == [
+        ("completion_added", "gym", TODAY.isoformat()),
+        ("habit_deleted", "cleaning", None)
+    ]
+    assert storage.dirty_habits(seq) == ["gym"]
+
+def test_purge_and_chunked_delete(storage):
+    fill(storage)
+    reports = []
+    result = storage.purge_tracking_data(30, chunk_size=4, today=TODAY,
+                                         progress=lambda deleted, last_key: reports.append(deleted))
+    assert (result["deleted"], result["chunks"]) == (17, 5) and reports == [4, 8, 12, 16, 17]
+    assert storage.purge_tracking_data(30, today=TODAY)["deleted"] == 0
+    assert storage.delete_habit_chunked("Reading", chunk_size=10) == (True, "Habit succesfully deleted")
+    with pytest.raises(ValueError):
+        storage.purge_tracking_data(-1)
+
+def test_memory_rejects_invalid_dates():
+    storage = fill(MemoryStorage())
+    assert storage.save_tracking_data(("gym", "yesterday")) == (False, INVALID_COMPLETION_DATE)
+    assert storage.delete_tracking_data(("gym", "yesterday")) == "No data found"
+    with pytest.raises(IndexError):
+        HabitRecord(1, "gym", "daily", None)["name"]
+
+def test_analytics_match_sqlite(both):
+    sqlite, memory = both
+    for habit in ["swimming"] + [habit.name for habit in HABITS]:
+        assert longest_streak(sqlite, habit) == longest_streak(memory, habit)
+        assert current_streak(sqlite, habit, TODAY) == current_streak(memory, habit, TODAY)
+        assert completion_rate(sqlite, habit, TODAY) == completion_rate(memory, habit, TODAY)
+    assert streak_leaderboard(sqlite, k=3) == streak_leaderboard(memory, k=3)
+    assert top_cooccurrences(sqlite, k=3, end=TODAY) == top_cooccurrences(memory, k=3, end=TODAY)
+    assert population_statistics(sqlite, TODAY).summary() == population_statistics(memory, TODAY).summary()
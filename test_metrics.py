@@ -0,0 +1,101 @@
+# region imports
+import pytest
+import urllib.request
+
+from test_database import db_setup, valid_habit
+from test_analytics_setup import (
+    setup_analytics_data,
+    daily_habit,
+    weekly_habit,
+    tracking_test_data,
+    single_entry_habit,
+    no_consecutive_dates_habit,
+    no_tracking_data_habit
+)
+
+from storage import SQLiteStorage
+from analytics import longest_streak
+from metrics import (
+    MetricsRegistry,
+    serve_metrics,
+    COMPLETIONS_WRITTEN,
+    HABITS_CREATED,
+    HABITS_DELETED,
+    ANALYTICS_COMPUTED,
+    STORAGE_LATENCY
+)
+
+# endregion imports
+
+def test_counter_and_histogram_render():
+    registry = MetricsRegistry()
+    counter = registry.counter("test_total", "Test counter", ("kind",))
+    histogram = registry.histogram("test_seconds", "Test histogram", buckets=(0.1, 1.0))
+    counter.inc(kind="a")
+    counter.inc(2, kind="a")
+    histogram.observe(0.05)
+    histogram.observe(5)
+
+    text = registry.render()
+    assert '# TYPE test_total counter' in text
+    assert 'test_total{kind="a"} 3' in text
+    assert 'test_seconds_bucket{le="0.1"} 1' in text
+    assert 'test_seconds_bucket{le="+Inf"} 2' in text
+    assert 'test_seconds_count 2' in text
+
+def test_storage_operations_are_counted(db_setup, valid_habit):
+    storage = SQLiteStorage(db_setup)
+    created = HABITS_CREATED.value()
+    written = COMPLETIONS_WRITTEN.value()
+    deleted = HABITS_DELETED.value()
+    saves = STORAGE_LATENCY.count(operation="save_tracking_data")
+
+    storage.save_habit(valid_habit)
+    storage.save_tracking_data(("running", "2025-09-20"))
+    storage.save_tracking_data(("sleeping", "2025-09-20"))
+    storage.delete_habit("running")
+
+    assert HABITS_CREATED.value() == created + 1
+    assert COMPLETIONS_WRITTEN.value() == written + 1
+    assert HABITS_DELETED.value() == deleted + 1
+    assert STORAGE_LATENCY.count(operation="save_tracking_data") == saves + 2
+
+def test_analytics_are_counted(setup_analytics_data):
+    before = ANALYTICS_COMPUTED.value(function="longest_streak")
+    longest_streak(setup_analytics_data, "10000 steps")
+    assert ANALYTICS_COMPUTED.value(function="longest_streak") == before + 1
+
+def test_write_textfile(tmp_path):
+    registry = MetricsRegistry()
+    registry.counter("test_total", "Test counter").inc()
+    path = tmp_path / "habits.prom"
+    registry.write_textfile(str(path))
+    assert "test_total 1" in path.read_text()
+
+def test_serve_metrics_local_only():
+    registry = MetricsRegistry()
+    registry.counter("test_total", "Test counter").inc()
+    with pytest.raises(ValueError):
+        serve_metrics(registry, port=0, host="0.0.0.0")
+
+    server = serve_metrics(registry, port=0)
+    try:
+        port = server.server_address[1]
+        body = urllib.request.urlopen(f"http://127.0.0.1:{port}/metrics").read().decode()
+        assert "test_total 1" in body
+    finally:
+        server.shutdown()
+
+def test_serve_metrics_ipv6_loopback():
+    registry = MetricsRegistry()
+    registry.counter("test_total", "Test counter").inc()
+    try:
+        server = serve_metrics(registry, port=0, host="::1")
+    except OSError:
+        pytest.skip("IPv6 loopback not available")
+    try:
+        port = server.server_address[1]
+        body = urllib.request.urlopen(f"http://[::1]:{port}/metrics").read().decode()
+        assert "test_total 1" in body
+    finally:
+        server.shutdown()
@@ -0,0 +1,94 @@
+# region imports
+import pytest
+from datetime import date, timedelta
+
+from habits import Habit
+from main import setup_database
+from periodicity import (get_rule, normalize_periodicity, gap_sql, check_stored_periodicities,
+                         DAILY, WEEKLY, EVERY_N_DAYS, TIMES_PER_WEEK)
+from analytics import count_longest_streak, count_current_streak, get_completion, StreakRunIndex
+
+# endregion imports
+
+def days(*offsets):
+    return [date(2025, 9, 1) + timedelta(days=offset) for offset in offsets]
+
+def test_builtin_rules():
+    assert get_rule("daily").kind == DAILY
+    weekly = get_rule("weekly")
+    assert (weekly.kind, weekly.min_gap, weekly.max_gap, weekly.max_gap_to_today) == (WEEKLY, 7, 13, 6)
+    assert get_rule("weekly") is weekly
+
+@pytest.mark.parametrize("text, expected", [
+    ("every 3 days", "every 3 days"),
+    ("Every  10 day", "every 10 days"),
+    ("3x per week", "3 times per week"),
+    ("2 times a week", "2 times per week"),
+    ("MONTHLY", "monthly"),
+])
+def test_normalize_periodicity(text, expected):
+    assert normalize_periodicity(text) == expected
+
+@pytest.mark.parametrize("text", ["hourly", "every 1 days", "7 times per week", "every -2 days", "", None, ["daily"]])
+def test_invalid_periodicity(text):
+    with pytest.raises(ValueError, match="Invalid periodicity"):
+        normalize_periodicity(text)
+
+def test_habit_stores_canonical_periodicity():
+    assert Habit("stretching", "3x per week").periodicity == "3 times per week"
+    with pytest.raises(ValueError):
+        Habit("stretching", "sometimes")
+
+def test_every_n_days_streaks():
+    rule = get_rule("every 3 days")
+    assert (rule.kind, rule.min_gap, rule.max_gap) == (EVERY_N_DAYS, 3, 5)
+    dates = days(0, 3, 7, 10, 20, 23)
+    assert count_longest_streak(dates, "every 3 days") == 4
+    assert count_current_streak(dates, "every 3 days", date(2025, 9, 26)) == 2
+    assert count_current_streak(dates, "every 3 days", date(2025, 9, 28)) == 0
+    assert get_completion("every 3 days") == 10
+
+def test_times_per_week_streaks():
+    rule = get_rule("3 times per week")
+    assert (rule.kind, rule.min_gap, rule.max_gap, rule.max_gap_to_today) == (TIMES_PER_WEEK, 1, 9, 4)
+    # Mon Tue Wed, then Fri Sat Sun of the following week, then a two-week break
+    dates = days(0, 1, 2, 11, 12, 13, 30)
+    assert count_longest_streak(dates, "3 times per week") == 2
+    index = StreakRunIndex(dates, "3 times per week")
+    assert index.current_streak(date(2025, 9, 2)) == 0
+    assert index.current_streak(date(2025, 9, 3)) == 1
+    # The week in progress doesn't break the streak yet
+    assert index.current_streak(date(2025, 9, 10)) == 1
+    assert index.longest_streak(date(2025, 9, 13)) == 1
+    assert index.current_streak(date(2025, 9, 14)) == 2
+    assert date.fromordinal(index.breaks_on(date(2025, 9, 14))) == date(2025, 9, 22)
+    assert index.current_streak(date(2025, 9, 22)) == 0
+    assert index.current_streak(date(2025, 10, 2)) == 0
+    assert count_current_streak(dates, "3 times per week", date(2025, 9, 20)) == 2
+    assert index.completion_rate(date(2025, 9, 14)) == 50
+
+def test_times_per_week_needs_quota_every_week():
+    # One completion every 9 days never meets 3 per week
+    dates = [date(2025, 1, 6) + timedelta(days=9 * i) for i in range(20)]
+    assert count_longest_streak(dates, "3 times per week") == 0
+    assert count_current_streak(dates, "3 times per week", dates[-1]) == 0
+
+def test_gap_sql_matches_rules():
+    connection = setup_database(":memory:")
+    for periodicity in ["daily", "Weekly", "monthly", "every 3 days", "3 times per week", "hourly", "every 1 days"]:
+        limits = connection.execute(f"WITH p(v) AS (SELECT ?) SELECT {', '.join(gap_sql('v'))} FROM p",
+                                    (periodicity,)).fetchone()
+        try:
+            rule = get_rule(periodicity)
+        except ValueError:
+            assert tuple(limits) == (None, None, None, None)
+        else:
+            assert tuple(limits) == (rule.min_gap, rule.max_gap, rule.max_gap_to_today, rule.per_30_days)
+
+def test_stored_periodicities_are_checked():
+    connection = setup_database(":memory:")
+    check_stored_periodicities(connection)
+    connection.execute("DROP TRIGGER schedule_habit_insert")
+    connection.execute("INSERT INTO habits (habit_name, habit_periodicity) VALUES ('napping', 'hourly')")
+    with pytest.raises(ValueError, match="hourly"):
+        check_stored_periodicities(connection)
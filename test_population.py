@@ -0,0 +1,95 @@
+# region imports
+import pytest
+import json
+import random
+from datetime import date
+
+from test_database import db_setup
+from test_analytics_setup import (
+    setup_analytics_data,
+    daily_habit,
+    weekly_habit,
+    tracking_test_data,
+    single_entry_habit,
+    no_consecutive_dates_habit,
+    no_tracking_data_habit
+)
+
+from population import QuantileSketch, RunningMoments, PopulationStats, population_statistics
+
+# endregion imports
+
+def exact_quantile(values, q):
+    return sorted(values)[int(q * (len(values) - 1))]
+
+def test_sketch_relative_error():
+    rng = random.Random(1)
+    values = [rng.lognormvariate(3, 1.5) for _ in range(20000)] + [0] * 1000
+    sketch = QuantileSketch(relative_accuracy=0.01)
+    for value in values:
+        sketch.add(value)
+    assert len(sketch.buckets) < 2048
+    for q in (0.01, 0.5, 0.95, 0.99):
+        assert sketch.quantile(q) == pytest.approx(exact_quantile(values, q), rel=0.01)
+    assert sketch.quantile(0.0) == 0.0
+    assert QuantileSketch().quantile(0.5) is None
+
+def test_sketch_merge_and_serialization():
+    rng = random.Random(2)
+    values = [rng.randrange(1, 400) for _ in range(5000)]
+    whole, left, right = QuantileSketch(), QuantileSketch(), QuantileSketch()
+    for i, value in enumerate(values):
+        whole.add(value)
+        (left if i % 2 else right).add(value)
+    left.merge(QuantileSketch.from_dict(right.to_dict()))
+    assert left.buckets == whole.buckets
+    assert left.quantile(0.95) == whole.quantile(0.95)
+    with pytest.raises(ValueError):
+        left.merge(QuantileSketch(relative_accuracy=0.05))
+    with pytest.raises(ValueError):
+        left.add(-1)
+
+def test_sketch_collapses_to_max_buckets():
+    sketch = QuantileSketch(relative_accuracy=0.01, max_buckets=10)
+    for value in range(1, 1000):
+        sketch.add(value)
+    assert len(sketch.buckets) == 10
+    assert sketch.count == 999
+    assert sketch.quantile(0.99) == pytest.approx(989, rel=0.01)
+
+def test_running_moments_merge():
+    values = [3, 1, 4, 1, 5, 9, 2, 6]
+    whole, left, right = RunningMoments(), RunningMoments(), RunningMoments()
+    for i, value in enumerate(values):
+        whole.add(value)
+        (left if i < 3 else right).add(value)
+    left.merge(right)
+    assert (left.count, left.minimum, left.maximum) == (8, 1, 9)
+    assert left.mean == pytest.approx(3.875)
+    assert left.variance == pytest.approx(whole.variance)
+
+def test_population_statistics(setup_analytics_data):
+    stats = population_statistics(setup_analytics_data, as_of=date(2025, 9, 28))
+    summary = stats.summary()
+    assert set(summary) == {"daily", "weekly"}
+    assert summary["daily"]["longest_streak"]["count"] == 2
+    assert summary["daily"]["longest_streak"]["max"] == 3
+
+def test_shards_merge_to_whole(setup_analytics_data):
+    whole = population_statistics(setup_analytics_data, as_of=date(2025, 9, 28))
+    merged = PopulationStats()
+    for index in range(3):
+        shard = population_statistics(setup_analytics_data, as_of=date(2025, 9, 28), shard=(index, 3))
+        merged.merge(PopulationStats.from_dict(json.loads(json.dumps(shard.to_dict()))))
+    assert merged.summary() == whole.summary()
+
+def test_shard_is_filtered_in_sql(setup_analytics_data):
+    statements = []
+    setup_analytics_data.connection.set_trace_callback(statements.append)
+    names = {habit for habit, _, _ in setup_analytics_data.iter_tracking_data(shard=(1, 2))}
+    setup_analytics_data.connection.set_trace_callback(None)
+    ids = dict(setup_analytics_data.connection.execute("SELECT habit_name, habit_id FROM habits"))
+    assert names and all(ids[name] % 2 == 1 for name in names)
+    assert any("habit_id % 2 = 1" in statement for statement in statements)
+    with pytest.raises(ValueError):
+        list(setup_analytics_data.iter_tracking_data(shard=(2, 2)))
@@ -0,0 +1,52 @@
+# region imports
+import sys
+import pstats
+import tracemalloc
+
+from test_analytics_setup import (
+    setup_analytics_data,
+    daily_habit,
+    weekly_habit,
+    tracking_test_data,
+    single_entry_habit,
+    no_consecutive_dates_habit,
+    no_tracking_data_habit
+)
+from test_database import db_setup
+
+from profiling import Profiler, profile_call
+from main import analytics_report, main
+
+# endregion imports
+
+def allocate():
+    blocks = [bytearray(1024) for _ in range(2000)]
+    return len(blocks)
+
+def test_profile_call_writes_reports(tmp_path):
+    result, files = profile_call(str(tmp_path / "run"), allocate)
+    assert result == 2000
+    assert "allocate" in open(files["hot"]).read()
+    memory = open(files["memory"]).read()
+    assert "test_profiling.py" in memory
+    assert pstats.Stats(files["pstats"]).total_calls > 0
+    assert not tracemalloc.is_tracing()
+
+def test_peak_breakdown_survives_release(tmp_path):
+    with Profiler(str(tmp_path / "run"), interval=0.001) as profiler:
+        allocate()
+    # Memory is freed before exit, the sampled peak still shows the allocation site
+    assert profiler.peak > 2000 * 1024
+    assert "test_profiling.py" in profiler.memory_report()
+
+def test_analytics_report(setup_analytics_data):
+    report = analytics_report(setup_analytics_data)
+    assert report.count("Analytics for") == len(setup_analytics_data.load_all_habits())
+
+def test_profile_is_not_loaded_by_default(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    monkeypatch.delitem(sys.modules, "profiling")
+    main(["--analytics-report"])
+    assert "profiling" not in sys.modules
+    main(["--analytics-report", "--profile", "report"])
+    assert (tmp_path / "report.pstats").exists() and (tmp_path / "report_memory.txt").exists()
@@ -0,0 +1,70 @@
+# region imports
+import pytest
+import sqlite3
+from datetime import date
+
+from test_database import db_setup
+
+from habits import Habit
+from storage import SQLiteStorage, ensure_changelog_schema
+from recompute import recompute_analytics, load_stats
+
+# endregion imports
+
+@pytest.fixture
+def stats_storage(db_setup):
+    db_setup.execute("PRAGMA foreign_keys = ON")
+    ensure_changelog_schema(db_setup)
+    storage = SQLiteStorage(db_setup)
+    storage.save_habit(Habit("running", "daily"))
+    storage.save_habit(Habit("reading", "daily"))
+    storage.save_habit(Habit("cinema", "weekly"))
+    for day in (1, 2, 3):
+        storage.save_tracking_data(("running", date(2025, 9, day)))
+    storage.save_tracking_data(("reading", date(2025, 8, 1)))
+    return storage
+
+def test_first_run_is_full(stats_storage):
+    report = recompute_analytics(stats_storage, today=date(2025, 9, 3))
+    assert (report["full"], report["recomputed"]) == (True, 3)
+    stats = load_stats(stats_storage, "running")
+    assert (stats["longest_streak"], stats["current_streak"]) == (3, 3)
+    assert stats["last_completion"] == "2025-09-03"
+    assert stats["expires_on"] == "2025-09-05"
+    assert load_stats(stats_storage, "cinema")["expires_on"] is None
+
+def test_dirty_habits(stats_storage):
+    assert stats_storage.dirty_habits(0) == ["cinema", "reading", "running"]
+    seq = stats_storage.last_change_seq()
+    stats_storage.save_tracking_data(("reading", date(2025, 9, 3)))
+    assert stats_storage.dirty_habits(seq) == ["reading"]
+    with pytest.raises(ValueError):
+        SQLiteStorage(sqlite3.connect(":memory:")).dirty_habits(0)
+
+def test_incremental_run_only_touches_dirty_habits(stats_storage):
+    recompute_analytics(stats_storage, today=date(2025, 9, 3))
+    stats_storage.save_tracking_data(("reading", date(2025, 9, 3)))
+    report = recompute_analytics(stats_storage, today=date(2025, 9, 3))
+    assert (report["full"], report["dirty"], report["expired"], report["recomputed"]) == (False, 1, 0, 1)
+    assert load_stats(stats_storage, "reading")["current_streak"] == 1
+
+    report = recompute_analytics(stats_storage, today=date(2025, 9, 3))
+    assert report["recomputed"] == 0
+
+def test_rollover_recomputes_expired_streaks(stats_storage):
+    recompute_analytics(stats_storage, today=date(2025, 9, 3))
+    assert recompute_analytics(stats_storage, today=date(2025, 9, 4))["recomputed"] == 0
+    report = recompute_analytics(stats_storage, today=date(2025, 9, 5))
+    assert (report["dirty"], report["expired"]) == (0, 1)
+    assert load_stats(stats_storage, "running")["current_streak"] == 0
+    # Completions leaving the 30-day window expire the completion rate
+    assert load_stats(stats_storage, "running")["expires_on"] == "2025-10-02"
+    recompute_analytics(stats_storage, today=date(2025, 10, 4))
+    assert load_stats(stats_storage, "running")["completion_rate"] == 0
+
+def test_deleted_habit_drops_stats(stats_storage):
+    recompute_analytics(stats_storage, today=date(2025, 9, 3))
+    stats_storage.delete_habit("running")
+    report = recompute_analytics(stats_storage, today=date(2025, 9, 3))
+    assert report["recomputed"] == 0
+    assert load_stats(stats_storage, "running") is None
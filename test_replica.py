@@ -0,0 +1,117 @@
+# region imports
+import pytest
+import sqlite3
+from datetime import date, timedelta
+
+from test_database import valid_habit
+
+from storage import SQLiteStorage
+from main import setup_database
+from api_server import HabitAPI
+import replica
+from replica import backup_to, create_snapshot, open_replica, ReplicaRefresher, ReplicaStorage
+
+# endregion imports
+
+@pytest.fixture
+def primary(tmp_path, valid_habit):
+    path = str(tmp_path / "habits.db")
+    conn = setup_database(path)
+    conn.execute("PRAGMA journal_mode = wal")
+    storage = SQLiteStorage(conn)
+    storage.save_habit(valid_habit)
+    for day in range(1, 201):
+        storage.save_tracking_data(("running", date(2025, 1, 1) + timedelta(days=day)))
+    yield (path, storage)
+    conn.close()
+
+def test_backup_in_throttled_steps(primary, tmp_path):
+    path, storage = primary
+    steps = []
+    result = backup_to(storage.connection, str(tmp_path / "replica.db"), pages=1, sleep=0,
+                       progress=lambda status, remaining, total: steps.append(remaining))
+    assert len(steps) == result["pages"] > 1
+    replica = SQLiteStorage(open_replica(str(tmp_path / "replica.db")))
+    assert len(replica.load_tracking_data("running")) == 200
+    assert replica.connection.execute("PRAGMA journal_mode").fetchone()[0] == "delete"
+
+def test_replica_is_read_only(primary, tmp_path):
+    path, storage = primary
+    backup_to(storage.connection, str(tmp_path / "replica.db"))
+    replica = SQLiteStorage(open_replica(str(tmp_path / "replica.db")))
+    with pytest.raises(sqlite3.OperationalError, match="readonly"):
+        replica.save_tracking_data(("running", date(2025, 9, 1)))
+
+def test_snapshot_is_replaced_atomically(primary, tmp_path):
+    path, storage = primary
+    snapshot = str(tmp_path / "snapshot.db")
+    create_snapshot(storage.connection, snapshot)
+    old_reader = SQLiteStorage(open_replica(snapshot, immutable=True))
+    storage.delete_habit("running")
+    create_snapshot(storage.connection, snapshot)
+    assert old_reader.load_all_habits() == ["running"]
+    assert SQLiteStorage(open_replica(snapshot, immutable=True)).load_all_habits() == []
+
+def test_refresher_copies_only_after_changes(primary, tmp_path):
+    path, storage = primary
+    refresher = ReplicaRefresher(path, str(tmp_path / "replica.db"), interval=3600)
+    try:
+        assert refresher.refresh() is True
+        assert refresher.refresh() is False
+        reader = ReplicaStorage(str(tmp_path / "replica.db"))
+        marker = reader.change_marker("running")
+        storage.save_tracking_data(("running", date(2025, 9, 1)))
+        assert refresher.refresh() is True
+        assert len(reader.load_tracking_data("running")) == 201
+        assert reader.change_marker("running") != marker
+    finally:
+        refresher.close()
+
+def test_reopen_closes_previous_copy(primary, tmp_path):
+    path, storage = primary
+    refresher = ReplicaRefresher(path, str(tmp_path / "replica.db"), interval=3600)
+    try:
+        refresher.refresh()
+        reader = ReplicaStorage(str(tmp_path / "replica.db"))
+        connections = [reader.connection]
+        for day in (1, 2):
+            storage.save_tracking_data(("running", date(2025, 9, day)))
+            refresher.refresh()
+            assert len(reader.load_tracking_data("running")) == 200 + day
+            connections.append(reader.connection)
+        for connection in connections[:2]:
+            with pytest.raises(sqlite3.ProgrammingError, match="closed"):
+                connection.execute("SELECT 1")
+        reader.close()
+        with pytest.raises(sqlite3.ProgrammingError, match="closed"):
+            connections[2].execute("SELECT 1")
+    finally:
+        refresher.close()
+
+def test_reads_during_refresh(primary, tmp_path, monkeypatch):
+    path, storage = primary
+    refresher = ReplicaRefresher(path, str(tmp_path / "replica.db"), interval=3600, pages=1, sleep=0)
+    reads = []
+    def snapshot_reading_between_steps(source, target, pages, sleep):
+        return create_snapshot(source, target, pages, sleep, progress=lambda status, remaining, total:
+                               reads.append(len(reader.load_tracking_data("running"))))
+    try:
+        refresher.refresh()
+        reader = ReplicaStorage(str(tmp_path / "replica.db"))
+        storage.save_tracking_data(("running", date(2025, 9, 1)))
+        monkeypatch.setattr(replica, "create_snapshot", snapshot_reading_between_steps)
+        assert refresher.refresh() is True
+        # Every step was read from the previous copy without waiting for a lock
+        assert len(reads) > 1 and set(reads) == {200}
+        assert len(reader.load_tracking_data("running")) == 201
+    finally:
+        refresher.close()
+
+def test_api_reads_analytics_from_replica(primary, tmp_path):
+    path, storage = primary
+    backup_to(storage.connection, str(tmp_path / "replica.db"))
+    api = HabitAPI(storage, report_storage=SQLiteStorage(open_replica(str(tmp_path / "replica.db"))))
+    storage.delete_habit("running")
+    status, payload = api.handle("GET", "/habits/running/analytics")
+    assert payload["longest_streak"] == "The longest streak for Habit running is 1 day"
+    assert api.handle("GET", "/habits/running")[0] == 404
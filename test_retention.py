@@ -0,0 +1,91 @@
+# region imports
+import pytest
+import sqlite3
+from datetime import date, timedelta
+
+from test_database import db_setup, valid_habit
+
+from storage import SQLiteStorage, ensure_changelog_schema
+from archive import archive_completions
+
+# endregion imports
+
+TODAY = date(2025, 9, 30)
+
+@pytest.fixture
+def history(db_setup, valid_habit):
+    db_setup.execute("PRAGMA foreign_keys = ON")
+    ensure_changelog_schema(db_setup)
+    storage = SQLiteStorage(db_setup)
+    storage.save_habit(valid_habit)
+    storage.save_tracking_batch([("running", TODAY - timedelta(days=day)) for day in range(100)])
+    return storage
+
+def test_purge_in_chunks(history):
+    reports = []
+    result = history.purge_tracking_data(30, chunk_size=20, today=TODAY,
+                                         progress=lambda deleted, last_id: reports.append(deleted))
+    assert (result["deleted"], result["chunks"]) == (69, 4)
+    assert reports == [20, 40, 60, 69]
+    dates = sorted(row[0] for row in history.load_tracking_data("running"))
+    assert dates[0] == str(TODAY - timedelta(days=30)) and len(dates) == 31
+    assert history.purge_tracking_data(30, today=TODAY)["deleted"] == 0
+
+def test_purge_is_logged(history):
+    seq = history.last_change_seq()
+    history.purge_tracking_data(97, chunk_size=1, today=TODAY)
+    assert [change[1:] for change in history.changes_since(seq)] == [
+        ("completion_deleted", "running", str(TODAY - timedelta(days=98))),
+        ("completion_deleted", "running", str(TODAY - timedelta(days=99)))
+    ]
+
+def test_purge_resumes_after_interruption(history):
+    def interrupt(deleted, last_id):
+        if deleted >= 20:
+            raise KeyboardInterrupt
+    with pytest.raises(KeyboardInterrupt):
+        history.purge_tracking_data(30, chunk_size=10, today=TODAY, progress=interrupt)
+    assert len(history.load_tracking_data("running")) == 80
+    assert history.purge_tracking_data(30, chunk_size=10, today=TODAY)["deleted"] == 49
+
+def test_purge_includes_archive(history):
+    archive_completions(history, older_than_days=50, today=TODAY)
+    assert history.purge_tracking_data(30, today=TODAY)["deleted"] == 69
+    assert history.load_archive_summary("running") is None
+    assert len(history.load_tracking_data("running")) == 31
+
+def test_purge_rejects_invalid_settings(history):
+    with pytest.raises(ValueError):
+        history.purge_tracking_data(-1)
+    with pytest.raises(ValueError):
+        history.delete_habit_chunked("running", chunk_size=0)
+
+def test_delete_habit_chunked(history):
+    reports = []
+    result = history.delete_habit_chunked("running", chunk_size=30,
+                                          progress=lambda deleted, last_id: reports.append(deleted))
+    assert result == (True, "Habit succesfully deleted")
+    assert reports == [30, 60, 90, 100]
+    assert history.connection.execute("SELECT COUNT(*) FROM tracking").fetchone()[0] == 0
+    assert history.delete_habit_chunked("running") == (False, "There is no such habit")
+
+def test_chunks_release_lock_for_other_writers(tmp_path, valid_habit):
+    path = str(tmp_path / "habits.db")
+    storage = SQLiteStorage(sqlite3.connect(path))
+    storage.connection.execute("CREATE TABLE habits(habit_id INTEGER PRIMARY KEY, habit_name VARCHAR UNIQUE, "
+                               "habit_periodicity VARCHAR, habit_description VARCHAR)")
+    storage.connection.execute("CREATE TABLE tracking(tracking_id INTEGER PRIMARY KEY, habit_id INTEGER, "
+                               "completion_date DATE)")
+    storage.save_habit(valid_habit)
+    storage.save_tracking_batch([("running", TODAY - timedelta(days=day)) for day in range(10)])
+    other = sqlite3.connect(path, timeout=0)
+    writes = []
+
+    def write_between_chunks(deleted, last_id):
+        # Fails with "database is locked" if the chunk still held the write lock
+        other.execute("BEGIN IMMEDIATE")
+        other.rollback()
+        writes.append(deleted)
+
+    storage.delete_habit_chunked("running", chunk_size=3, progress=write_between_chunks)
+    assert writes == [3, 6, 9, 10]
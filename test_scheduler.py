@@ -0,0 +1,152 @@
+# region imports
+import random
+import pytest
+from datetime import date, timedelta
+
+from test_database import db_setup
+from test_analytics_setup import (
+    setup_analytics_data,
+    daily_habit,
+    weekly_habit,
+    tracking_test_data,
+    single_entry_habit,
+    no_consecutive_dates_habit,
+    no_tracking_data_habit
+)
+
+from habits import Habit
+from main import setup_database
+from storage import SQLiteStorage
+from analytics import build_streak_index, StreakRunIndex
+from layout import convert_to_clustered
+from api_server import HabitAPI
+from scheduler import ensure_schedule_schema, due_habits, at_risk_habits, reminders
+
+# endregion imports
+
+TODAY = date(2025, 9, 30)
+PERIODICITIES = ["daily", "weekly", "monthly", "every 3 days", "3 times per week"]
+
+@pytest.fixture
+def storage():
+    return SQLiteStorage(setup_database(":memory:"))
+
+def test_schedule_follows_writes(storage):
+    storage.save_habit(Habit("reading", "daily", "Read 10 pages"))
+    assert due_habits(storage, TODAY) == [("reading", None)]
+    assert at_risk_habits(storage, TODAY) == []
+
+    storage.save_tracking_data(("reading", TODAY - timedelta(days=1)))
+    assert due_habits(storage, TODAY) == [("reading", TODAY)]
+    assert at_risk_habits(storage, TODAY) == [("reading", TODAY, TODAY - timedelta(days=1))]
+
+    storage.save_tracking_data(("reading", TODAY))
+    assert due_habits(storage, TODAY) == [] and at_risk_habits(storage, TODAY) == []
+    assert at_risk_habits(storage, TODAY, within_days=1) == [("reading", TODAY + timedelta(days=1), TODAY)]
+
+    storage.delete_tracking_data(("reading", TODAY))
+    assert due_habits(storage, TODAY) == [("reading", TODAY)]
+    storage.delete_habit("reading")
+    assert due_habits(storage, TODAY) == []
+
+def test_periodicity_gaps(storage):
+    for number, periodicity in enumerate(PERIODICITIES):
+        storage.save_habit(Habit(f"habit {number}", periodicity, "Scheduler test"))
+        storage.save_tracking_data((f"habit {number}", TODAY - timedelta(days=3)))
+    assert {habit for habit, _ in due_habits(storage, TODAY)} == {"habit 0", "habit 3", "habit 4"}
+    # Daily broke, every 3 days continues with a gap of up to 5 days
+    assert at_risk_habits(storage, TODAY, within_days=1) == []
+    assert at_risk_habits(storage, TODAY, within_days=2) == [
+        ("habit 3", TODAY + timedelta(days=2), TODAY - timedelta(days=3))]
+
+    # 3 times per week: one completion is no streak yet, meeting the quota
+    # last week keeps it until the end of this week
+    assert "habit 4" not in {habit for habit, _, _ in at_risk_habits(storage, TODAY, within_days=10)}
+    storage.save_tracking_batch([("habit 4", date(2025, 9, 22)), ("habit 4", date(2025, 9, 23))])
+    assert ("habit 4", date(2025, 9, 29)) in due_habits(storage, TODAY)
+    at_risk = {habit: last_day for habit, last_day, _ in at_risk_habits(storage, TODAY, within_days=5)}
+    assert at_risk["habit 4"] == date(2025, 10, 5)
+    assert "habit 4" not in {habit for habit, _, _ in at_risk_habits(storage, TODAY, within_days=4)}
+    storage.save_tracking_batch([("habit 4", TODAY - timedelta(days=day)) for day in (-2, -1, 0)])
+    assert "habit 4" not in {habit for habit, _ in due_habits(storage, TODAY + timedelta(days=2))}
+
+def continues_streak(dates, periodicity, day):
+    """Return True if a completion on day extends the streak of dates."""
+    return StreakRunIndex(sorted(dates + [day]), periodicity).current_streak(day) > 1
+
+def test_at_risk_matches_streak_rules(storage):
+    rng = random.Random(7)
+    history = {}
+    for number in range(40):
+        habit = f"habit {number}"
+        periodicity = rng.choice(PERIODICITIES)
+        storage.save_habit(Habit(habit, periodicity, "Scheduler test"))
+        history[habit] = (periodicity, [TODAY - timedelta(days=day)
+                                        for day in rng.sample(range(1, 60), rng.randint(1, 10))])
+        storage.save_tracking_batch([(habit, day) for day in history[habit][1]])
+    at_risk = {habit for habit, _, _ in at_risk_habits(storage, TODAY, limit=100)}
+    for habit in storage.load_all_habits():
+        periodicity, dates = history[habit]
+        if periodicity == "3 times per week":
+            index = build_streak_index(storage, habit)
+            expected = index.current_streak(TODAY) > 0 and index.current_streak(TODAY + timedelta(days=1)) == 0
+        else:
+            # Today is the last day a completion continues the streak
+            expected = (continues_streak(dates, periodicity, TODAY)
+                        and not continues_streak(dates, periodicity, TODAY + timedelta(days=1)))
+        assert (habit in at_risk) == expected
+
+def test_following_weekly_advice_keeps_streak(storage):
+    storage.save_habit(Habit("running", "weekly", "Run 5 km"))
+    storage.save_tracking_batch([("running", date(2025, 9, 1)), ("running", date(2025, 9, 8))])
+    (habit, last_day, _), = at_risk_habits(storage, date(2025, 9, 21))
+    assert (habit, last_day) == ("running", date(2025, 9, 21))
+    assert ("running", date(2025, 9, 15)) in due_habits(storage, last_day)
+    assert at_risk_habits(storage, date(2025, 9, 14), within_days=6) == []
+
+    storage.save_tracking_data(("running", last_day))
+    assert build_streak_index(storage, "running").current_streak(last_day) == 3
+
+def test_backfill_existing_habits(setup_analytics_data):
+    ensure_schedule_schema(setup_analytics_data.connection)
+    due = due_habits(setup_analytics_data, date(2025, 9, 29))
+    assert due[0] == ("reading", None)
+    assert ("10000 steps", date(2025, 9, 28), date(2025, 9, 27)) in at_risk_habits(
+        setup_analytics_data, date(2025, 9, 28))
+    ensure_schedule_schema(setup_analytics_data.connection)
+    assert due_habits(setup_analytics_data, date(2025, 9, 29)) == due
+
+def test_outdated_triggers_are_replaced(storage):
+    storage.save_habit(Habit("gym", "2 times per week", "Strength training"))
+    storage.save_tracking_batch([("gym", date(2025, 9, 22)), ("gym", date(2025, 9, 24))])
+    connection = storage.connection
+    connection.execute("DROP TRIGGER schedule_tracking_insert")
+    connection.execute("""
+        CREATE TRIGGER schedule_tracking_insert AFTER INSERT ON tracking
+        BEGIN
+            UPDATE habit_schedule SET last_completion = new.completion_date WHERE habit_id = new.habit_id;
+        END
+    """)
+    connection.execute("UPDATE habit_schedule SET breaks_on = '2000-01-01'")
+    ensure_schedule_schema(connection)
+    assert at_risk_habits(storage, TODAY, within_days=5) == [("gym", date(2025, 10, 5), date(2025, 9, 24))]
+
+def test_clustered_conversion_keeps_schedule(storage):
+    storage.save_habit(Habit("reading", "daily", "Read 10 pages"))
+    convert_to_clustered(storage.connection)
+    storage = SQLiteStorage(storage.connection)
+    storage.save_tracking_data(("reading", TODAY))
+    assert due_habits(storage, TODAY) == []
+
+def test_reminders_and_api(storage):
+    assert reminders(storage, TODAY) == "Nothing is due"
+    storage.save_habit(Habit("reading", "daily", "Read 10 pages"))
+    storage.save_habit(Habit("running", "weekly", "Run 5 km"))
+    storage.save_tracking_data(("reading", TODAY - timedelta(days=1)))
+    storage.save_tracking_data(("running", TODAY - timedelta(days=9)))
+    assert reminders(storage, TODAY) == (
+        "Complete reading by 2025-09-30 to keep its streak\nrunning is due since 2025-09-28\nreading is due")
+    status, payload = HabitAPI(storage).handle("GET", "/reminders?date=2025-09-30&limit=1")
+    assert (status, payload["due"]) == (200, [{"habit": "running", "due_on": "2025-09-28"}])
+    with pytest.raises(ValueError):
+        at_risk_habits(storage, TODAY, within_days=-1)
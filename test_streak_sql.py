@@ -0,0 +1,64 @@
+# region imports
+import random
+import pytest
+from datetime import date, timedelta
+
+from habits import Habit
+from main import setup_database
+from storage import SQLiteStorage
+from analytics import build_streak_index, streak_leaderboard
+from streak_sql import habit_streaks, sql_streak_leaderboard, streak_report
+
+# endregion imports
+
+TODAY = date(2025, 9, 30)
+PERIODICITIES = ["daily", "weekly", "monthly", "every 3 days", "3 times per week"]
+
+def fill(storage, habits=80, seed=5):
+    rng = random.Random(seed)
+    for number in range(habits):
+        habit = f"habit {number}"
+        storage.save_habit(Habit(habit, rng.choice(PERIODICITIES), "Streak test"))
+        # Dense recent runs plus scattered days, some after TODAY
+        days = set(range(rng.randint(0, 3), rng.randint(0, 40), rng.choice([1, 1, 2, 3, 7])))
+        days |= set(rng.sample(range(-10, 300), rng.randint(0, 30)))
+        storage.save_tracking_batch([(habit, TODAY - timedelta(days=day)) for day in days])
+    storage.save_habit(Habit("untracked", "daily", "Never completed"))
+    return storage
+
+@pytest.mark.parametrize("clustered", [False, True])
+def test_streaks_match_streak_index(clustered):
+    storage = fill(SQLiteStorage(setup_database(":memory:", clustered=clustered)))
+    # The rowid layout keeps repeated completions of a day
+    storage.save_tracking_data(("habit 1", TODAY))
+    storage.save_tracking_data(("habit 1", TODAY))
+    for as_of in (TODAY, TODAY - timedelta(days=17)):
+        streaks = habit_streaks(storage, as_of)
+        assert [row["habit"] for row in streaks] == sorted(storage.load_all_habits())
+        for row in streaks:
+            index = build_streak_index(storage, row["habit"])
+            assert row["longest_streak"] == index.longest_streak(as_of)
+            assert row["current_streak"] == index.current_streak(as_of)
+            assert row["completion_rate"] == pytest.approx(index.completion_rate(as_of))
+            assert row["completions"] == index.count_between(date.min, as_of)
+
+def test_leaderboard_matches_python():
+    storage = fill(SQLiteStorage(setup_database(":memory:")))
+    for metric in ("longest", "current"):
+        expected = streak_leaderboard(storage, k=10, metric=metric)
+        result = sql_streak_leaderboard(storage, k=10, metric=metric)
+        # Ties may be ordered differently, the streak values must agree
+        assert [streak for _, streak in result] == [streak for _, streak in expected]
+    weekly = sql_streak_leaderboard(storage, k=100, periodicity="weekly", as_of=TODAY)
+    assert {habit for habit, _ in weekly} == set(storage.load_all_habits_by_periodicity("weekly")) - {"untracked"}
+    with pytest.raises(ValueError):
+        sql_streak_leaderboard(storage, metric="average")
+
+def test_streak_report():
+    storage = SQLiteStorage(setup_database(":memory:"))
+    assert streak_report(storage) == "No habits found"
+    storage.save_habit(Habit("running", "weekly", "Run 5 km"))
+    storage.save_tracking_batch([("running", TODAY - timedelta(days=day)) for day in (0, 7, 14, 30)])
+    assert streak_report(storage, TODAY, "weekly") == (
+        "running (weekly): longest streak 3, current streak 3, completion rate 100%")
+    assert streak_report(storage, TODAY, "daily") == "No habits found"
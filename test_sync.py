@@ -0,0 +1,76 @@
+# region imports
+import shutil
+import pytest
+import sqlite3
+from datetime import date, timedelta
+
+from habits import Habit
+from main import setup_database
+from storage import SQLiteStorage
+from sync import sync_databases, export_changes, apply_changes, ensure_sync_schema, watermark, database_id
+
+# endregion imports
+
+TODAY = date(2025, 9, 30)
+
+@pytest.fixture
+def databases(tmp_path):
+    laptop = SQLiteStorage(setup_database(str(tmp_path / "laptop.db")))
+    server = SQLiteStorage(setup_database(str(tmp_path / "server.db"), clustered=True))
+    laptop.save_habit(Habit("running", "weekly", "Run 5 km"))
+    laptop.save_habit(Habit("reading", "daily", "Read 10 pages"))
+    laptop.save_tracking_batch([("reading", TODAY - timedelta(days=day)) for day in range(10)])
+    server.save_habit(Habit("reading", "daily", "Read 20 pages"))
+    server.save_habit(Habit("gym", "3 times per week", "Strength training"))
+    server.save_tracking_batch([("reading", TODAY - timedelta(days=day)) for day in range(5, 15)])
+    server.save_tracking_data(("gym", TODAY))
+    yield laptop, server
+    laptop.connection.close()
+    server.connection.close()
+
+def completions(storage):
+    return {name: sorted(row[0] for row in storage.load_tracking_data(name)) for name in storage.load_all_habits()
+            if storage.load_tracking_data(name) != "No data found"}
+
+def test_sync_merges_as_union(databases):
+    laptop, server = databases
+    report = sync_databases(laptop, server)
+    assert completions(laptop) == completions(server)
+    assert len(completions(laptop)["reading"]) == 15
+    assert set(laptop.load_all_habits()) == set(server.load_all_habits()) == {"running", "reading", "gym"}
+    assert (report["pulled"]["habits_created"], report["pulled"]["completions_added"]) == (1, 6)
+    assert (report["pushed"]["habits_created"], report["pushed"]["completions_added"]) == (1, 5)
+    assert report["pulled"]["conflicts"] == ["reading"] and report["pulled"]["bytes"] > 0
+    # The target keeps its own settings
+    assert laptop.load_habit("reading")["habit_description"] == "Read 10 pages"
+
+def test_second_sync_sends_only_new_changes(databases):
+    laptop, server = databases
+    sync_databases(laptop, server)
+    report = sync_databases(laptop, server)
+    assert report["pulled"]["rows"] == report["pushed"]["rows"] == 0
+
+    laptop.save_tracking_data(("running", TODAY))
+    laptop.delete_tracking_data(("reading", TODAY))
+    server.save_tracking_data(("gym", TODAY - timedelta(days=2)))
+    report = sync_databases(laptop, server)
+    # One habit row and one completion each way, the deletion is not propagated
+    assert (report["pulled"]["rows"], report["pushed"]["rows"]) == (2, 2)
+    assert str(TODAY) in completions(server)["running"] and str(TODAY) in completions(server)["reading"]
+    assert str(TODAY - timedelta(days=2)) in completions(laptop)["gym"]
+
+def test_apply_is_idempotent(databases):
+    laptop, server = databases
+    ensure_sync_schema(laptop.connection)
+    ensure_sync_schema(server.connection)
+    data = export_changes(server)
+    assert apply_changes(laptop, data)["completions_added"] == 6
+    assert apply_changes(laptop, data)["completions_added"] == 0
+    assert watermark(laptop.connection, database_id(server.connection)) == server.last_change_seq()
+
+def test_copied_database_is_rejected(databases, tmp_path):
+    laptop, _ = databases
+    ensure_sync_schema(laptop.connection)
+    shutil.copy(tmp_path / "laptop.db", tmp_path / "copy.db")
+    with pytest.raises(ValueError):
+        sync_databases(laptop, SQLiteStorage(sqlite3.connect(str(tmp_path / "copy.db"))))
@@ -0,0 +1,75 @@
+# region imports
+import random
+import pytest
+from datetime import date, timedelta
+
+from habits import Habit
+from main import setup_database
+from storage import SQLiteStorage
+from analytics import build_streak_index
+from api_server import HabitAPI
+from tags import (tag_habit, untag_habit, load_habit_tags, load_habits_by_tag, load_all_tags,
+                  tag_statistics, tag_report)
+
+# endregion imports
+
+TODAY = date(2025, 9, 30)
+PERIODICITIES = ["daily", "weekly", "monthly", "every 3 days", "3 times per week"]
+
+@pytest.fixture
+def storage():
+    return SQLiteStorage(setup_database(":memory:"))
+
+def test_tag_operations(storage):
+    storage.save_habit(Habit("running", "weekly", "Run 5 km"))
+    storage.save_habit(Habit("reading", "daily", "Read 10 pages"))
+    assert tag_habit(storage, "running", " Health ") == (True, "Tag successfully added")
+    assert tag_habit(storage, "running", "health") == (False, "Habit already has this tag")
+    assert tag_habit(storage, "reading", "HEALTH") == (True, "Tag successfully added")
+    assert tag_habit(storage, "reading", "team:ops") == (True, "Tag successfully added")
+    assert tag_habit(storage, "swimming", "health") == (False, "Habit name was not found")
+    assert tag_habit(storage, "running", " ") == (False, "Invalid tag name")
+    assert load_habit_tags(storage, "reading") == ["Health", "team:ops"]
+    assert load_habits_by_tag(storage, "health") == ["reading", "running"]
+    assert load_all_tags(storage) == [("Health", 2), ("team:ops", 1)]
+
+    assert untag_habit(storage, "reading", "team:ops") == (True, "Tag successfully removed")
+    assert untag_habit(storage, "reading", "team:ops") == (False, "Habit doesn't have this tag")
+    storage.delete_habit("running")
+    assert load_all_tags(storage) == [("Health", 1)]
+    assert load_habit_tags(storage, "running") == "Habit name was not found"
+
+def test_statistics_match_streak_index(storage):
+    rng = random.Random(3)
+    groups = {"even": [], "odd": [], "all": []}
+    for number in range(60):
+        habit = f"habit {number}"
+        storage.save_habit(Habit(habit, rng.choice(PERIODICITIES), "Tag test"))
+        days = rng.sample(range(-5, 200), rng.randint(0, 40))
+        storage.save_tracking_batch([(habit, TODAY - timedelta(days=day)) for day in days])
+        for group in ("even" if number % 2 == 0 else "odd", "all"):
+            tag_habit(storage, habit, group)
+            groups[group].append(build_streak_index(storage, habit))
+
+    statistics = {row["tag"]: row for row in tag_statistics(storage, as_of=TODAY)}
+    assert list(statistics) == ["all", "even", "odd"]
+    for group, indexes in groups.items():
+        row = statistics[group]
+        assert row["habits"] == len(indexes)
+        assert row["total_completions"] == sum(index.count_between(date.min, TODAY) for index in indexes)
+        assert row["average_completion_rate"] == pytest.approx(
+            sum(index.completion_rate(TODAY) for index in indexes) / len(indexes))
+        assert row["best_streak"] == max(index.longest_streak(TODAY) for index in indexes)
+
+def test_report_and_api(storage):
+    assert tag_report(storage) == "No tagged habits found"
+    storage.save_habit(Habit("running", "weekly", "Run 5 km"))
+    storage.save_habit(Habit("stretching", "daily", "Stretch"))
+    tag_habit(storage, "running", "sport")
+    tag_habit(storage, "stretching", "sport")
+    storage.save_tracking_batch([("running", TODAY - timedelta(days=day)) for day in (0, 7, 14)])
+    assert tag_report(storage, as_of=TODAY) == (
+        "sport: 2 habits, 3 completions, average completion rate 37.5%, best streak 3 (running)")
+    status, payload = HabitAPI(storage).handle("GET", "/tags?tags=sport,other&date=2025-09-30")
+    assert status == 200 and [row["best_habit"] for row in payload["tags"]] == ["running"]
+    assert tag_statistics(storage, tags=[]) == []
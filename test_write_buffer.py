@@ -0,0 +1,149 @@
+# region imports
+import pytest
+import sqlite3
+import time
+import threading
+from datetime import date
+
+from test_database import db_setup, valid_habit
+
+from storage import SQLiteStorage
+from write_buffer import CompletionWriteBuffer
+from main import setup_database, create_completion, quit_app, start_write_buffer
+
+# endregion imports
+
+@pytest.fixture
+def buffer_storage(db_setup, valid_habit):
+    storage = SQLiteStorage(db_setup)
+    storage.save_habit(valid_habit)
+    yield storage
+
+def count_rows(storage):
+    return storage.connection.execute("SELECT COUNT(*) FROM tracking").fetchone()[0]
+
+def test_save_tracking_batch(buffer_storage):
+    saved, failed = buffer_storage.save_tracking_batch([
+        ("running", date(2025, 9, 1)),
+        ("running", date(2025, 9, 8)),
+        ("sleeping", date(2025, 9, 8)),
+        (" ", date(2025, 9, 8))
+    ])
+    assert saved == 2
+    assert failed == [(("sleeping", date(2025, 9, 8)), "Habit name was not found"),
+                      ((" ", date(2025, 9, 8)), "Invalid habit name")]
+    assert count_rows(buffer_storage) == 2
+
+def test_buffered_flush_on_batch_size(buffer_storage):
+    buffer = CompletionWriteBuffer(buffer_storage, batch_size=3, flush_interval=60)
+    assert buffer.submit("running", date(2025, 9, 1)) == (True, "Queued")
+    buffer.submit("running", date(2025, 9, 2))
+    assert count_rows(buffer_storage) == 0
+    buffer.submit("running", date(2025, 9, 3))
+    assert count_rows(buffer_storage) == 3
+    assert buffer.pending() == 0
+
+def test_buffered_records_failures(buffer_storage):
+    buffer = CompletionWriteBuffer(buffer_storage, flush_interval=60)
+    buffer.submit("sleeping", date(2025, 9, 1))
+    assert buffer.submit("", date(2025, 9, 1)) == (False, "Invalid habit name")
+    buffer.close()
+    assert buffer.failed == [(("sleeping", date(2025, 9, 1)), "Habit name was not found")]
+
+def test_flush_on_ack(buffer_storage):
+    buffer = CompletionWriteBuffer(buffer_storage, durability="flush_on_ack")
+    assert buffer.submit("running", date(2025, 9, 1)) == (True, "Successfully saved")
+    assert buffer.submit("sleeping", date(2025, 9, 1)) == (False, "Habit name was not found")
+    assert count_rows(buffer_storage) == 1
+
+def test_backpressure_bounds_pending(buffer_storage):
+    buffer = CompletionWriteBuffer(buffer_storage, batch_size=5, max_pending=5, flush_interval=60)
+    for day in range(1, 13):
+        buffer.submit("running", date(2025, 9, day))
+        assert buffer.pending() <= 5
+    buffer.close()
+    assert count_rows(buffer_storage) == 12
+
+def test_failed_flush_keeps_completions(buffer_storage):
+    buffer = CompletionWriteBuffer(buffer_storage, flush_interval=60)
+    buffer.submit("running", date(2025, 9, 1))
+    buffer_storage.connection.execute("ALTER TABLE tracking RENAME TO tracking_old")
+    with pytest.raises(sqlite3.OperationalError):
+        buffer.flush()
+    assert buffer.pending() == 1
+    buffer_storage.connection.execute("ALTER TABLE tracking_old RENAME TO tracking")
+    assert buffer.flush() == 1
+
+def test_background_flush_gives_up_after_failures(tmp_path, valid_habit, capsys):
+    storage = SQLiteStorage(setup_database(str(tmp_path / "habits.db")))
+    storage.save_habit(valid_habit)
+    storage.connection.close()
+    connection = sqlite3.connect(str(tmp_path / "habits.db"), check_same_thread=False)
+    connection.execute("ALTER TABLE tracking RENAME TO tracking_old")
+    buffer = CompletionWriteBuffer(SQLiteStorage(connection), flush_interval=0.01, max_failures=3)
+    buffer.submit("running", date(2025, 9, 1))
+    buffer.start()
+    deadline = time.monotonic() + 5
+    while not buffer.failed and time.monotonic() < deadline:
+        time.sleep(0.01)
+    buffer.close()
+    assert buffer.pending() == 0
+    assert buffer.failed == [(("running", date(2025, 9, 1)), "no such table: tracking")]
+    errors = capsys.readouterr().err
+    assert errors.count("Write buffer flush failed: no such table: tracking") == 3
+    assert "gave up 1 completions" in errors
+
+def test_group_commit_across_threads(tmp_path, valid_habit):
+    connection = sqlite3.connect(str(tmp_path / "habits.db"), check_same_thread=False)
+    connection.execute("CREATE TABLE habits(habit_id INTEGER PRIMARY KEY, habit_name VARCHAR UNIQUE, habit_periodicity VARCHAR, habit_description VARCHAR)")
+    connection.execute("CREATE TABLE tracking(tracking_id INTEGER PRIMARY KEY, habit_id INTEGER, completion_date DATE)")
+    storage = SQLiteStorage(connection)
+    storage.save_habit(valid_habit)
+    buffer = CompletionWriteBuffer(storage, durability="flush_on_ack")
+
+    results = []
+    def worker(day):
+        results.append(buffer.submit("running", date(2025, 9, day)))
+    threads = [threading.Thread(target=worker, args=(day,)) for day in range(1, 21)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert results == [(True, "Successfully saved")] * 20
+    assert count_rows(storage) == 20
+    connection.close()
+
+def test_create_completion_and_quit_flush(buffer_storage, capsys):
+    buffer = CompletionWriteBuffer(buffer_storage, flush_interval=60)
+    success, message = create_completion(buffer_storage, "running", buffer)
+    assert (success, message) == (True, "Queued")
+    assert count_rows(buffer_storage) == 0
+
+    quit_app(buffer_storage.connection, buffer)
+    assert buffer.pending() == 0
+    assert "See you next time!" in capsys.readouterr().out
+
+def test_batch_counts_only_inserted_rows(valid_habit):
+    storage = SQLiteStorage(setup_database(":memory:", clustered=True))
+    storage.save_habit(valid_habit)
+    seq = storage.last_change_seq()
+    saved, failed = storage.save_tracking_batch([("running", date(2025, 9, 1))] * 3)
+    assert (saved, failed) == (1, [])
+    assert storage.last_change_seq() == seq + 1
+    assert storage.save_tracking_batch([("running", date(2025, 9, 1))]) == (0, [])
+    assert storage.last_change_seq() == seq + 1
+
+def test_cli_buffer_flushes_on_interval(tmp_path, valid_habit, capsys):
+    conn = setup_database(str(tmp_path / "habits.db"))
+    storage = SQLiteStorage(conn)
+    storage.save_habit(valid_habit)
+    buffer = start_write_buffer(conn, "buffered")
+    buffer.flush_interval = 0.05
+    assert create_completion(storage, "running", buffer) == (True, "Queued")
+    deadline = time.monotonic() + 5
+    while count_rows(storage) == 0 and time.monotonic() < deadline:
+        time.sleep(0.05)
+    assert count_rows(storage) == 1
+    quit_app(conn, buffer)
+    assert buffer.pending() == 0
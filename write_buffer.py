@@ -0,0 +1,246 @@
+"""
+Write-behind buffer for completions.
+
+Queues completions in memory and writes them to storage in one transaction
+per batch or interval (group commit), instead of one commit per completion.
+"""
+
+# region imports
+import sys
+import time
+import sqlite3
+import threading
+from datetime import datetime
+
+from metrics import REGISTRY
+from storage import INVALID_HABIT_NAME
+
+# endregion imports
+
+BUFFERED = "buffered"
+FLUSH_ON_ACK = "flush_on_ack"
+
+BUFFER_FLUSHES = REGISTRY.counter(
+    "habit_tracker_write_buffer_flushes_total", "Group commits made by the write-behind buffer")
+
+
+class CompletionWriteBuffer:
+
+    """
+    Write-behind buffer with group commit for SQLiteStorage completions.
+
+    Durability modes:
+        - "buffered": submit() returns as soon as the completion is queued.
+          Completions still pending when the process dies are lost.
+        - "flush_on_ack": submit() returns only after the completion is
+          committed. Concurrent submitters share one transaction: whoever
+          gets the flush lock first commits everything queued so far.
+
+    Backpressure: once max_pending completions are queued, the submitting
+    caller flushes inline before its completion is accepted, so memory stays
+    bounded and producers slow down to the speed of the database.
+
+    Attributes:
+        storage (HabitStorage): Storage the completions are written to
+        batch_size (int): Pending completions that trigger a flush
+        flush_interval (float): Seconds after which pending completions are flushed
+        max_pending (int): Upper bound for queued completions
+        durability (str): "buffered" or "flush_on_ack"
+        max_failures (int): Consecutive failed background flushes after which
+            the pending completions are given up and moved to failed
+        failed (list): Completions rejected during flush with their error message
+    """
+
+    def __init__(self, storage, batch_size=100, flush_interval=1.0, max_pending=10000, durability=BUFFERED,
+                 max_failures=3):
+        """
+        Initialize write buffer.
+
+        Args:
+            storage (HabitStorage): Storage the completions are written to
+            batch_size (int): Pending completions that trigger a flush
+            flush_interval (float): Maximum age in seconds of the oldest pending completion
+            max_pending (int): Upper bound for queued completions, at least batch_size
+            durability (str): "buffered" or "flush_on_ack"
+            max_failures (int): Consecutive failed background flushes before
+                pending completions are moved to failed, at least 1
+
+        Raises:
+            ValueError: If sizes are invalid or durability mode is unknown
+        """
+        if durability not in (BUFFERED, FLUSH_ON_ACK):
+            raise ValueError("Invalid durability mode")
+        if batch_size < 1 or max_pending < batch_size or max_failures < 1:
+            raise ValueError("Invalid buffer size")
+        self.storage = storage
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.max_pending = max_pending
+        self.durability = durability
+        self.max_failures = max_failures
+        self.failed = []
+
+        self._pending = []
+        self._oldest = None
+        self._submitted = 0
+        self._flushed = 0
+        self._results = {}
+        self._failures = 0
+        self._lock = threading.Lock()
+        self._flush_lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread = None
+
+    def submit(self, habit_name, completion_date=None):
+        """
+        Queue a completion for a habit.
+
+        Args:
+            habit_name (str): Name of the habit to track
+            completion_date (date, optional): Completion date, default today
+
+        Returns:
+            tuple: (success: bool, message: str)
+                - (True, "Queued") in buffered mode
+                - (True, "Successfully saved") in flush_on_ack mode
+                - (False, "Invalid habit name") if name is empty/whitespace
+                - (False, "Habit name was not found") in flush_on_ack mode if habit doesn't exist
+        """
+        if not habit_name or not habit_name.strip():
+            return (False, INVALID_HABIT_NAME)
+        if completion_date is None:
+            completion_date = datetime.now().date()
+
+        with self._lock:
+            is_full = len(self._pending) >= self.max_pending
+        if is_full:
+            self.flush()
+
+        with self._lock:
+            self._submitted += 1
+            sequence = self._submitted
+            self._pending.append((sequence, (habit_name, completion_date)))
+            if self._oldest is None:
+                self._oldest = time.monotonic()
+            is_due = (len(self._pending) >= self.batch_size
+                      or time.monotonic() - self._oldest >= self.flush_interval)
+
+        if self.durability == FLUSH_ON_ACK:
+            self._flush_until(sequence)
+            with self._lock:
+                message = self._results.pop(sequence, None)
+            if message:
+                return (False, message)
+            return (True, "Successfully saved")
+
+        if is_due:
+            self.flush()
+        return (True, "Queued")
+
+    def _flush_until(self, sequence):
+        """Flush unless a concurrent group commit already covered sequence."""
+        with self._flush_lock:
+            if self._flushed >= sequence:
+                return
+            self._flush_locked()
+
+    def flush(self):
+        """
+        Write all pending completions in one transaction.
+
+        Returns:
+            int: Number of completions saved
+
+        Raises:
+            sqlite3.Error: If the transaction fails; completions stay queued
+        """
+        with self._flush_lock:
+            return self._flush_locked()
+
+    def _flush_locked(self):
+        with self._lock:
+            batch = self._pending
+            self._pending = []
+            self._oldest = None
+        if not batch:
+            return 0
+
+        try:
+            saved, failed = self.storage.save_tracking_batch([item for _, item in batch])
+        except Exception:
+            # Put the batch back in front so nothing is lost or reordered
+            with self._lock:
+                self._pending = batch + self._pending
+                self._oldest = time.monotonic()
+            raise
+
+        BUFFER_FLUSHES.inc()
+        with self._lock:
+            self._flushed = batch[-1][0]
+            if self.durability == FLUSH_ON_ACK:
+                # Outcome only depends on the habit name, so equal items share it
+                messages = dict(failed)
+                for sequence, item in batch:
+                    if item in messages:
+                        self._results[sequence] = messages[item]
+            else:
+                self.failed.extend(failed)
+        return saved
+
+    def pending(self):
+        """Return number of queued completions."""
+        with self._lock:
+            return len(self._pending)
+
+    def start(self):
+        """
+        Start background thread flushing pending completions every flush_interval.
+
+        The storage connection must be opened with check_same_thread=False,
+        because flushes then happen on the background thread.
+        """
+        if self._thread is not None:
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+
+    def _run(self):
+        while not self._stop.wait(self.flush_interval):
+            try:
+                self.flush()
+                self._failures = 0
+            except sqlite3.Error as e:
+                # Busy and locked errors were already retried by the storage,
+                # so the batch stays queued for a few more intervals only
+                self._failures += 1
+                print(f"Write buffer flush failed: {e}", file=sys.stderr)
+                if self._failures >= self.max_failures:
+                    self._give_up(str(e))
+
+    def _give_up(self, message):
+        """Move all pending completions to failed with message, return their number."""
+        with self._flush_lock, self._lock:
+            batch = self._pending
+            self._pending = []
+            self._oldest = None
+            if batch:
+                self._flushed = batch[-1][0]
+            self.failed.extend((item, message) for _, item in batch)
+        self._failures = 0
+        print(f"Write buffer gave up {len(batch)} completions after {self.max_failures} failed flushes",
+              file=sys.stderr)
+        return len(batch)
+
+    def close(self):
+        """
+        Stop background thread and flush everything still queued.
+
+        Returns:
+            int: Number of completions saved by the final flush
+        """
+        if self._thread is not None:
+            self._stop.set()
+            self._thread.join()
+            self._thread = None
+        return self.flush()